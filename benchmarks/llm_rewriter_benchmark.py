@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+LLMリライトのスループット・レイテンシ計測（ローカルスタブサーバーを使用し、ネットワーク・APIキー不要）
+記事ごとに全セクションを1回のリクエストにまとめる方式と、セクションごとにリクエストする方式を比較し、
+応答キャッシュが効いた場合の時間も計測する
+
+使い方:
+    python benchmarks/llm_rewriter_benchmark.py [--posts 20] [--sections 5] [--concurrency 4]
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.llm_rewriter import OpenAICompatibleRewriter  # noqa: E402
+from llm_stub_server import start_server  # noqa: E402
+
+SECTION_TYPES = ['problem', 'solution', 'benefits', 'how_to', 'results']
+SAMPLE_TEXT = (
+    "今日は動画からブログを自動生成するシステムについて話します。"
+    "作業時間が3時間から5分に短縮できます。使い方はとても簡単です。"
+)
+
+
+def make_post(post_id: int, num_sections: int):
+    return [
+        {'type': SECTION_TYPES[i % len(SECTION_TYPES)], 'title': f"見出し{i + 1}",
+         'text': f"記事{post_id}のセクション{i + 1}。" + SAMPLE_TEXT * 3}
+        for i in range(num_sections)
+    ]
+
+
+def run(rewriter, posts, batched: bool, concurrency: int):
+    """全記事をリライトし、(経過秒, 記事ごとのレイテンシ, 初回トークンまでの秒) を返す"""
+
+    def rewrite_post(sections):
+        started = time.perf_counter()
+        if batched:
+            results = rewriter.rewrite_sections(sections)
+        else:
+            results = [r for section in sections for r in rewriter.rewrite_sections([section])]
+        assert all(results), "欠落したセクションがあります"
+        return time.perf_counter() - started, rewriter.last_metrics.get('first_token_seconds') or 0.0
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        measurements = list(pool.map(rewrite_post, posts))
+    return time.perf_counter() - started, [m[0] for m in measurements], [m[1] for m in measurements]
+
+
+def report(label: str, elapsed: float, latencies, first_tokens, num_posts: int):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<22} {num_posts / elapsed:8.2f} 記事/秒  "
+          f"p50 {statistics.median(latencies) * 1000:7.1f}ms  p95 {p95 * 1000:7.1f}ms  "
+          f"初回トークン {statistics.median(first_tokens) * 1000:6.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLMリライトのベンチマーク')
+    parser.add_argument('--posts', type=int, default=20)
+    parser.add_argument('--sections', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--first-token-ms', type=float, default=200)
+    parser.add_argument('--chunk-ms', type=float, default=1)
+    args = parser.parse_args()
+
+    server = start_server(first_token_ms=args.first_token_ms, chunk_ms=args.chunk_ms)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    posts = [make_post(i, args.sections) for i in range(args.posts)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {'base_url': base_url, 'model': 'stub', 'max_concurrent': args.concurrency,
+                  'pool_size': args.concurrency, 'stream': True}
+
+        uncached = OpenAICompatibleRewriter({**config, 'cache_path': ''})
+        report('セクションごと', *run(uncached, posts, False, args.concurrency), args.posts)
+        report('記事ごとに一括', *run(uncached, posts, True, args.concurrency), args.posts)
+
+        cached = OpenAICompatibleRewriter({**config, 'cache_path': str(Path(tmp) / 'responses.db')})
+        run(cached, posts, True, args.concurrency)
+        report('一括（キャッシュ済み）', *run(cached, posts, True, args.concurrency), args.posts)
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+OpenAI互換APIのローカルスタブサーバー
+/v1/chat/completions に対し、入力のセクションをそのまま整形した決定的な応答を返す（ストリーミング対応）。
+初回トークンまでの遅延とチャンクごとの遅延を指定でき、LLMリライトのスループット・レイテンシを
+オフラインで計測できる
+
+使い方:
+    python benchmarks/llm_stub_server.py [--port 8089] [--first-token-ms 200] [--chunk-ms 5]
+    # config.yaml の content.blog.rewriter.base_url を http://127.0.0.1:8089/v1 に設定
+"""
+
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.llm_rewriter import SECTION_MARKER_PREFIX  # noqa: E402
+from modules.text_patterns import SENTENCE_DELIMITER_PATTERN  # noqa: E402
+
+
+def stub_completion(prompt: str) -> str:
+    """プロンプト中の各セクションの本文を、文ごとに段落化した応答（同じ入力には常に同じ出力）"""
+
+    output = []
+    body_lines = None
+    for line in prompt.split('\n') + [SECTION_MARKER_PREFIX]:
+        if line.startswith(SECTION_MARKER_PREFIX):
+            if body_lines is not None:
+                sentences = [s.strip() for s in SENTENCE_DELIMITER_PATTERN.split(' '.join(body_lines)) if s.strip()]
+                output.append('\n\n'.join(f"{s}。" for s in sentences) or '（本文なし）')
+            if line.strip() != SECTION_MARKER_PREFIX.strip():
+                output.append(line.strip())
+            body_lines = None
+        elif line.startswith('本文:'):
+            body_lines = []
+        elif body_lines is not None:
+            body_lines.append(line.strip())
+    return '\n'.join(output) + '\n'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Keep-Alive（HTTP/1.1）で応答し、接続プールの効果も計測できるようにする"""
+
+    protocol_version = 'HTTP/1.1'
+    first_token_seconds = 0.2
+    chunk_seconds = 0.005
+    chunk_chars = 8
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self._send_json(404, {'error': {'message': 'not found'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        prompt = '\n'.join(m.get('content', '') for m in request.get('messages', []) if m.get('role') == 'user')
+        content = stub_completion(prompt)
+
+        time.sleep(self.first_token_seconds)
+        if request.get('stream'):
+            self._stream(request.get('model', 'stub'), content)
+        else:
+            self._send_json(200, {
+                'id': 'stub',
+                'object': 'chat.completion',
+                'model': request.get('model', 'stub'),
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+            })
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, model: str, content: str):
+        """Server-Sent Eventsをchunked転送で送信（接続は維持）"""
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        for start in range(0, len(content), self.chunk_chars):
+            delta = {'choices': [{'index': 0, 'delta': {'content': content[start:start + self.chunk_chars]}}],
+                     'model': model}
+            self._write_chunk(f"data: {json.dumps(delta, ensure_ascii=False)}\n\n")
+            if self.chunk_seconds:
+                time.sleep(self.chunk_seconds)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b'0\r\n\r\n')
+
+    def _write_chunk(self, text: str):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    """クライアント側が接続プールの接続を閉じたときの切断は無視"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def start_server(host: str = '127.0.0.1', port: int = 0, first_token_ms: float = 200,
+                 chunk_ms: float = 5, chunk_chars: int = 8) -> StubServer:
+    """スタブサーバーをバックグラウンドスレッドで起動（port=0で空きポート）"""
+
+    handler = type('ConfiguredStubHandler', (StubHandler,), {
+        'first_token_seconds': first_token_ms / 1000,
+        'chunk_seconds': chunk_ms / 1000,
+        'chunk_chars': chunk_chars,
+    })
+    server = StubServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenAI互換APIのローカルスタブサーバー')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--first-token-ms', type=float, default=200, help='初回トークンまでの遅延（ミリ秒）')
+    parser.add_argument('--chunk-ms', type=float, default=5, help='ストリーミングのチャンクごとの遅延（ミリ秒）')
+    parser.add_argument('--chunk-chars', type=int, default=8, help='1チャンクの文字数')
+    args = parser.parse_args()
+
+    server = start_server(args.host, args.port, args.first_token_ms, args.chunk_ms, args.chunk_chars)
+    print(f"スタブサーバー起動: http://{args.host}:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
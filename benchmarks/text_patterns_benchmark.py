@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+テキスト整形のマイクロベンチマーク
+毎回 re.sub にパターン文字列を渡す従来の実装と、modules.text_patterns のコンパイル済み・統合処理を
+1記事分の処理量（文ごとの書き言葉整形・段落ごとのインライン書式・全文の空白整形）で比較
+
+使い方:
+    python benchmarks/text_patterns_benchmark.py [--repeat 200]
+"""
+
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.text_patterns import (  # noqa: E402
+    format_inline_markdown, normalize_sentence_spacing, tidy_written_style
+)
+
+SAMPLE_SENTENCE = (
+    "えっと、今日は動画からブログを自動生成するシステムについて話します、"
+    "これは**クロード**を使って作ったのですがも、すごく便利なのです 。"
+    "作業時間が3時間から5分に短縮できます。ます。"
+)
+
+# 絵文字・強調を含む段落（5段落に1つ程度）
+DECORATED_SENTENCE = "ポイントは*3つ*あります🚀 まず**自動化**です✨"
+
+
+def legacy_tidy_written_style(text: str) -> str:
+    text = re.sub(r'(です|ます)、', r'\1。', text)
+    text = re.sub(r'あの、|えっと、|まあ、|ちょっと', '', text)
+    text = re.sub(r'です。です。', 'です。', text)
+    text = re.sub(r'ます。ます。', 'ます。', text)
+    text = re.sub(r'のですがも', 'のですが', text)
+    text = re.sub(r'というも', 'という方も', text)
+    text = re.sub(r'です$', 'です。', text)
+    text = re.sub(r'ます$', 'ます。', text)
+    text = re.sub(r'。。', '。', text)
+    return text.strip()
+
+
+def legacy_inline_formatting(text: str) -> str:
+    text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
+    text = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', text)
+    text = re.sub(r'([^\s])([☀-➿\U0001F300-\U0001F9FF])', r'\1 \2', text)
+    text = re.sub(r'([☀-➿\U0001F300-\U0001F9FF])([^\s])', r'\1 \2', text)
+    return text
+
+
+def legacy_clean_text(text: str) -> str:
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\s+([。、！？])', r'\1', text)
+    text = re.sub(r'([。！？])\s*', r'\1 ', text)
+    text = re.sub(r'\n\s*\n', '\n\n', text)
+    return text.strip()
+
+
+def process_post(sentences, paragraphs, full_text, tidy, inline, clean):
+    """1記事分の整形処理"""
+    for sentence in sentences:
+        tidy(sentence)
+    for paragraph in paragraphs:
+        inline(paragraph)
+    clean(full_text)
+
+
+def measure(repeat: int, *routines) -> float:
+    # 約200文・40段落の記事を想定
+    sentences = [SAMPLE_SENTENCE] * 200
+    paragraphs = [
+        SAMPLE_SENTENCE * 5 + (DECORATED_SENTENCE if i % 5 == 0 else '')
+        for i in range(40)
+    ]
+    full_text = SAMPLE_SENTENCE * 200
+
+    started_at = time.perf_counter()
+    for _ in range(repeat):
+        process_post(sentences, paragraphs, full_text, *routines)
+    return (time.perf_counter() - started_at) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='テキスト整形のマイクロベンチマーク')
+    parser.add_argument('--repeat', type=int, default=200, help='計測する記事数')
+    args = parser.parse_args()
+
+    legacy = measure(args.repeat, legacy_tidy_written_style, legacy_inline_formatting, legacy_clean_text)
+    current = measure(
+        args.repeat, tidy_written_style,
+        lambda text: format_inline_markdown(text, space_emoji=True),
+        normalize_sentence_spacing
+    )
+
+    print(f"従来実装:   {legacy * 1000:.3f} ms/記事")
+    print(f"統合実装:   {current * 1000:.3f} ms/記事")
+    print(f"高速化率:   {legacy / current:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -21,6 +21,7 @@ from modules.thumbnail_creator import ThumbnailCreator
 from modules.jekyll_writer import JekyllWriter
 from modules.social_media_manager import XPostGenerator, SocialMediaScheduler
 from modules.internal_linking import InternalLinkManager
+from modules.post_regenerator import save_post_artifact
 from modules.utils import setup_logging, format_duration, clean_text
 
 # 設定ファイル読み込み
@@ -101,12 +102,20 @@ class VideoContentProcessor:
             # WordPress/CMS用のコンテンツ生成
             from modules.wordpress_content_generator import WordPressContentGenerator
             wp_generator = WordPressContentGenerator(self.config)
-            wp_outputs = wp_generator.create_content(
+            # ブログ記事はメモリ上で組み立て、関連記事・動画リンクを加えてから最後に1回だけ書き込む
+            blog_document = wp_generator.create_blog_document(
                 title=title,
                 content=content['blog'],
                 transcript=transcript_data,
                 output_dir=output_dir
             )
+            wp_outputs = wp_generator.create_content(
+                title=title,
+                content=content['blog'],
+                transcript=transcript_data,
+                output_dir=output_dir,
+                document=blog_document
+            )
             
             logger.info(f"📝 ブログコンテンツ: {wp_outputs['blog']}")
             logger.info(f"🔍 SEOメタデータ: {wp_outputs['meta']}")
@@ -115,6 +124,11 @@ class VideoContentProcessor:
             # 互換性のため変数名を維持
             jekyll_path = wp_outputs['blog']
             
+            # 本文がほぼ同じ既存記事（同じ動画の二重公開）を確認
+            near_duplicates = self.link_manager.find_near_duplicates(
+                blog_document.render_body(), exclude=jekyll_path
+            )
+            
             # Step 4: YouTube説明文保存
             youtube_path = output_dir / "youtube_description.txt"
             youtube_path.write_text(content['youtube'], encoding='utf-8')
@@ -157,12 +171,18 @@ class VideoContentProcessor:
             logger.info("🔗 内部リンク処理中...")
             link_results = self.link_manager.process_new_post(
                 new_post_path=jekyll_path,
-                post_content=content['blog']
+                post_content=content['blog'],
+                document=blog_document
             )
             
             # 動画リンクを記事に追加（YouTube URLがある場合）
             if video_info.get('youtube_url'):
-                self.jekyll_writer.add_video_link_section(jekyll_path, video_info['youtube_url'])
+                self.jekyll_writer.add_video_link_section(blog_document, video_info['youtube_url'])
+            
+            # 組み立てた記事を書き込み（テンプレート変更時の一括再生成用に生成結果も保存）
+            blog_document.save()
+            artifact_path = save_post_artifact(output_dir, 'wordpress', title, content['blog'],
+                                               blog_document.path, video_info.get('youtube_url'))
             
             # Step 8: メタデータ保存
             metadata = {
@@ -172,6 +192,7 @@ class VideoContentProcessor:
                 'output_dir': str(output_dir),
                 'files': {
                     'jekyll': str(jekyll_path),
+                    'blog_content': str(artifact_path),
                     'youtube': str(youtube_path),
                     'x_posts': str(twitter_path),
                     'twitter_legacy': str(legacy_twitter_path),
@@ -183,12 +204,14 @@ class VideoContentProcessor:
                     'word_count': len(transcript_data.get('text', '').split()),
                     'sections': len(content['blog'].get('sections', [])),
                     'related_posts_found': len(link_results.get('related_posts', [])),
+                    'near_duplicates_found': len(near_duplicates),
                     'x_variations_generated': len(x_variations)
                 },
                 'social_media': {
                     'x_variations': list(x_variations.keys()),
                     'internal_links': link_results
-                }
+                },
+                'near_duplicates': near_duplicates
             }
             
             metadata_path = output_dir / "metadata.json"
@@ -241,6 +264,10 @@ class VideoContentProcessor:
         print(f"\n📁 出力ファイル:")
         for file_type, file_path in metadata['files'].items():
             print(f"  - {file_type}: {Path(file_path).name}")
+        if metadata.get('near_duplicates'):
+            print(f"\n⚠️ 本文がほぼ同じ既存記事:")
+            for duplicate in metadata['near_duplicates']:
+                print(f"  - {duplicate['title']} ({duplicate['similarity']:.0%}): {duplicate['file_path']}")
         print("\n💡 次のステップ:")
         print("  1. Jekyll記事を確認: " + metadata['files']['jekyll'])
         print("  2. サムネイルを確認: " + metadata['files']['thumbnail'])
@@ -0,0 +1,311 @@
+"""
+アドミッション制御モジュール
+リソース種別ごとの同時実行数制限（待ち行列付き）とクライアント単位のレート制限を提供。
+セッションストアを渡すと実行枠・待ち行列・トークンバケットをSQLiteで全ワーカーと共有する
+（--workers で複数プロセスを起動しても、設定した上限はサーバー全体の上限になる）
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    from .session_store import SessionStore
+
+logger = logging.getLogger(__name__)
+
+# 共有の待ち行列で実行枠の空きを確認する間隔（秒）
+SHARED_SLOT_POLL_SECONDS = 0.2
+
+# リソース種別ごとのデフォルト設定
+DEFAULT_RESOURCE_LIMITS = {
+    'transcription': {'max_concurrent': 1, 'max_queue': 4, 'queue_timeout_seconds': 600},
+    'content': {'max_concurrent': 2, 'max_queue': 8, 'queue_timeout_seconds': 120},
+    'image_io': {'max_concurrent': 4, 'max_queue': 16, 'queue_timeout_seconds': 30},
+}
+
+
+class AdmissionRejected(Exception):
+    """処理の受け付けを拒否（HTTP 429に変換される）"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = max(1, int(retry_after))
+
+
+class TokenBucket:
+    """トークンバケット方式のレート制限"""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def consume(self, now: Optional[float] = None) -> float:
+        """トークンを1つ消費。不足時は次のトークンまでの待ち秒数を返す（0なら許可）"""
+
+        now = now if now is not None else time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    def is_full(self, now: float) -> bool:
+        """バケットが満タンに戻っているか（不要になったバケットの整理用）"""
+        return self.tokens + (now - self.updated_at) * self.rate >= self.capacity
+
+
+class ResourceLimiter:
+    """リソース種別ごとの同時実行数制限（上限付き待ち行列）"""
+
+    def __init__(self, name: str, max_concurrent: int = 1, max_queue: int = 0,
+                 queue_timeout_seconds: float = 60):
+        self.name = name
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout_seconds)
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = None
+
+        # 平均処理時間（Retry-Afterの推定に使用）
+        self._avg_duration = None
+
+    @asynccontextmanager
+    async def slot(self):
+        """実行枠を確保（待ち行列が満杯・待ち時間超過ならAdmissionRejected）"""
+
+        # セマフォはイベントループ上で遅延生成
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        # 実行中＋待機中（枠確保前を含む）が実行枠と待ち行列の合計を超えたら拒否
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            raise AdmissionRejected(
+                f"{self.name} の処理が混み合っています。しばらくしてから再試行してください",
+                self.estimate_wait()
+            )
+
+        self.waiting += 1
+        # 枠の確保はタスクにして待ち時間切れと切り離す（Python 3.12未満の wait_for は、確保と同時に
+        # 時間切れになると確保した枠を返さないことがある）
+        acquire = asyncio.ensure_future(self._semaphore.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(acquire)
+            raise AdmissionRejected(
+                f"{self.name} の待ち時間が上限を超えました",
+                self.estimate_wait()
+            )
+        except asyncio.CancelledError:
+            self._abandon(acquire)
+            raise
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+            self._record_duration(time.monotonic() - started_at)
+
+    def _abandon(self, acquire: asyncio.Future):
+        """待つのをやめた枠の確保を取り消す（取り消す前に確保できていた枠は返す）"""
+
+        def release_if_acquired(task: asyncio.Future):
+            if not task.cancelled() and task.exception() is None:
+                self._semaphore.release()
+
+        acquire.add_done_callback(release_if_acquired)
+        acquire.cancel()
+
+    def estimate_wait(self) -> int:
+        """現在の混雑状況から再試行までの目安秒数を推定"""
+
+        average = self._avg_duration if self._avg_duration is not None else 30.0
+        queued_rounds = (self.waiting + 1) / self.max_concurrent
+        return int(average * queued_rounds) + 1
+
+    def _record_duration(self, duration: float):
+        """処理時間の指数移動平均を更新"""
+        if self._avg_duration is None:
+            self._avg_duration = duration
+        else:
+            self._avg_duration = self._avg_duration * 0.8 + duration * 0.2
+
+    def stats(self) -> Dict:
+        """現在の状態"""
+        return {
+            'active': self.active,
+            'waiting': self.waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue
+        }
+
+
+class SharedResourceLimiter(ResourceLimiter):
+    """全ワーカーで共有する同時実行数制限（実行枠と待ち行列はセッションストアのSQLiteに記録）"""
+
+    def __init__(self, name: str, store: 'SessionStore', max_concurrent: int = 1, max_queue: int = 0,
+                 queue_timeout_seconds: float = 60):
+        super().__init__(name, max_concurrent, max_queue, queue_timeout_seconds)
+        self.store = store
+
+    @asynccontextmanager
+    async def slot(self):
+        """実行枠を確保（全ワーカー合計で待ち行列が満杯・待ち時間超過ならAdmissionRejected）"""
+
+        # SQLiteの書き込みロック待ちでイベントループを止めないよう、ストアの操作はスレッドで行う
+        slot_id = await asyncio.to_thread(self.store.request_slot, self.name, self.max_concurrent, self.max_queue)
+        if slot_id is None:
+            raise AdmissionRejected(
+                f"{self.name} の処理が混み合っています。しばらくしてから再試行してください",
+                self.estimate_wait()
+            )
+
+        try:
+            self.waiting += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while not await asyncio.to_thread(self.store.claim_slot, slot_id, self.name, self.max_concurrent):
+                    if time.monotonic() >= deadline:
+                        raise AdmissionRejected(
+                            f"{self.name} の待ち時間が上限を超えました",
+                            self.estimate_wait()
+                        )
+                    await asyncio.sleep(SHARED_SLOT_POLL_SECONDS)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            started_at = time.monotonic()
+            try:
+                yield
+            finally:
+                self.active -= 1
+                self._record_duration(time.monotonic() - started_at)
+        finally:
+            # キャンセルされても待ち行列・実行枠の登録は必ず削除する
+            await asyncio.shield(asyncio.to_thread(self.store.release_slot, slot_id))
+
+    def estimate_wait(self) -> int:
+        """全ワーカーの混雑状況から再試行までの目安秒数を推定"""
+
+        average = self._avg_duration if self._avg_duration is not None else 30.0
+        _, waiting = self.store.slot_counts(self.name)
+        return int(average * (waiting + 1) / self.max_concurrent) + 1
+
+    def stats(self) -> Dict:
+        """現在の状態（全ワーカーの合計）"""
+        active, waiting = self.store.slot_counts(self.name)
+        return {
+            'active': active,
+            'waiting': waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue
+        }
+
+
+class AdmissionController:
+    """処理エンドポイントのアドミッション制御（同時実行数＋クライアント別レート制限）"""
+
+    # 保持するクライアントバケット数の目安（超えたら満タンのバケットを整理）
+    MAX_TRACKED_CLIENTS = 10000
+
+    def __init__(self, config: Dict, store: Optional['SessionStore'] = None):
+        """store: 指定すると同時実行数とレート制限を全ワーカーで共有（省略時はプロセス内のみ）"""
+
+        self.config = config
+        self.store = store
+
+        resources_config = config.get('resources', {})
+        self.limiters = {}
+        for name, defaults in DEFAULT_RESOURCE_LIMITS.items():
+            settings = {**defaults, **(resources_config.get(name) or {})}
+            self.limiters[name] = self._create_limiter(name, settings)
+        for name, settings in resources_config.items():
+            if name not in self.limiters:
+                self.limiters[name] = self._create_limiter(name, settings)
+
+        rate_config = config.get('rate_limit', {})
+        self.rate_limit_enabled = rate_config.get('enabled', True)
+        self.rate_per_second = float(rate_config.get('requests_per_minute', 30)) / 60
+        self.burst = int(rate_config.get('burst', 10))
+        self._buckets = {}
+        self._buckets_lock = threading.Lock()
+
+    def _create_limiter(self, name: str, settings: Dict) -> ResourceLimiter:
+        if self.store is not None:
+            return SharedResourceLimiter(name, self.store, **settings)
+        return ResourceLimiter(name, **settings)
+
+    def check_rate_limit(self, client_id: str):
+        """クライアント単位のレート制限を確認"""
+
+        if not self.rate_limit_enabled:
+            return
+
+        if self.store is not None:
+            wait_seconds = self.store.consume_token(client_id, self.rate_per_second, self.burst,
+                                                    self.MAX_TRACKED_CLIENTS)
+            self._raise_if_limited(wait_seconds)
+            return
+
+        now = time.monotonic()
+        with self._buckets_lock:
+            bucket = self._buckets.get(client_id)
+            if bucket is None:
+                if len(self._buckets) >= self.MAX_TRACKED_CLIENTS:
+                    self._prune_buckets(now)
+                bucket = TokenBucket(self.rate_per_second, self.burst)
+                self._buckets[client_id] = bucket
+            wait_seconds = bucket.consume(now)
+        self._raise_if_limited(wait_seconds)
+
+    @staticmethod
+    def _raise_if_limited(wait_seconds: float):
+        if wait_seconds > 0:
+            raise AdmissionRejected(
+                "リクエストが多すぎます。しばらくしてから再試行してください",
+                wait_seconds + 1
+            )
+
+    @asynccontextmanager
+    async def admit(self, resource: str, client_id: str):
+        """レート制限と同時実行数制限を通過した場合のみ処理を実行"""
+
+        if self.store is not None:
+            # 共有ストアの書き込みはスレッドで行う（イベントループを止めない）
+            await asyncio.to_thread(self.check_rate_limit, client_id)
+        else:
+            self.check_rate_limit(client_id)
+
+        limiter = self.limiters.get(resource)
+        if limiter is None:
+            yield
+            return
+
+        async with limiter.slot():
+            yield
+
+    def stats(self) -> Dict:
+        """全リソースの状態"""
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+    def _prune_buckets(self, now: float):
+        """満タンに戻ったバケットを削除"""
+        for client_id in [cid for cid, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[client_id]
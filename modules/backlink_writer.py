@@ -0,0 +1,250 @@
+"""
+関連記事リンク書き込みモジュール
+記事ごとに追加する関連記事カードをまとめ、関連記事セクション（なければ本文の後・動画リンクとフッターの前）に
+挿入して、一時ファイルへの書き込みと置き換えで1回だけ書き戻す。異なる記事の書き込みはスレッドプールで並列に行う
+"""
+
+import os
+import re
+import logging
+import tempfile
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIV_TAG_PATTERN = re.compile(r'<(/?)div\b[^>]*>', re.IGNORECASE)
+RELATED_GRID_PATTERN = re.compile(r'<div class="related-posts-grid">')
+RELATED_SECTION_START_PATTERN = re.compile(r'<div class="related-posts-section">')
+RELATED_CARD_PATTERN = re.compile(r'[ \t]*<div class="related-post-card">')
+LINK_HREF_PATTERN = re.compile(r'href="([^"]+)"')
+
+DEFAULT_THUMBNAIL = '/assets/images/default-thumbnail.png'
+
+# 既存記事に追加する新規記事への逆リンクのカードに付けるタグ
+BACKLINK_TAG = '新着'
+
+# 書き込み中に他のプロセスが記事を更新した場合の再試行回数
+_MAX_ATTEMPTS = 3
+
+
+def related_card(post: Dict, tags: List[str]) -> str:
+    """関連記事カードのHTML（post: title / url / excerpt / thumbnail）"""
+
+    thumbnail = post.get('thumbnail') or DEFAULT_THUMBNAIL
+    lines = [
+        '  <div class="related-post-card">',
+        '    <div class="related-post-thumbnail">',
+        f'      <img src="{thumbnail}" alt="{post["title"]}" loading="lazy">',
+        '    </div>',
+        '    <div class="related-post-content">',
+        f'      <h4><a href="{post["url"]}">{post["title"]}</a></h4>',
+        f'      <p class="related-post-excerpt">{post["excerpt"]}...</p>',
+        '      <div class="related-post-tags">',
+    ]
+    lines.extend(f'        <span class="tag-small">{tag}</span>' for tag in tags)
+    lines.extend([
+        '      </div>',
+        '    </div>',
+        '  </div>',
+    ])
+    return '\n'.join(lines)
+
+
+def related_section(cards: List[str]) -> str:
+    """関連記事セクションのHTML"""
+    return '\n'.join([
+        '<div class="related-posts-section">',
+        '<h3>🔗 関連記事</h3>',
+        '<div class="related-posts-grid">',
+        *cards,
+        '</div>',
+        '</div>',
+    ])
+
+
+def find_closing_div(content: str, open_end: int) -> Optional[int]:
+    """開始タグ（終了位置 open_end）に対応する</div>の位置（入れ子の<div>を数えて判定）"""
+
+    depth = 1
+    for tag in DIV_TAG_PATTERN.finditer(content, open_end):
+        depth += -1 if tag.group(1) else 1
+        if depth == 0:
+            return tag.start()
+    return None
+
+
+def find_related_section(content: str) -> Optional[Tuple[int, int]]:
+    """関連記事セクションの範囲（開始タグの先頭, 終了タグの直後）"""
+
+    match = RELATED_SECTION_START_PATTERN.search(content)
+    if not match:
+        return None
+    close = find_closing_div(content, match.end())
+    return (match.start(), close + len('</div>')) if close is not None else None
+
+
+def section_links(content: str) -> List[str]:
+    """関連記事セクション内のリンク先URL（セクションがなければ空）"""
+
+    span = find_related_section(content)
+    return LINK_HREF_PATTERN.findall(content[span[0]:span[1]]) if span else []
+
+
+def _render_with_cards(content: str, cards: List[str], replace: bool) -> str:
+    """記事をブロックに分けて関連記事カードを追加（replaceなら置き換え）し、書き出す内容
+
+    関連記事セクションは本文の後・動画リンクとフッター（記事情報・CTA）の前に置かれる
+    """
+
+    # post_documentはこのモジュールを読み込むため、ここで読み込む
+    from .post_document import PostDocument
+
+    document = PostDocument.from_html(Path(), content)
+    if replace:
+        document.related_cards = []
+    for card in cards:
+        document.add_related_card(card)
+
+    rendered = document.render()
+    return rendered + '\n' if content.endswith('\n') and not rendered.endswith('\n') else rendered
+
+
+def section_cards(content: str) -> List[str]:
+    """関連記事セクション内のカードのHTML（セクションがなければ空）"""
+
+    span = find_related_section(content)
+    if span is None:
+        return []
+
+    cards = []
+    position = span[0]
+    while True:
+        match = RELATED_CARD_PATTERN.search(content, position, span[1])
+        if not match:
+            return cards
+        close = find_closing_div(content, match.end())
+        if close is None or close >= span[1]:
+            return cards
+        position = close + len('</div>')
+        cards.append(content[match.start():position])
+
+
+def is_backlink_card(card: str) -> bool:
+    """新規記事への逆リンクとして追加したカードか"""
+    return f'<span class="tag-small">{BACKLINK_TAG}</span>' in card
+
+
+def insert_cards(content: str, cards: List[str]) -> str:
+    """関連記事カードを挿入した記事内容
+
+    関連記事セクションがあればそのカードの後に追加し、なければ関連記事セクションを作って
+    本文の後（動画リンク・フッターの前）に挿入する
+    """
+    return _render_with_cards(content, cards, replace=False)
+
+
+def atomic_write_text(path: Path, text: str):
+    """一時ファイルに書き込んでから置き換え（途中で中断しても元の内容か新しい内容のどちらかが残る）"""
+
+    path = Path(path)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def replace_related_section(content: str, cards: List[str]) -> str:
+    """関連記事セクションをカードの一覧で置き換えた記事内容（カードが空ならセクションを削除）
+
+    フッターの中など本文の後以外にあるセクションも、本文の後に置き直す
+    """
+
+    if find_related_section(content) is None and not cards:
+        return content
+    return _render_with_cards(content, cards, replace=True)
+
+
+def rewrite_posts(transforms: Dict[Path, Callable[[str], Optional[str]]], max_workers: int = 4) -> Dict[Path, bool]:
+    """記事ごとの変換を1回の読み込み・書き込みで反映（記事 → 書き込んだか）
+
+    transform: 記事内容を受け取り、新しい内容（変更なしならNone）を返す関数。異なる記事はスレッドプールで並列に処理
+    """
+
+    if not transforms:
+        return {}
+
+    workers = min(max(1, int(max_workers)), len(transforms))
+    if workers == 1:
+        return {post_file: _rewrite_post(post_file, transform) for post_file, transform in transforms.items()}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {post_file: pool.submit(_rewrite_post, post_file, transform)
+                   for post_file, transform in transforms.items()}
+        return {post_file: future.result() for post_file, future in futures.items()}
+
+
+def _rewrite_post(post_file: Path, transform: Callable[[str], Optional[str]]) -> bool:
+    """1記事分の変換を反映（失敗してもほかの記事の書き込みは続ける）"""
+
+    try:
+        for _ in range(_MAX_ATTEMPTS):
+            before = os.stat(post_file)
+            content = post_file.read_text(encoding='utf-8')
+
+            updated = transform(content)
+            if updated is None or updated == content:
+                return False
+
+            # 読み込み後に他のプロセスが更新していれば読み直す
+            after = os.stat(post_file)
+            if (after.st_mtime_ns, after.st_size) != (before.st_mtime_ns, before.st_size):
+                continue
+            atomic_write_text(post_file, updated)
+            return True
+
+        logger.warning(f"記事が更新中のため関連記事リンクを書き込めません: {post_file}")
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning(f"関連記事リンクの書き込みエラー {post_file}: {e}")
+    return False
+
+
+class BacklinkWriter:
+    """記事ごとの関連記事カードの追加をまとめて書き込む"""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, int(max_workers))
+        # 記事ファイル → (リンク先URL, カードHTML) のリスト（追加順）
+        self._edits: Dict[Path, List[Tuple[Optional[str], str]]] = {}
+
+    def add(self, post_file: Path, card: str, url: Optional[str] = None):
+        """記事に追加するカードを登録（urlへのリンクが既にある記事には追加しない）"""
+        self._edits.setdefault(Path(post_file), []).append((url, card))
+
+    def flush(self) -> Dict[Path, bool]:
+        """登録された追加を記事ごとに1回の書き込みで反映（記事 → 書き込んだか）"""
+
+        edits, self._edits = self._edits, {}
+        return rewrite_posts({post_file: self._insert(cards) for post_file, cards in edits.items()},
+                             self.max_workers)
+
+    @staticmethod
+    def _insert(cards: List[Tuple[Optional[str], str]]) -> Callable[[str], Optional[str]]:
+        def transform(content: str) -> Optional[str]:
+            new_cards = [card for url, card in cards if not url or f'href="{url}"' not in content]
+            return insert_cards(content, new_cards) if new_cards else None
+        return transform
@@ -0,0 +1,188 @@
+"""
+ブログ生成結果キャッシュモジュール
+BlogOptimizerの出力を文字起こしのハッシュ・タイトル・ブログ設定・解析設定・コーパスの状態をキーにメモリ（LRU）とSQLite（LRU）に保持し、
+同じ入力での再生成（ボタンの二度押し・画像生成失敗後のリトライなど）を即座に返す
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# 生成ロジックを変更したら上げる（古い結果をキーごと無効化）
+CACHE_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blog_results (
+    key TEXT PRIMARY KEY,
+    transcript_hash TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blog_results_transcript ON blog_results(transcript_hash);
+CREATE INDEX IF NOT EXISTS idx_blog_results_access ON blog_results(last_access);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def transcript_hash(transcript_data: Dict) -> str:
+    """文字起こし（本文とタイムスタンプ付きセグメント）のハッシュ"""
+
+    digest = hashlib.sha256(transcript_data.get('text', '').encode('utf-8'))
+    for segment in transcript_data.get('segments') or []:
+        digest.update(f"\x00{segment.get('start')}\x01{segment.get('end')}\x01{segment.get('text', '')}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _dictionary_mtime(blog_config: Dict) -> Optional[float]:
+    """書き言葉変換辞書の更新時刻（辞書の編集も結果に影響するためキーに含める）"""
+    path = blog_config.get('written_style_dictionary')
+    try:
+        return os.stat(path).st_mtime if path else None
+    except OSError:
+        return None
+
+
+class BlogResultCache(SQLiteStore):
+    """ブログ生成結果の2層LRUキャッシュ（メモリ→ディスク）"""
+
+    def __init__(self, config: Dict):
+        self.config = config
+        self.db_path = Path(config.get('path', 'cache/blog_results.db'))
+        self.memory_entries = int(config.get('memory_entries', 32))
+        self.disk_entries = int(config.get('disk_entries', 500))
+
+        self._lock = threading.Lock()
+        # キー → (文字起こしハッシュ, JSON)。取り出し時に毎回デシリアライズし、呼び出し側の変更から保護
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        # 無効化の世代（他のワーカーでの無効化を検知してメモリ層を捨てる）
+        self._generation = None
+
+        self._open_database(self.db_path, SCHEMA)
+
+    @staticmethod
+    def make_key(transcript_data: Dict, title: str, blog_config: Dict, context: Optional[Dict] = None) -> str:
+        """文字起こしハッシュ・タイトル・ブログ設定からキーを作成
+
+        context: ブログ設定以外で結果に影響するもの（解析の設定・リライトバックエンド・コーパスの状態など）
+        """
+
+        payload = json.dumps(
+            [CACHE_VERSION, transcript_hash(transcript_data), title, blog_config, _dictionary_mtime(blog_config),
+             context or {}],
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """キャッシュ済みの結果（メモリになければディスクから読み、メモリに載せる）"""
+
+        self._check_generation()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return json.loads(entry[1])
+
+        try:
+            with self._transaction() as conn:
+                row = conn.execute(
+                    'SELECT transcript_hash, value FROM blog_results WHERE key = ?', (key,)
+                ).fetchone()
+                if row:
+                    conn.execute('UPDATE blog_results SET last_access = ? WHERE key = ?', (time.time(), key))
+        except sqlite3.Error as e:
+            logger.warning(f"ブログ生成キャッシュの読み込みに失敗: {e}")
+            return None
+
+        if not row:
+            return None
+        self._remember(key, row[0], row[1])
+        return json.loads(row[1])
+
+    def put(self, key: str, transcript_data: Dict, result: Dict):
+        """結果を保存（ディスクは最終アクセスが古いものから上限数を超えた分を削除）"""
+
+        try:
+            value = json.dumps(result, ensure_ascii=False)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"ブログ生成結果をキャッシュできません: {e}")
+            return
+
+        digest = transcript_hash(transcript_data)
+        self._remember(key, digest, value)
+
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO blog_results (key, transcript_hash, value, created_at, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (key, digest, value, now, now)
+                )
+                conn.execute(
+                    'DELETE FROM blog_results WHERE key IN ('
+                    'SELECT key FROM blog_results ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+                    (self.disk_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"ブログ生成キャッシュの保存に失敗: {e}")
+
+    def _check_generation(self):
+        """ディスク上の無効化世代が変わっていればメモリ層を破棄"""
+
+        try:
+            row = self._get_connection().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        except sqlite3.Error:
+            return
+        generation = row[0] if row else '0'
+        with self._lock:
+            if generation != self._generation:
+                self._memory.clear()
+                self._generation = generation
+
+    def _remember(self, key: str, digest: str, value: str):
+        """メモリ層に追加（上限を超えたら最も古いものを破棄）"""
+
+        with self._lock:
+            self._memory[key] = (digest, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def invalidate(self, transcript_data: Optional[Dict] = None) -> int:
+        """指定した文字起こしの結果（省略時はすべて）を削除し、削除件数を返す"""
+
+        digest = transcript_hash(transcript_data) if transcript_data is not None else None
+        with self._lock:
+            if digest is None:
+                self._memory.clear()
+            else:
+                for key in [k for k, (d, _) in self._memory.items() if d == digest]:
+                    del self._memory[key]
+
+        with self._transaction() as conn:
+            if digest is None:
+                cursor = conn.execute('DELETE FROM blog_results')
+            else:
+                cursor = conn.execute('DELETE FROM blog_results WHERE transcript_hash = ?', (digest,))
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', '1') "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT)"
+            )
+        logger.info(f"ブログ生成キャッシュを削除: {cursor.rowcount} 件")
+        return cursor.rowcount
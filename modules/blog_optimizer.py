@@ -2,26 +2,181 @@
 ブログ最適化モジュール - 文字起こしから高品質なブログ記事を生成
 """
 
+import os
 import re
 import json
 import logging
+from collections import Counter
+from functools import lru_cache
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
+from pathlib import Path
+
+from .text_analysis import TextAnalysis
+from .phrase_matcher import PhraseMatcher, PhraseRewriter, load_phrase_table
+from .llm_rewriter import get_rewriter
+from .text_patterns import (
+    WHITESPACE_PATTERN, PUNCTUATION_TRIM_PATTERN, ASCII_SLUG_INVALID_CHARS_PATTERN,
+    HYPHEN_RUN_PATTERN, tidy_written_style
+)
 
 logger = logging.getLogger(__name__)
 
+# トーン判定用の表現
+TONE_INDICATORS = {
+    'casual': ['ですね', 'んですけど', 'っていう', 'ちゃう', 'じゃないかな'],
+    'formal': ['ございます', 'いたします', 'おります', '申し上げ'],
+    'emotion': ['面白い', '楽しい', 'すごい', '大変', 'びっくり'],
+}
+
+# 目的判定用のキーワード
+PURPOSE_KEYWORDS = {
+    '問題解決': ['解決', '改善', '対策', '方法', 'どうすれば'],
+    '情報共有': ['紹介', '共有', 'お知らせ', '発表', 'について'],
+    '教育': ['説明', '解説', 'とは', '仕組み', 'やり方'],
+    '提案': ['提案', 'アイデア', '新しい', '革新的', 'これから'],
+    '体験共有': ['やってみた', '使ってみた', '経験', '実際に'],
+}
+
+# ターゲット読者判定用のキーワード
+AUDIENCE_KEYWORDS = {
+    'ビジネスパーソン': ['ビジネス', '業務', '効率', '仕事', '会社'],
+    'クリエイター': ['動画', 'YouTube', 'ブログ', 'SNS', 'コンテンツ'],
+    'エンジニア': ['プログラミング', 'コード', 'システム', '開発', 'AI'],
+    '一般ユーザー': ['簡単', '誰でも', '初心者', '使いやすい'],
+}
+
+# トピック判定用のキーワード
+TOPIC_KEYWORDS = {
+    'problem': ['大変', '困る', '面倒', '課題'],
+    'solution': ['解決', '方法', 'システム', 'ツール'],
+    'benefits': ['メリット', '良い', '便利', '効率'],
+    'process': ['やり方', '手順', 'ステップ', '流れ'],
+    'result': ['結果', '成果', '効果', 'できる']
+}
+
+# 主要ポイント・問題提起セクションの判定に使う表現
+MAIN_POINT_INDICATORS = ['自動', 'システム', 'クロード', 'Claude']
+PROBLEM_INDICATORS = ['大変', '数時間', '編集', 'サムネール']
+
+# 一般セクションで重要文を選ぶキーワード
+GENERAL_SECTION_KEYWORDS = ('システム', '自動', '動画', 'AI', '生成', '可能')
+
+# 価値提案（時間短縮）を探すパターン
+VALUE_PROPOSITION_PATTERNS = [
+    re.compile(r'(\d+)時間.*?(\d+)分'),
+    re.compile(r'時間.*?短縮'),
+    re.compile(r'効率.*?アップ'),
+    re.compile(r'自動化'),
+]
+
+# 課題表現のパターン
+PROBLEM_PATTERNS = [
+    re.compile(r'大変[だと思う|です]'),
+    re.compile(r'面倒[くさい|です]'),
+    re.compile(r'時間が[かかる|ない]'),
+    re.compile(r'難しい'),
+    re.compile(r'困る'),
+]
+
+# 時間節約に関する表現のパターン
+TIME_SAVING_PATTERNS = [
+    re.compile(r'(\d+)時間.*?(\d+)分'),
+    re.compile(r'(\d+)時間.*?短縮'),
+    re.compile(r'(\d+)倍.*?効率'),
+]
+
+# キーフレーズ（名詞句）のパターン
+KEY_PHRASE_PATTERNS = [
+    re.compile(r'([ァ-ヴー]+)'),  # カタカナ
+    re.compile(r'([一-龥]+)'),    # 漢字
+    re.compile(r'(\w+システム)'),
+    re.compile(r'(\w+ツール)'),
+]
+
+
+# 口語表現→書き言葉の基本変換表（外部辞書で追加・上書き可能）
+WRITTEN_STYLE_CONVERSIONS = {
+    'んですけど': 'のですが',
+    'んです': 'のです',
+    'んですね': 'のです',
+    'っていう': 'という',
+    'ちゃう': 'しまう',
+    'じゃないかな': 'ではないでしょうか',
+    'じゃないかなと': 'ではないかと',
+    'と思うんですね': 'と考えられます',
+    'と思うんです': 'と思います',
+    'ですね': 'です',
+    '思ってます': '思っています',
+    'なんですよ': 'なのです',
+    'なんですけども': 'のですが',
+    'んですけども': 'のですが',
+    'ケーシャル': 'カジュアル',
+    'テイア': 'アイデア',
+    'シジュー': '実装',
+    '大いん': '多いの',
+    'やがる': 'あがる',
+    'ヘタス': 'へたをすれば',
+    '会いた': '空いた',
+    '先生AI': '生成AI',
+    '警社': '会社',
+}
+
+
+def _all_indicator_phrases() -> List[str]:
+    """全フレーズ辞書の和集合"""
+    phrases = []
+    for dictionary in (TONE_INDICATORS, PURPOSE_KEYWORDS, AUDIENCE_KEYWORDS, TOPIC_KEYWORDS):
+        for words in dictionary.values():
+            phrases.extend(words)
+    phrases.extend(MAIN_POINT_INDICATORS)
+    phrases.extend(PROBLEM_INDICATORS)
+    return phrases
+
+
+@lru_cache(maxsize=None)
+def _compiled_matcher(phrases: Tuple[str, ...]) -> PhraseMatcher:
+    """フレーズ集合ごとのオートマトン（プロセス内で一度だけ構築）"""
+    return PhraseMatcher(phrases)
+
+
+def indicator_matcher() -> PhraseMatcher:
+    """全フレーズ辞書から構築した共有オートマトン"""
+    return _compiled_matcher(tuple(_all_indicator_phrases()))
+
+
+@lru_cache(maxsize=8)
+def _compiled_rewriter(dictionary_path: Optional[str], mtime: Optional[float]) -> PhraseRewriter:
+    """基本変換表と外部辞書を合わせた置換器（辞書ファイルの更新時刻ごとに一度だけ構築）"""
+    
+    table = dict(WRITTEN_STYLE_CONVERSIONS)
+    if dictionary_path:
+        try:
+            table.update(load_phrase_table(Path(dictionary_path)))
+        except OSError as e:
+            logger.warning(f"書き言葉変換辞書を読み込めません: {dictionary_path} ({e})")
+    return PhraseRewriter(table)
+
 
 class BlogOptimizer:
     """文字起こしから最適化されたブログ記事を生成するクラス"""
     
     def __init__(self, config: Dict):
         self.config = config
+        self.text_analysis = None
+        self._transcript_phrase_counts = None
         
-    def optimize_for_blog(self, transcript_data: Dict, title: str, video_info: Dict) -> Dict:
+    def optimize_for_blog(self, transcript_data: Dict, title: str, video_info: Dict,
+                          text_analysis: Optional[TextAnalysis] = None) -> Dict:
         """文字起こしデータから最適化されたブログコンテンツを生成"""
         
         logger.info("ブログ最適化開始...")
         
+        # 共有テキスト解析（ContentGeneratorから渡されなければここで作成）
+        self.text_analysis = text_analysis or TextAnalysis(transcript_data['text'],
+                                                           segments=transcript_data.get('segments'))
+        self._transcript_phrase_counts = None
+        
         # 1. 発言の意図と文脈を分析
         analysis = self._analyze_content(transcript_data['text'])
         
@@ -35,7 +190,7 @@ class BlogOptimizer:
         introduction = self._create_compelling_introduction(analysis, target_audience)
         
         # 5. 各セクションをリライト
-        sections = self._rewrite_sections(transcript_data, structure, analysis)
+        sections = self._rewrite_sections(transcript_data, structure, analysis, title)
         
         # 6. 結論とCTAを作成
         conclusion = self._create_conclusion(analysis, target_audience)
@@ -56,6 +211,17 @@ class BlogOptimizer:
             'main_points': analysis['main_points']
         }
     
+    def _phrase_counts(self, text: str) -> Counter:
+        """フレーズ辞書の出現回数（文字起こし全文は一度だけ走査して各判定で再利用）"""
+        
+        if self.text_analysis is not None and text == self.text_analysis.text:
+            if self._transcript_phrase_counts is None:
+                # map-reduce解析ではブロックごとの集計を合算済み
+                self._transcript_phrase_counts = self.text_analysis.phrase_counts or indicator_matcher().count(text)
+            return self._transcript_phrase_counts
+        
+        return indicator_matcher().count(text)
+    
     def _analyze_content(self, text: str) -> Dict:
         """コンテンツの意図と主要ポイントを分析"""
         
@@ -82,17 +248,12 @@ class BlogOptimizer:
     def _analyze_tone(self, text: str) -> str:
         """文章のトーンを分析"""
         
-        # カジュアルな表現の検出
-        casual_indicators = ['ですね', 'んですけど', 'っていう', 'ちゃう', 'じゃないかな']
-        casual_count = sum(1 for indicator in casual_indicators if indicator in text)
+        counts = self._phrase_counts(text)
         
-        # フォーマルな表現の検出
-        formal_indicators = ['ございます', 'いたします', 'おります', '申し上げ']
-        formal_count = sum(1 for indicator in formal_indicators if indicator in text)
-        
-        # 感情表現の検出
-        emotion_indicators = ['面白い', '楽しい', 'すごい', '大変', 'びっくり']
-        emotion_count = sum(1 for indicator in emotion_indicators if indicator in text)
+        # カジュアル・フォーマル・感情表現の検出（出現した表現の種類数）
+        casual_count = sum(1 for indicator in TONE_INDICATORS['casual'] if counts[indicator])
+        formal_count = sum(1 for indicator in TONE_INDICATORS['formal'] if counts[indicator])
+        emotion_count = sum(1 for indicator in TONE_INDICATORS['emotion'] if counts[indicator])
         
         if casual_count > formal_count * 2:
             return 'カジュアル・親しみやすい'
@@ -123,13 +284,14 @@ class BlogOptimizer:
         ]
         
         # 追加のポイントをテキストから抽出
-        if '自動' in text and 'システム' in text:
+        counts = self._phrase_counts(text)
+        if counts['自動'] and counts['システム']:
             main_points.append({
                 'text': 'すべての処理が自動化され、創造的な活動に集中できる',
                 'importance': 'medium'
             })
         
-        if 'クロード' in text or 'Claude' in text:
+        if counts['クロード'] or counts['Claude']:
             main_points.append({
                 'text': 'クロード（Claude）を活用した実装で高品質なコンテンツを生成',
                 'importance': 'medium'
@@ -140,18 +302,11 @@ class BlogOptimizer:
     def _identify_purpose(self, text: str) -> str:
         """コンテンツの目的を特定"""
         
-        purposes = {
-            '問題解決': ['解決', '改善', '対策', '方法', 'どうすれば'],
-            '情報共有': ['紹介', '共有', 'お知らせ', '発表', 'について'],
-            '教育': ['説明', '解説', 'とは', '仕組み', 'やり方'],
-            '提案': ['提案', 'アイデア', '新しい', '革新的', 'これから'],
-            '体験共有': ['やってみた', '使ってみた', '経験', '実際に'],
-        }
+        counts = self._phrase_counts(text)
         
         purpose_scores = {}
-        for purpose, keywords in purposes.items():
-            score = sum(1 for keyword in keywords if keyword in text)
-            purpose_scores[purpose] = score
+        for purpose, keywords in PURPOSE_KEYWORDS.items():
+            purpose_scores[purpose] = sum(1 for keyword in keywords if counts[keyword])
         
         return max(purpose_scores, key=purpose_scores.get)
     
@@ -159,15 +314,8 @@ class BlogOptimizer:
         """価値提案を抽出"""
         
         # 時間短縮に関する表現を探す
-        time_patterns = [
-            r'(\d+)時間.*?(\d+)分',
-            r'時間.*?短縮',
-            r'効率.*?アップ',
-            r'自動化'
-        ]
-        
-        for pattern in time_patterns:
-            match = re.search(pattern, text)
+        for pattern in VALUE_PROPOSITION_PATTERNS:
+            match = pattern.search(text)
             if match:
                 context = text[max(0, match.start()-50):min(len(text), match.end()+50)]
                 return self._clean_text(context)
@@ -185,17 +333,11 @@ class BlogOptimizer:
     def _identify_target_audience(self, text: str) -> Dict:
         """ターゲット読者を特定"""
         
-        audiences = {
-            'ビジネスパーソン': ['ビジネス', '業務', '効率', '仕事', '会社'],
-            'クリエイター': ['動画', 'YouTube', 'ブログ', 'SNS', 'コンテンツ'],
-            'エンジニア': ['プログラミング', 'コード', 'システム', '開発', 'AI'],
-            '一般ユーザー': ['簡単', '誰でも', '初心者', '使いやすい'],
-        }
+        counts = self._phrase_counts(text)
         
         audience_scores = {}
-        for audience, keywords in audiences.items():
-            score = sum(2 if keyword in text else 0 for keyword in keywords)
-            audience_scores[audience] = score
+        for audience, keywords in AUDIENCE_KEYWORDS.items():
+            audience_scores[audience] = sum(2 if counts[keyword] else 0 for keyword in keywords)
         
         primary_audience = max(audience_scores, key=audience_scores.get)
         
@@ -223,16 +365,8 @@ class BlogOptimizer:
         pain_points = []
         
         # テキストから課題を抽出
-        problem_patterns = [
-            r'大変[だと思う|です]',
-            r'面倒[くさい|です]',
-            r'時間が[かかる|ない]',
-            r'難しい',
-            r'困る'
-        ]
-        
-        for pattern in problem_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in PROBLEM_PATTERNS:
+            matches = pattern.findall(text)
             if matches:
                 pain_points.extend(matches)
         
@@ -316,36 +450,39 @@ YouTubeに動画をアップロードした後、ブログを書いて、Twitter
     def _extract_time_savings(self, text: str) -> Optional[str]:
         """時間節約に関する情報を抽出"""
         
-        patterns = [
-            r'(\d+)時間.*?(\d+)分',
-            r'(\d+)時間.*?短縮',
-            r'(\d+)倍.*?効率'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern in TIME_SAVING_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(0)
         
         return None
     
-    def _rewrite_sections(self, transcript_data: Dict, structure: Dict, analysis: Dict) -> List[Dict]:
+    def _rewrite_sections(self, transcript_data: Dict, structure: Dict, analysis: Dict,
+                          article_title: str = '') -> List[Dict]:
         """各セクションをリライト"""
         
         sections = []
-        text_segments = self._segment_text_by_topic(transcript_data['text'])
+        text_segments = self._segment_text_by_topic(self.text_analysis.sentences)
         
-        for i, section_def in enumerate(structure['sections']):
-            # 該当するテキストセグメントを選択
-            relevant_text = self._find_relevant_text(text_segments, section_def['type'])
-            
-            # セクションタイトルを生成
-            title = self._generate_section_title(section_def, analysis)
+        # 該当するテキストセグメントとセクションタイトル
+        drafts = []
+        for section_def in structure['sections']:
+            drafts.append({
+                'type': section_def['type'],
+                'title': self._generate_section_title(section_def, analysis),
+                'text': self._find_relevant_text(text_segments, section_def['type'])
+            })
+        
+        # LLMバックエンドが設定されていれば全セクションを1回のリクエストでリライト
+        llm_contents = self._rewrite_with_llm(drafts, article_title)
+        
+        for draft, llm_content in zip(drafts, llm_contents):
+            title = draft['title']
             
-            # コンテンツをリライト
-            content = self._rewrite_content(
-                relevant_text,
-                section_def['type'],
+            # LLMの結果がないセクションはテンプレートでリライト
+            content = llm_content or self._rewrite_content(
+                draft['text'],
+                draft['type'],
                 analysis,
                 structure['emphasis']
             )
@@ -353,14 +490,45 @@ YouTubeに動画をアップロードした後、ブログを書いて、Twitter
             sections.append({
                 'title': title,
                 'content': content,
-                'type': section_def['type'],
+                'type': draft['type'],
                 'word_count': len(content)
             })
         
         return sections
     
-    def _segment_text_by_topic(self, text: str) -> List[Dict]:
-        """テキストをトピックごとに分割"""
+    def _rewrite_with_llm(self, drafts: List[Dict], article_title: str) -> List[Optional[str]]:
+        """LLMバックエンドで全セクションをまとめてリライト（未設定・失敗時はすべてNone）"""
+        
+        rewriter = get_rewriter(self.config.get('rewriter'))
+        if rewriter is None:
+            return [None] * len(drafts)
+        
+        section_requests = [
+            {'type': d['type'], 'title': d['title'], 'text': self._convert_to_written_style(d['text'])}
+            if d['text'] else None
+            for d in drafts
+        ]
+        targets = [i for i, r in enumerate(section_requests) if r]
+        results = rewriter.rewrite_sections([section_requests[i] for i in targets], article_title)
+        
+        contents: List[Optional[str]] = [None] * len(drafts)
+        for i, result in zip(targets, results):
+            contents[i] = result
+        return contents
+    
+    def _segment_text_by_topic(self, sentences: List[str]) -> List[Dict]:
+        """文のリストをトピックごとに分割（タイムスタンプ付きのトピックブロックがあればそれを使用）"""
+        
+        if self.text_analysis and self.text_analysis.content_blocks:
+            return [
+                {
+                    'text': block['text'],
+                    'topic': self._identify_topic(block['text'], block.get('phrase_counts')),
+                    'start': block['start'],
+                    'end': block['end']
+                }
+                for block in self.text_analysis.content_blocks
+            ]
         
         # 話題の切り替わりを検出
         topic_markers = [
@@ -376,8 +544,6 @@ YouTubeに動画をアップロードした後、ブログを書いて、Twitter
         segments = []
         current_segment = ""
         
-        sentences = re.split(r'[。！？]', text)
-        
         for sentence in sentences:
             current_segment += sentence + "。"
             
@@ -399,21 +565,15 @@ YouTubeに動画をアップロードした後、ブログを書いて、Twitter
         
         return segments
     
-    def _identify_topic(self, text: str) -> str:
-        """テキストのトピックを特定"""
+    def _identify_topic(self, text: str, counts: Optional[Counter] = None) -> str:
+        """テキストのトピックを特定（集計済みの出現回数があれば再走査しない）"""
         
-        topics = {
-            'problem': ['大変', '困る', '面倒', '課題'],
-            'solution': ['解決', '方法', 'システム', 'ツール'],
-            'benefits': ['メリット', '良い', '便利', '効率'],
-            'process': ['やり方', '手順', 'ステップ', '流れ'],
-            'result': ['結果', '成果', '効果', 'できる']
-        }
+        if counts is None:
+            counts = self._phrase_counts(text)
         
         topic_scores = {}
-        for topic, keywords in topics.items():
-            score = sum(1 for keyword in keywords if keyword in text)
-            topic_scores[topic] = score
+        for topic, keywords in TOPIC_KEYWORDS.items():
+            topic_scores[topic] = sum(1 for keyword in keywords if counts[keyword])
         
         return max(topic_scores, key=topic_scores.get) if any(topic_scores.values()) else 'general'
     
@@ -459,15 +619,8 @@ YouTubeに動画をアップロードした後、ブログを書いて、Twitter
         """テキストからキーフレーズを抽出"""
         
         # 名詞句を優先的に抽出
-        patterns = [
-            r'([ァ-ヴー]+)',  # カタカナ
-            r'([一-龥]+)',    # 漢字
-            r'(\w+システム)',
-            r'(\w+ツール)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
+        for pattern in KEY_PHRASE_PATTERNS:
+            match = pattern.search(text)
             if match and len(match.group(1)) >= 2:
                 return match.group(1)
         
@@ -495,53 +648,28 @@ YouTubeに動画をアップロードした後、ブログを書いて、Twitter
         strategy = rewrite_strategies.get(section_type, self._rewrite_general_section)
         return strategy(text, analysis, emphasis)
     
+    def _written_style_rewriter(self) -> PhraseRewriter:
+        """設定された外部辞書を反映した口語→書き言葉の置換器"""
+        
+        dictionary_path = self.config.get('written_style_dictionary')
+        mtime = None
+        if dictionary_path:
+            try:
+                mtime = os.path.getmtime(dictionary_path)
+            except OSError:
+                logger.warning(f"書き言葉変換辞書が見つかりません: {dictionary_path}")
+                dictionary_path = None
+        return _compiled_rewriter(dictionary_path, mtime)
+    
     def _convert_to_written_style(self, text: str) -> str:
         """口語的表現を書き言葉に変換"""
         
-        # まず基本的な変換
-        conversions = {
-            'んですけど': 'のですが',
-            'んです': 'のです',
-            'っていう': 'という',
-            'ちゃう': 'しまう',
-            'じゃないかな': 'ではないでしょうか',
-            'じゃないかなと': 'ではないかと',
-            'と思うんですね': 'と考えられます',
-            'と思うんです': 'と思います',
-            'ですね': 'です',
-            '思ってます': '思っています',
-            'なんですよ': 'なのです',
-            'なんですけども': 'のですが',
-            'んですけども': 'のですが',
-            'ケーシャル': 'カジュアル',
-            'テイア': 'アイデア',
-            'シジュー': '実装',
-            '大いん': '多いの',
-            'やがる': 'あがる',
-            'ヘタス': 'へたをすれば',
-            '会いた': '空いた',
-            '先生AI': '生成AI',
-            '警社': '会社',
-            'です、': 'です。',
-            'ます、': 'ます。',
-        }
-        
-        for oral, written in conversions.items():
-            text = text.replace(oral, written)
-        
-        # 冗長な表現を削除
-        text = re.sub(r'あの、|えっと、|まあ、|ちょっと', '', text)
-        text = re.sub(r'です。です。', 'です。', text)
-        text = re.sub(r'ます。ます。', 'ます。', text)
-        text = re.sub(r'のですがも', 'のですが', text)
-        text = re.sub(r'というも', 'という方も', text)
+        # 口語表現の置換（最長一致優先で1回の走査）
+        text = self._written_style_rewriter().rewrite(text)
         
-        # 文末の調整
-        text = re.sub(r'です$', 'です。', text)
-        text = re.sub(r'ます$', 'ます。', text)
-        text = re.sub(r'。。', '。', text)
-        
-        return text.strip()
+        # 置換後の読点を句点に（「ですね、」→「です、」→「です。」のような連鎖も含む）、
+        # 冗長な表現の削除と文末の調整
+        return tidy_written_style(text)
     
     def _rewrite_problem_section(self, text: str, analysis: Dict, emphasis: List) -> str:
         """問題提起セクションのリライト"""
@@ -550,12 +678,13 @@ YouTubeに動画をアップロードした後、ブログを書いて、Twitter
         original_text = analysis.get('original_text', text)
         
         # 問題を明確に定義
+        counts = self._phrase_counts(original_text)
         problems = []
-        if "大変" in original_text:
+        if counts["大変"]:
             problems.append("動画からブログやSNS投稿を作成する作業に多くの時間がかかる")
-        if "数時間" in original_text:
+        if counts["数時間"]:
             problems.append("1本の動画からコンテンツを作成するのに数時間を費やしている")
-        if "編集" in original_text or "サムネール" in original_text:
+        if counts["編集"] or counts["サムネール"]:
             problems.append("動画編集、サムネイル作成、文章執筆など複数の作業が必要")
         
         if problems:
@@ -704,16 +833,13 @@ SEO最適化により、検索流入の増加も期待できます。
     def _rewrite_general_section(self, text: str, analysis: Dict, emphasis: List) -> str:
         """一般的なセクションのリライト"""
         
-        # オリジナルテキストから重要な情報を抽出
-        original_text = analysis.get('original_text', text)
-        
-        # テキストを文に分割して重要な部分を抽出
-        sentences = original_text.split('。')
+        # 共有解析済みの文から重要な部分を抽出
         important_sentences = []
+        keyword_matcher = _compiled_matcher(GENERAL_SECTION_KEYWORDS)
         
-        for sentence in sentences:
+        for sentence in self.text_analysis.sentences:
             # 重要なキーワードを含む文を選択
-            if any(keyword in sentence for keyword in ['システム', '自動', '動画', 'AI', '生成', '可能']):
+            if keyword_matcher.contains_any(sentence):
                 cleaned = self._convert_to_written_style(sentence)
                 if cleaned and len(cleaned) > 20:
                     important_sentences.append(cleaned)
@@ -781,35 +907,9 @@ Whisperによる高精度な文字起こし、AIによる自然な文章への
         }
     
     def _extract_seo_keywords(self, analysis: Dict) -> List[str]:
-        """SEOキーワードを抽出"""
-        
-        text = analysis['original_text']
-        
-        # 重要な名詞を抽出
-        important_words = []
-        
-        # カタカナ語（技術用語が多い）
-        katakana_words = re.findall(r'[ァ-ヴー]{3,}', text)
-        important_words.extend(katakana_words)
-        
-        # 漢字複合語
-        kanji_compounds = re.findall(r'[一-龥]{2,4}', text)
-        important_words.extend(kanji_compounds)
-        
-        # 頻度でソート
-        word_freq = {}
-        for word in important_words:
-            word_freq[word] = word_freq.get(word, 0) + 1
-        
-        # 上位キーワードを選択
-        sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        keywords = [word[0] for word in sorted_words[:10]]
-        
-        # 一般的すぎる単語を除外
-        stop_words = ['こと', 'もの', 'これ', 'それ', 'ところ', 'ため']
-        keywords = [kw for kw in keywords if kw not in stop_words]
+        """SEOキーワードを抽出（カタカナ語・漢字複合語の頻度順）"""
         
-        return keywords[:7]
+        return self.text_analysis.seo_keywords(7)
     
     def _optimize_title(self, original_title: str, keywords: List[str]) -> str:
         """タイトルを最適化"""
@@ -826,8 +926,10 @@ Whisperによる高精度な文字起こし、AIによる自然な文章への
     def _generate_meta_description(self, analysis: Dict, keywords: List[str]) -> str:
         """メタディスクリプションを生成"""
         
-        # 150文字以内で要約
-        base_text = analysis['value_proposition'][:100]
+        # 150文字以内で要約（抽出型要約を優先し、選べる文がなければ価値提案）
+        base_text = self.text_analysis.summary(max_length=100, max_sentences=2) if self.text_analysis else ''
+        if not base_text:
+            base_text = analysis['value_proposition'][:100]
         
         # キーワードを含める
         key_keywords = keywords[:3]
@@ -841,9 +943,9 @@ Whisperによる高精度な文字起こし、AIによる自然な文章への
         """URLスラッグを生成"""
         
         # 英数字とハイフンのみ
-        slug = re.sub(r'[^a-zA-Z0-9\s-]', '', title.lower())
-        slug = re.sub(r'\s+', '-', slug)
-        slug = re.sub(r'-+', '-', slug)
+        slug = ASCII_SLUG_INVALID_CHARS_PATTERN.sub('', title.lower())
+        slug = WHITESPACE_PATTERN.sub('-', slug)
+        slug = HYPHEN_RUN_PATTERN.sub('-', slug)
         
         return slug[:50]
     
@@ -864,11 +966,10 @@ Whisperによる高精度な文字起こし、AIによる自然な文章への
         """テキストをクリーンアップ"""
         
         # 余分な空白を削除
-        text = re.sub(r'\s+', ' ', text)
+        text = WHITESPACE_PATTERN.sub(' ', text)
         
-        # 句読点の調整
-        text = re.sub(r'\s*。\s*', '。', text)
-        text = re.sub(r'\s*、\s*', '、', text)
+        # 句読点の前後の空白を削除
+        text = PUNCTUATION_TRIM_PATTERN.sub(r'\1', text)
         
         # フィラーワードを削除
         filler_words = ['あの', 'えっと', 'まあ', 'ちょっと', 'なんか']
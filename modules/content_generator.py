@@ -2,13 +2,16 @@
 文字起こしデータから各種コンテンツを生成するモジュール
 """
 
-import re
 import json
 import logging
 from typing import Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
 
+from .text_analysis import TextAnalysis
+from .text_patterns import LINE_SENTENCE_DELIMITER_PATTERN
+from .tokenizer import get_tokenizer
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,17 +23,63 @@ class ContentGenerator:
         self.blog_config = config.get('blog', {})
         self.youtube_config = config.get('youtube', {})
         self.twitter_config = config.get('twitter', {})
+        self.keyword_config = config.get('keywords', {})
+        self.summary_config = config.get('summary', {})
+        self.segmentation_config = config.get('segmentation', {})
+        self.map_reduce_config = config.get('map_reduce', {})
+        self.tokenizer = get_tokenizer(config.get('tokenizer', {}).get('engine', 'janome'))
+        self.keyword_index = self._open_keyword_index()
+        self.blog_cache = self._open_blog_cache()
+    
+    def _open_keyword_index(self):
+        """コーパスの文書頻度インデックスを開く（無効・利用不可ならNone）"""
+        
+        if not self.keyword_config.get('corpus_idf', True):
+            return None
+        
+        try:
+            from .keyword_index import KeywordIndex
+            term_scheme = self.tokenizer.name if self.tokenizer else 'regex'
+            return KeywordIndex(self.keyword_config, term_scheme)
+        except Exception as e:
+            logger.warning(f"キーワードインデックスを利用できません（頻度順で抽出します）: {e}")
+            return None
+    
+    def _open_blog_cache(self):
+        """ブログ生成結果のキャッシュを開く（無効・利用不可ならNone）"""
+        
+        cache_config = self.config.get('blog_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        
+        try:
+            from .blog_cache import BlogResultCache
+            return BlogResultCache(cache_config)
+        except Exception as e:
+            logger.warning(f"ブログ生成キャッシュを利用できません: {e}")
+            return None
+    
+    def invalidate_blog_cache(self, transcript_data: Optional[Dict] = None) -> int:
+        """ブログ生成結果のキャッシュを削除（文字起こしを省略するとすべて）"""
+        
+        if not self.blog_cache:
+            return 0
+        return self.blog_cache.invalidate(transcript_data)
     
     def generate_all(self, transcript_data: Dict, title: str, video_info: Dict) -> Dict:
         """すべてのコンテンツを生成"""
         
         logger.info("コンテンツ生成開始...")
         
-        # テキストをクリーンアップ
-        clean_text = self._clean_text(transcript_data['text'])
+        # 既存記事・処理済み文字起こしの文書頻度を同期
+        if self.keyword_index:
+            self.keyword_index.sync_corpus(lambda text: TextAnalysis(text, tokenizer=self.tokenizer).index_terms)
+        
+        # テキストを一度だけ解析（形態素解析も1回）し、全ての生成処理で共有
+        analysis = self._analyze_transcript(transcript_data)
         
         # ブログコンテンツを生成（画像生成も含む）
-        blog_content = self._generate_blog_content(transcript_data, title, video_info)
+        blog_content = self._generate_blog_content(transcript_data, title, video_info, analysis)
         
         # 画像生成（設定で有効な場合）
         if self.blog_config.get('generate_images', True):
@@ -60,43 +109,103 @@ class ContentGenerator:
         # 各種コンテンツ生成
         content = {
             'blog': blog_content,
-            'youtube': self._generate_youtube_description(transcript_data, title, video_info),
-            'twitter': self._generate_twitter_post(title, clean_text),
-            'thumbnail': self._generate_thumbnail_text(title, clean_text)
+            'youtube': self._generate_youtube_description(transcript_data, title, video_info, analysis),
+            'twitter': self._generate_twitter_post(title, analysis),
+            'thumbnail': self._generate_thumbnail_text(title, analysis)
         }
         
+        # 処理済みの文字起こしとして文書頻度インデックスに登録
+        self._record_transcript(analysis)
+        
         return content
     
-    def _clean_text(self, text: str) -> str:
-        """テキストをクリーンアップ"""
-        # 余分な空白を削除
-        text = re.sub(r'\s+', ' ', text)
-        # 句読点の修正
-        text = re.sub(r'\s+。', '。', text)
-        text = re.sub(r'\s+、', '、', text)
-        text = re.sub(r'\s+！', '！', text)
-        text = re.sub(r'\s+？', '？', text)
-        return text.strip()
+    def _analyze_transcript(self, transcript_data: Dict) -> TextAnalysis:
+        """文字起こしを解析（長尺ならトピックブロックごとに並列解析して統合）"""
+        
+        analysis_kwargs = {
+            'keyword_index': self.keyword_index,
+            'tokenizer': self.tokenizer,
+            'summary_method': self.summary_config.get('method', 'textrank'),
+            'segmentation_config': self.segmentation_config
+        }
+        
+        min_characters = self.map_reduce_config.get('min_characters', 50000)
+        if self.map_reduce_config.get('enabled', True) and len(transcript_data['text']) >= min_characters:
+            from .map_reduce_analysis import map_reduce_analysis
+            engine = self.tokenizer.name if self.tokenizer else 'regex'
+            return map_reduce_analysis(transcript_data, self.map_reduce_config, engine, **analysis_kwargs)
+        
+        return TextAnalysis(transcript_data['text'], segments=transcript_data.get('segments'), **analysis_kwargs)
+    
+    def _record_transcript(self, analysis: TextAnalysis):
+        """文字起こしの語を文書頻度インデックスに追加（差分のみ）
+
+        キーワードの採点では登録済みの自分自身の分を除くため、登録後に再生成しても結果は変わらない
+        """
+        
+        if not self.keyword_index:
+            return
+        
+        try:
+            self.keyword_index.add_transcript(analysis.text, analysis.index_terms)
+        except Exception as e:
+            logger.warning(f"キーワードインデックスの更新に失敗: {e}")
     
-    def _generate_blog_content(self, transcript_data: Dict, title: str, video_info: Dict) -> Dict:
+    def _generate_blog_content(self, transcript_data: Dict, title: str, video_info: Dict,
+                               analysis: Optional[TextAnalysis] = None) -> Dict:
         """ブログ記事コンテンツを生成"""
         
+        # 同じ文字起こし・タイトル・設定の結果があれば再利用
+        cache_key = None
+        if self.blog_cache:
+            cache_key = self.blog_cache.make_key(transcript_data, title, self.blog_config,
+                                                 self._blog_cache_context(transcript_data))
+            cached = self.blog_cache.get(cache_key)
+            if cached is not None:
+                logger.info("ブログ生成結果をキャッシュから取得")
+                return cached
+        
         # BlogOptimizerを使用して高品質なブログコンテンツを生成
         from .blog_optimizer import BlogOptimizer
         
         optimizer = BlogOptimizer(self.blog_config)
-        optimized_content = optimizer.optimize_for_blog(transcript_data, title, video_info)
+        optimized_content = optimizer.optimize_for_blog(transcript_data, title, video_info, analysis)
+        
+        if cache_key:
+            self.blog_cache.put(cache_key, transcript_data, optimized_content)
         
         return optimized_content
     
-    def _generate_youtube_description(self, transcript_data: Dict, title: str, video_info: Dict) -> str:
+    def _blog_cache_context(self, transcript_data: Dict) -> Dict:
+        """ブログ設定以外でブログ生成結果に影響するもの（キャッシュキーに含める）"""
+        
+        from .keyword_index import transcript_doc_id
+        from .llm_rewriter import get_rewriter
+        
+        rewriter = get_rewriter(self.blog_config.get('rewriter'))
+        corpus_state = None
+        if self.keyword_index:
+            corpus_state = self.keyword_index.corpus_state(transcript_doc_id(transcript_data['text']))
+        
+        return {
+            'tokenizer': self.tokenizer.name if self.tokenizer else 'regex',
+            'keywords': self.keyword_config,
+            'summary': self.summary_config,
+            'segmentation': self.segmentation_config,
+            'map_reduce': self.map_reduce_config,
+            # 設定上のバックエンドではなく実際に使われるもの（利用できなければテンプレート）
+            'rewriter': type(rewriter).__name__ if rewriter else 'template',
+            'corpus': corpus_state
+        }
+    
+    def _generate_youtube_description(self, transcript_data: Dict, title: str, video_info: Dict,
+                                      analysis: TextAnalysis) -> str:
         """YouTube説明文を生成"""
         
-        text = transcript_data['text']
         chapters = transcript_data.get('chapters', [])
         
         # 要約
-        summary = self._generate_summary(text, max_length=200)
+        summary = self._generate_summary(analysis, max_length=200)
         
         # 説明文構築
         description_parts = [
@@ -106,8 +215,15 @@ class ContentGenerator:
             ""
         ]
         
-        # チャプター追加
-        if self.youtube_config.get('add_chapters', True) and chapters:
+        # チャプター追加（トピックブロックがあればその区切りと見出しを使用。YouTubeのチャプターは3つ以上必要）
+        if self.youtube_config.get('add_chapters', True) and len(analysis.topic_blocks) >= 3:
+            description_parts.append("▼ チャプター ▼")
+            for i, block in enumerate(analysis.topic_blocks):
+                # YouTubeのチャプターは0:00から始まる必要がある
+                time = "0:00" if i == 0 else block['time']
+                description_parts.append(f"{time} {block['title']}")
+            description_parts.append("")
+        elif self.youtube_config.get('add_chapters', True) and chapters:
             description_parts.extend([
                 "▼ チャプター ▼",
                 "0:00 オープニング"
@@ -117,7 +233,7 @@ class ContentGenerator:
             description_parts.append("")
         
         # キーワード
-        keywords = self._extract_keywords(text, num=5)
+        keywords = self._extract_keywords(analysis, num=5)
         if keywords:
             description_parts.extend([
                 "▼ キーワード ▼",
@@ -151,18 +267,18 @@ class ContentGenerator:
         
         return description
     
-    def _generate_twitter_post(self, title: str, text: str) -> str:
+    def _generate_twitter_post(self, title: str, analysis: TextAnalysis) -> str:
         """X(Twitter)投稿文を生成"""
         
         # 要約
-        summary = self._generate_summary(text, max_length=100)
+        summary = self._generate_summary(analysis, max_length=100)
         
         # 基本投稿文
         post = f"【{title}】\n{summary}"
         
         # ハッシュタグ追加
         if self.twitter_config.get('add_hashtags', True):
-            keywords = self._extract_keywords(text, num=self.twitter_config.get('max_hashtags', 3))
+            keywords = self._extract_keywords(analysis, num=self.twitter_config.get('max_hashtags', 3))
             hashtags = " ".join([f"#{kw}" for kw in keywords[:3]])
             post += f"\n\n{hashtags}"
         
@@ -175,11 +291,11 @@ class ContentGenerator:
         
         return post
     
-    def _generate_thumbnail_text(self, title: str, text: str) -> Dict:
+    def _generate_thumbnail_text(self, title: str, analysis: TextAnalysis) -> Dict:
         """サムネイル用テキストを生成"""
         
         # キーワード抽出
-        keywords = self._extract_keywords(text, num=3)
+        keywords = self._extract_keywords(analysis, num=3)
         
         # メインタイトル（短縮版）
         main_title = title
@@ -201,7 +317,7 @@ class ContentGenerator:
     def _split_into_sections(self, text: str, min_length: int = 200, max_length: int = 500) -> List[Dict]:
         """テキストをセクションに分割"""
         
-        sentences = re.split(r'[。！？\n]+', text)
+        sentences = LINE_SENTENCE_DELIMITER_PATTERN.split(text)
         sections = []
         current_section = ""
         section_count = 1
@@ -234,62 +350,20 @@ class ContentGenerator:
         
         return sections
     
-    def _generate_summary(self, text: str, max_length: int = 200) -> str:
-        """テキストの要約を生成（簡易版）"""
+    def _generate_summary(self, analysis: TextAnalysis, max_length: int = 200) -> str:
+        """テキストの要約を生成（全文を採点した抽出型要約。YouTube・X・メタディスクリプションで共有）"""
         
-        sentences = re.split(r'[。！？]+', text)
-        summary_sentences = []
-        current_length = 0
-        
-        for sentence in sentences:
-            sentence = sentence.strip()
-            if not sentence:
-                continue
-            
-            # 重要そうな文を優先
-            importance_score = 0
-            if any(keyword in sentence for keyword in ['です', 'ます', 'について', 'とは', 'ため']):
-                importance_score += 1
-            if len(sentence) > 20 and len(sentence) < 100:
-                importance_score += 1
-            
-            if importance_score > 0 and current_length + len(sentence) <= max_length:
-                summary_sentences.append(sentence)
-                current_length += len(sentence)
-            
-            if len(summary_sentences) >= 3:
-                break
+        summary = analysis.summary(
+            max_length=max_length,
+            max_sentences=self.summary_config.get('max_sentences', 3),
+            redundancy_threshold=self.summary_config.get('redundancy_threshold', 0.7)
+        )
         
-        return "。".join(summary_sentences) + "。" if summary_sentences else text[:max_length] + "..."
+        return summary if summary else analysis.clean_text[:max_length] + "..."
     
-    def _extract_keywords(self, text: str, num: int = 5) -> List[str]:
-        """キーワードを抽出（簡易版）"""
-        
-        # ストップワード
-        stopwords = {
-            'の', 'に', 'は', 'を', 'た', 'が', 'で', 'て', 'と', 'し', 'れ', 'さ', 
-            'ある', 'いる', 'も', 'する', 'から', 'な', 'こと', 'として', 'い', 
-            'や', 'など', 'なっ', 'ない', 'この', 'ため', 'その', 'あっ', 'よう', 
-            'また', 'もの', 'という', 'あり', 'まで', 'られ', 'なる', 'へ', 'か', 
-            'だ', 'これ', 'によって', 'により', 'おり', 'より', 'による', 'ず', 
-            'なり', 'られる', 'において', 'ば', 'なかっ', 'なく', 'しかし', 
-            'について', 'だけ', 'だっ', 'その他', 'それ', 'ところ'
-        }
-        
-        # 単語分割（簡易版）
-        words = re.findall(r'[一-龥ぁ-んァ-ンー\w]{2,}', text)
-        
-        # 単語カウント
-        word_count = {}
-        for word in words:
-            if word not in stopwords and len(word) >= 2:
-                word_count[word] = word_count.get(word, 0) + 1
-        
-        # 頻出順にソート
-        sorted_words = sorted(word_count.items(), key=lambda x: x[1], reverse=True)
-        
-        # 上位N個を返す
-        return [word[0] for word in sorted_words[:num]]
+    def _extract_keywords(self, analysis: TextAnalysis, num: int = 5) -> List[str]:
+        """キーワードを抽出（共有解析結果の頻度順位を使用）"""
+        return analysis.keywords(num)
     
     def _generate_toc(self, sections: List[Dict]) -> List[str]:
         """目次を生成"""
@@ -0,0 +1,476 @@
+"""
+記事の文埋め込みインデックスモジュール
+CPUで動く小さな文埋め込みモデル（sentence-transformers）で記事をまとめてベクトル化し、正規化したベクトルを
+float16の行列ファイルに追記してメモリマップで参照する。コサイン類似度の上位k件はNumPyで求め、
+記事数が多い場合は k-means のクラスタ（IVF）で探索範囲を絞る
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .minhash_index import RELATED_SECTION_PATTERN
+from .text_patterns import HTML_TAG_PATTERN, WHITESPACE_PATTERN
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS vectors (
+    post_id TEXT PRIMARY KEY,
+    row INTEGER NOT NULL UNIQUE,
+    fingerprint TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+"""
+
+# デフォルト設定
+DEFAULT_SEMANTIC_SIMILARITY = {
+    'enabled': False,
+    'path': 'cache/embeddings',
+    'model': 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
+    'device': 'cpu',
+    'batch_size': 32,             # 一度にベクトル化する記事数
+    'threshold': 0.75,            # 関連記事とみなすコサイン類似度
+    'ann_min_posts': 50000,       # この記事数以上でIVFによる近似探索
+    'nlist': 0,                   # IVFのクラスタ数（0で記事数の平方根）
+    'nprobe': 8,                  # 探索するクラスタ数
+}
+
+# ベクトル化する本文の最大文字数（モデルの入力長を超える部分は使われない）
+MAX_TEXT_CHARS = 2000
+
+# 全件探索で一度に類似度を計算する行数
+_SCAN_ROWS = 65536
+
+# 使われなくなった行（更新・削除された記事）がこの割合を超えたら行列を詰め直す
+_COMPACT_RATIO = 0.25
+
+# IVF構築後に追記された行がこの割合を超えたらIVFを作り直す
+_IVF_REBUILD_RATIO = 0.1
+
+# k-meansの反復回数と、1クラスタあたりの学習用サンプル数
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLES_PER_LIST = 64
+
+
+def embedding_text(title: str, html: str) -> str:
+    """ベクトル化するテキスト（タイトルと、タグ・関連記事セクションを除いた本文の先頭）"""
+    text = RELATED_SECTION_PATTERN.sub(' ', html or '')
+    text = HTML_TAG_PATTERN.sub(' ', text)
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
+    return f"{title}\n{text}"[:MAX_TEXT_CHARS]
+
+
+class SentenceEmbedder:
+    """sentence-transformersの文埋め込みモデル（出力はL2正規化したfloat32）"""
+
+    def __init__(self, model_name: str, batch_size: int = 32, device: str = 'cpu'):
+        # 未導入ならImportError（呼び出し側で意味的な関連記事の検出を無効にする）
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"文埋め込みモデル '{model_name}' をロード中...")
+        self.model = SentenceTransformer(model_name, device=device)
+        self.batch_size = batch_size
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """テキストのベクトル（テキスト数 × 次元）"""
+        return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                 normalize_embeddings=True, show_progress_bar=False).astype(np.float32)
+
+
+def kmeans(vectors: np.ndarray, num_lists: int, iterations: int = _KMEANS_ITERATIONS,
+           seed: int = 0) -> np.ndarray:
+    """正規化したベクトルの球面k-meansのクラスタ中心（num_lists × 次元）"""
+
+    rng = np.random.RandomState(seed)
+    centroids = vectors[rng.choice(len(vectors), num_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # 空のクラスタは前回の中心のまま
+        filled = norms[:, 0] > 0
+        centroids[filled] = sums[filled] / norms[filled]
+    return centroids
+
+
+class EmbeddingIndex(SQLiteStore):
+    """記事の文埋め込み（行列ファイルへの追記で差分のみ反映し、行列全体は作り直さない）
+
+    path: インデックスのディレクトリ（行列ファイル vectors*.f16 / index.db / ivf.npz）
+    """
+
+    def __init__(self, path: Path, posts_dir: Path, config: Optional[Dict] = None,
+                 embedder: Optional[SentenceEmbedder] = None):
+        settings = {**DEFAULT_SEMANTIC_SIMILARITY, **(config or {})}
+        self.path = Path(path)
+        self.posts_dir = Path(posts_dir)
+        self.settings = settings
+        self.threshold = float(settings['threshold'])
+        self.ann_min_posts = int(settings['ann_min_posts'])
+        self.nprobe = max(1, int(settings['nprobe']))
+
+        self.ivf_path = self.path / 'ivf.npz'
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        self._embedder = embedder
+        self._cache_lock = threading.Lock()
+        # 行列ファイル（パス, inode, サイズ）→ メモリマップ、世代 → 有効な行、IVF
+        self._matrix_key = None
+        self._matrix = None
+        self._rows_generation = None
+        self._rows = None
+        self._ivf = None
+
+        self._open_database(self.path / 'index.db', SCHEMA)
+        self._check_parameters()
+
+    @staticmethod
+    def _bump_generation(conn: sqlite3.Connection):
+        """登録内容の世代を進める（他のプロセスが読み込んだ行の一覧を無効にする）"""
+        conn.execute("INSERT INTO meta (key, value) VALUES ('generation', '1') "
+                     "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _vectors_path(self, conn: sqlite3.Connection) -> Path:
+        """現在の行列ファイル（詰め直すたびに新しいファイルに切り替える）"""
+        return self.path / (self._meta(conn, 'vectors_file') or 'vectors.f16')
+
+    def _check_parameters(self):
+        """モデルが変わっていれば登録済みのベクトルを破棄（次回のsyncで作り直す）"""
+
+        parameters = json.dumps({'model': self.settings['model']}, sort_keys=True)
+        with self._transaction() as conn:
+            current = self._meta(conn, 'parameters')
+            if current == parameters:
+                return
+            if current:
+                logger.info("文埋め込みモデルが変わったためインデックスを作り直します")
+            for stale in (self._vectors_path(conn), self.ivf_path):
+                if stale.exists():
+                    stale.unlink()
+            conn.execute('DELETE FROM vectors')
+            conn.execute("DELETE FROM meta WHERE key IN ('dimension', 'vectors_file')")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('parameters', ?)", (parameters,))
+            self._bump_generation(conn)
+
+    def _get_embedder(self) -> SentenceEmbedder:
+        if self._embedder is None:
+            self._embedder = SentenceEmbedder(self.settings['model'], int(self.settings['batch_size']),
+                                              self.settings['device'])
+        return self._embedder
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """テキストのベクトル（L2正規化済み）"""
+        return self._get_embedder().encode(texts)
+
+    def sync(self, read_text: Callable[[Path], str]):
+        """記事ファイルの更新時刻・サイズが変わったものだけベクトル化して追記し、削除された記事を除去
+
+        read_text: 記事ファイルからベクトル化するテキストを返す関数
+        """
+
+        if not self.posts_dir.exists():
+            return
+
+        indexed = dict(self._get_connection().execute('SELECT post_id, fingerprint FROM vectors').fetchall())
+
+        seen = set()
+        pending = []
+        updated = 0
+        chunk = max(1, int(self.settings['batch_size'])) * 8
+        with os.scandir(self.posts_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.md') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                fingerprint = f"{stat.st_mtime_ns}:{stat.st_size}"
+                seen.add(entry.name)
+                if indexed.get(entry.name) == fingerprint:
+                    continue
+                try:
+                    pending.append((entry.name, read_text(Path(entry.path)), fingerprint))
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"記事読み込みエラー {entry.path}: {e}")
+                    continue
+                if len(pending) >= chunk:
+                    updated += self._add_texts(pending)
+                    pending = []
+
+        if pending:
+            updated += self._add_texts(pending)
+
+        removed = set(indexed) - seen
+        if removed:
+            self.remove_posts(removed)
+
+        if updated or removed:
+            logger.info(f"文埋め込みインデックスを更新: {updated} 件登録 / {len(removed)} 件削除")
+            self._maybe_compact()
+
+    def _add_texts(self, posts: List[Tuple[str, str, str]]) -> int:
+        vectors = self.encode([text for _, text, _ in posts])
+        self.add_posts([(post_id, vector, fingerprint)
+                        for (post_id, _, fingerprint), vector in zip(posts, vectors)])
+        return len(posts)
+
+    def add_posts(self, posts: List[Tuple[str, np.ndarray, str]]):
+        """記事（記事ID, ベクトル, フィンガープリント）を行列ファイルの末尾に追記して登録
+
+        更新された記事は新しい行を指すようにし、古い行は詰め直すまで使われない行として残す
+        """
+
+        if not posts:
+            return
+
+        matrix = np.vstack([vector for _, vector, _ in posts]).astype(np.float16)
+        dimension = matrix.shape[1]
+        now = time.time()
+        with self._transaction() as conn:
+            stored = self._meta(conn, 'dimension')
+            if stored is None:
+                conn.execute("INSERT INTO meta (key, value) VALUES ('dimension', ?)", (str(dimension),))
+            elif int(stored) != dimension:
+                raise ValueError(f"ベクトルの次元が登録済みの次元と異なります: {dimension} != {stored}")
+
+            # 書き込みロックの中で追記するため、行番号は他のプロセスと重ならない
+            # （中断して登録されなかった行は使われない行として残る）
+            with open(self._vectors_path(conn), 'ab') as f:
+                # 書き込み途中で中断した半端な行は切り捨てる
+                size = f.tell()
+                if size % (dimension * 2):
+                    f.truncate(size - size % (dimension * 2))
+                    f.seek(0, os.SEEK_END)
+                first_row = f.tell() // (dimension * 2)
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            conn.executemany(
+                'INSERT OR REPLACE INTO vectors (post_id, row, fingerprint, indexed_at) VALUES (?, ?, ?, ?)',
+                [(post_id, first_row + i, fingerprint, now) for i, (post_id, _, fingerprint) in enumerate(posts)]
+            )
+            self._bump_generation(conn)
+
+    def remove_posts(self, post_ids: Iterable[str]):
+        """記事を削除（行列の行は詰め直すまで使われない行として残る）"""
+        with self._transaction() as conn:
+            conn.executemany('DELETE FROM vectors WHERE post_id = ?', [(post_id,) for post_id in post_ids])
+            self._bump_generation(conn)
+
+    def _dimension(self) -> Optional[int]:
+        value = self._meta(self._get_connection(), 'dimension')
+        return int(value) if value else None
+
+    def _load(self) -> Tuple[Optional[np.ndarray], List[str], np.ndarray]:
+        """行列のメモリマップと有効な行（記事ID, 行番号）。変更がなければ前回のものを使う"""
+
+        conn = self._get_connection()
+        with self._cache_lock:
+            # 行と行列ファイルを同じ読み取りトランザクションで取得（詰め直しと食い違わないように）
+            conn.execute('BEGIN')
+            try:
+                dimension = self._dimension()
+                vectors_path = self._vectors_path(conn)
+                generation = self._meta(conn, 'generation')
+                if generation != self._rows_generation:
+                    rows = conn.execute('SELECT post_id, row FROM vectors ORDER BY row').fetchall()
+                    self._rows = ([post_id for post_id, _ in rows],
+                                  np.array([row for _, row in rows], dtype=np.int64))
+                    self._rows_generation = generation
+                stat = os.stat(vectors_path) if dimension else None
+            except FileNotFoundError:
+                stat = None
+            finally:
+                conn.execute('COMMIT')
+
+            if stat is None:
+                return None, [], np.zeros(0, dtype=np.int64)
+
+            key = (vectors_path.name, stat.st_ino, stat.st_size)
+            if key != self._matrix_key:
+                num_rows = stat.st_size // (dimension * 2)
+                self._matrix = (np.memmap(vectors_path, dtype=np.float16, mode='r', shape=(num_rows, dimension))
+                                if num_rows else None)
+                if self._matrix_key is None or self._matrix_key[0] != vectors_path.name:
+                    self._ivf = None
+                self._matrix_key = key
+
+            return self._matrix, self._rows[0], self._rows[1]
+
+    def query(self, text: str, k: int, threshold: Optional[float] = None,
+              exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """コサイン類似度が閾値以上の上位k件の記事（記事ID, 類似度）を類似度の降順で返す"""
+        return self.query_vector(self.encode([text])[0], k, threshold, exclude)
+
+    def query_vector(self, vector: np.ndarray, k: int, threshold: Optional[float] = None,
+                     exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """ベクトル（L2正規化済み）とのコサイン類似度が閾値以上の上位k件の記事"""
+
+        threshold = self.threshold if threshold is None else threshold
+        matrix, post_ids, rows = self._load()
+        if matrix is None or not post_ids or k <= 0:
+            return []
+
+        vector = np.asarray(vector, dtype=np.float32)
+        exclude = set(exclude)
+        if len(post_ids) >= self.ann_min_posts:
+            candidates = self._ivf_candidates(matrix, rows, vector)
+            scores = matrix[rows[candidates]].astype(np.float32) @ vector
+        else:
+            candidates = np.arange(len(rows))
+            scores = self._scan(matrix, rows, vector)
+
+        # 除外分を見込んだ上位の値以上（同点はすべて含める）を（類似度の降順, 記事ID順）に並べる
+        top = min(len(scores), k + len(exclude))
+        kth = -np.partition(-scores, top - 1)[top - 1]
+        best = np.nonzero(scores >= max(kth, threshold))[0]
+        results = [
+            (post_ids[candidates[i]], float(scores[i])) for i in best
+            if post_ids[candidates[i]] not in exclude
+        ]
+        results.sort(key=lambda r: (-r[1], r[0]))
+        return results[:k]
+
+    def neighbors(self, k: int, threshold: Optional[float] = None) -> Dict[str, List[Tuple[str, float]]]:
+        """登録済みの全記事について、コサイン類似度が閾値以上の上位k件の記事（記事ID → [(記事ID, 類似度)]）"""
+
+        matrix, post_ids, rows = self._load()
+        if matrix is None:
+            return {}
+        return {
+            post_id: self.query_vector(matrix[row].astype(np.float32), k, threshold, exclude=[post_id])
+            for post_id, row in zip(post_ids, rows.tolist())
+        }
+
+    def _scan(self, matrix: np.ndarray, rows: np.ndarray, vector: np.ndarray) -> np.ndarray:
+        """有効な行すべてとの類似度（行列を先頭から連続に読み、使われない行は捨てる）"""
+
+        scores = np.empty(len(rows), dtype=np.float32)
+        position = 0
+        for start in range(0, len(matrix), _SCAN_ROWS):
+            stop = min(start + _SCAN_ROWS, len(matrix))
+            end = np.searchsorted(rows, stop, side='left')
+            if end > position:
+                block = matrix[start:stop].astype(np.float32) @ vector
+                scores[position:end] = block[rows[position:end] - start]
+                position = end
+        return scores
+
+    def _ivf_candidates(self, matrix: np.ndarray, rows: np.ndarray, vector: np.ndarray) -> np.ndarray:
+        """IVFで探索する有効な行の位置（近いクラスタの行と、IVF構築後に追記された行）"""
+
+        ivf = self._get_ivf(matrix, rows)
+        centroids, list_ptr, list_rows, built_rows = ivf
+        probes = np.argsort(-(centroids @ vector))[:self.nprobe]
+        selected = np.concatenate([list_rows[list_ptr[p]:list_ptr[p + 1]] for p in probes] +
+                                  [np.arange(built_rows, len(matrix))])
+        # 行番号 → 有効な行の位置（更新・削除で使われなくなった行は除く）
+        positions = np.searchsorted(rows, selected)
+        positions = np.minimum(positions, len(rows) - 1)
+        return np.unique(positions[rows[positions] == selected])
+
+    def _get_ivf(self, matrix: np.ndarray, rows: np.ndarray) -> Tuple:
+        """IVF（クラスタ中心, クラスタごとの行のCSR, 構築時の行数）。追記が一定割合を超えたら作り直す"""
+
+        vectors_file = self._matrix_key[0]
+        if self._ivf is None and self.ivf_path.exists():
+            try:
+                with np.load(self.ivf_path) as data:
+                    # 詰め直す前の行列ファイルで作ったIVFは使わない
+                    if str(data['vectors_file']) == vectors_file:
+                        self._ivf = (data['centroids'], data['list_ptr'], data['list_rows'], int(data['built_rows']))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"IVFを読み込めないため作り直します: {e}")
+
+        if self._ivf is not None:
+            built_rows = self._ivf[3]
+            if built_rows <= len(matrix) and len(matrix) - built_rows <= built_rows * _IVF_REBUILD_RATIO:
+                return self._ivf
+
+        self._ivf = self.build_ivf(matrix, rows, vectors_file)
+        return self._ivf
+
+    def build_ivf(self, matrix: np.ndarray, rows: np.ndarray, vectors_file: str) -> Tuple:
+        """有効な行からIVFを作って保存"""
+
+        started = time.perf_counter()
+        num_lists = int(self.settings['nlist']) or max(1, int(np.sqrt(len(rows))))
+        num_lists = min(num_lists, len(rows))
+
+        rng = np.random.RandomState(0)
+        sample = np.sort(rng.choice(rows, min(len(rows), num_lists * _KMEANS_SAMPLES_PER_LIST), replace=False))
+        centroids = kmeans(matrix[sample].astype(np.float32), num_lists)
+
+        assignments = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), _SCAN_ROWS):
+            block = matrix[rows[start:start + _SCAN_ROWS]].astype(np.float32)
+            assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        order = np.argsort(assignments, kind='stable')
+        list_rows = rows[order]
+        list_ptr = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=num_lists))))
+        built_rows = len(matrix)
+
+        temp_path = self.ivf_path.with_name(f'.ivf.{os.getpid()}.npz')
+        np.savez(temp_path, centroids=centroids, list_ptr=list_ptr, list_rows=list_rows, built_rows=built_rows,
+                 vectors_file=vectors_file)
+        os.replace(temp_path, self.ivf_path)
+        logger.info(f"文埋め込みのIVFを構築: {len(rows)} 記事 / {num_lists} クラスタ "
+                    f"({time.perf_counter() - started:.1f}秒)")
+        return centroids, list_ptr, list_rows, built_rows
+
+    def _maybe_compact(self):
+        """使われない行が一定割合を超えたら、有効な行だけの新しい行列ファイルに詰め直す
+
+        行番号の付け替えと行列ファイルの切り替えは同じトランザクションで行い、古いファイルはその後に削除する
+        （古い行列をメモリマップ中の読み手はそのまま読み続けられる）
+        """
+
+        dimension = self._dimension()
+        if dimension is None:
+            return
+
+        with self._transaction() as conn:
+            old_path = self._vectors_path(conn)
+            if not old_path.exists():
+                return
+            total_rows = os.path.getsize(old_path) // (dimension * 2)
+            rows = conn.execute('SELECT post_id, row, fingerprint, indexed_at FROM vectors ORDER BY row').fetchall()
+            if total_rows - len(rows) <= max(len(rows), 1) * _COMPACT_RATIO:
+                return
+
+            new_path = self.path / f'vectors.{time.time_ns()}.f16'
+            source = np.memmap(old_path, dtype=np.float16, mode='r', shape=(total_rows, dimension))
+            with open(new_path, 'wb') as f:
+                for start in range(0, len(rows), _SCAN_ROWS):
+                    f.write(source[[row for _, row, _, _ in rows[start:start + _SCAN_ROWS]]].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            del source
+
+            conn.execute('DELETE FROM vectors')
+            conn.executemany(
+                'INSERT INTO vectors (post_id, row, fingerprint, indexed_at) VALUES (?, ?, ?, ?)',
+                [(post_id, i, fingerprint, indexed_at) for i, (post_id, _, fingerprint, indexed_at) in enumerate(rows)]
+            )
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('vectors_file', ?)", (new_path.name,))
+            self._bump_generation(conn)
+
+        old_path.unlink(missing_ok=True)
+        logger.info(f"文埋め込みの行列を詰め直し: {total_rows} 行 → {len(rows)} 行")
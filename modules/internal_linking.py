@@ -4,15 +4,60 @@
 """
 
 import re
-import json
+import time
+import sqlite3
 import logging
+from collections import Counter
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Set
-from datetime import datetime
-import yaml
+
+import numpy as np
+
+from .post_metadata import PostMetadataCache, parse_post, post_url
+from .minhash_index import DEFAULT_BODY_SIMILARITY, body_text
+from .embedding_index import DEFAULT_SEMANTIC_SIMILARITY, embedding_text
+from .link_database import LinkDatabase
+from .link_graph import LinkGraphAnalytics
+from .post_document import PostDocument
+from .backlink_writer import (
+    BACKLINK_TAG, BacklinkWriter, DEFAULT_THUMBNAIL, LINK_HREF_PATTERN, is_backlink_card, related_card, related_section,
+    replace_related_section, rewrite_posts, section_cards, section_links
+)
+from .link_index import field_terms
+from .relink_engine import DEFAULT_BLOCK_WORK, connected_components, top_k_similar
+from .text_patterns import FRONT_MATTER_PATTERN
 
 logger = logging.getLogger(__name__)
 
+# 記事間類似度の重み（キーワード・タイトル・カテゴリのJaccard係数の加重和）
+SIMILARITY_WEIGHTS = {
+    'keywords': 0.5,
+    'title': 0.3,
+    'categories': 0.2,
+}
+
+
+def link_metadata(front_matter: Dict) -> Dict:
+    """関連記事の判定と表示に使うFront Matterの項目（キーワードはJekyllのtagsにも対応）"""
+    return {
+        'title': front_matter.get('title', ''),
+        'keywords': front_matter.get('keywords') or front_matter.get('tags') or [],
+        'categories': front_matter.get('categories') or [],
+        'excerpt': front_matter.get('excerpt', ''),
+        'image': front_matter.get('image', '')
+    }
+
+
+def open_link_database(config: Dict) -> LinkDatabase:
+    """リンクデータベースを開く（旧形式のJSONがあれば初回に取り込む）"""
+    
+    db_path = Path(config.get('link_database', 'cache/internal_links.db'))
+    legacy_json = Path(config.get('legacy_link_database', 'internal_links.json'))
+    # 旧設定（link_database に JSON を指定）は、そのJSONを移行元としてSQLiteを隣に作成
+    if db_path.suffix == '.json':
+        db_path, legacy_json = db_path.with_suffix('.db'), db_path
+    return LinkDatabase(db_path, legacy_json)
+
 
 class InternalLinkManager:
     """内部リンク管理クラス"""
@@ -20,67 +65,280 @@ class InternalLinkManager:
     def __init__(self, config: Dict):
         self.config = config
         self.posts_dir = Path(config.get('posts_directory', '_posts'))
-        self.link_database = Path(config.get('link_database', 'internal_links.json'))
+        self.link_database = open_link_database(config)
         self.similarity_threshold = config.get('similarity_threshold', 0.6)
         self.max_related_posts = config.get('max_related_posts', 3)
+        self.post_index = self._open_post_index()
+        self.metadata_cache = self._open_metadata_cache()
+        self.body_index = self._open_body_index()
+        self.semantic_index = self._open_semantic_index()
+    
+    def _open_post_index(self):
+        """関連記事候補の転置インデックスを開く（利用不可ならNoneで全記事を走査）"""
+        
+        try:
+            from .link_index import RelatedPostIndex
+            return RelatedPostIndex(self.config.get('post_index', 'cache/link_index.db'), self.posts_dir)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"関連記事インデックスを利用できません（全記事を走査します）: {e}")
+            return None
+    
+    def _open_metadata_cache(self):
+        """記事メタデータキャッシュを開く（利用不可ならNoneで毎回ファイルを解析）"""
+        
+        try:
+            return PostMetadataCache(self.config.get('metadata_cache', 'cache/post_metadata.db'))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"記事メタデータキャッシュを利用できません: {e}")
+            return None
+    
+    def _open_body_index(self):
+        """本文のMinHash/LSHインデックスを開く（無効・利用不可ならNoneでメタデータのみで判定）"""
+        
+        settings = {**DEFAULT_BODY_SIMILARITY, **(self.config.get('body_similarity') or {})}
+        if not settings['enabled']:
+            return None
+        
+        try:
+            from .minhash_index import MinHashIndex
+            return MinHashIndex(settings['path'], self.posts_dir, settings)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"本文の類似記事インデックスを利用できません: {e}")
+            return None
+        
+    def _open_semantic_index(self):
+        """文埋め込みインデックスを開く（無効・sentence-transformers未導入ならNone）"""
+        
+        settings = {**DEFAULT_SEMANTIC_SIMILARITY, **(self.config.get('semantic_similarity') or {})}
+        if not settings['enabled']:
+            return None
+        
+        import importlib.util
+        if importlib.util.find_spec('sentence_transformers') is None:
+            logger.warning("sentence-transformersが未インストールのため意味的な関連記事の検出を無効にします"
+                           "（pip install sentence-transformers）")
+            return None
+        
+        try:
+            from .embedding_index import EmbeddingIndex
+            return EmbeddingIndex(settings['path'], self.posts_dir, settings)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"文埋め込みインデックスを利用できません: {e}")
+            return None
+    
+    def process_new_post(self, new_post_path: Path, post_content: Dict,
+                         document: Optional[PostDocument] = None) -> Dict:
+        """新規投稿の内部リンク処理
         
-    def process_new_post(self, new_post_path: Path, post_content: Dict) -> Dict:
-        """新規投稿の内部リンク処理"""
+        document: 組み立て中の新規記事。渡した場合は関連記事カードを document に追加するだけで
+        新規記事のファイルは読み書きしない（呼び出し側で document.save() する）
+        """
         
         logger.info(f"新規投稿の内部リンク処理開始: {new_post_path}")
         
-        # 1. 関連記事を検索
-        related_posts = self._find_related_posts(post_content)
+        # 1. 関連記事を検索（新規記事自身は除く）
+        if document is not None:
+            body = document.render_body()
+        else:
+            body = self.read_post_body(new_post_path) if new_post_path.exists() else None
+        related_posts = self._find_related_posts(post_content, exclude=new_post_path, body=body)
         
         # 2. 新規記事に関連記事リンクを追加
-        self._add_related_links_to_new_post(new_post_path, related_posts)
-        
         # 3. 既存記事から新規記事への逆リンク追加
-        self._add_backlinks_to_existing_posts(new_post_path, post_content, related_posts)
+        # （記事ごとに追加をまとめ、各記事を1回ずつ書き込む）
+        writer = BacklinkWriter(self.config.get('backlink_workers', 4))
+        self._add_related_links_to_new_post(new_post_path, related_posts, writer, document)
+        backlink_files = self._add_backlinks_to_existing_posts(new_post_path, post_content, related_posts, writer)
+        written = writer.flush()
+        if document is not None and document.related_cards:
+            logger.info(f"✓ 関連記事リンクを追加: {new_post_path}（書き込みは記事の保存時）")
+        elif written.get(new_post_path):
+            logger.info(f"✓ 関連記事リンクを追加: {new_post_path}")
+        backlinks_added = 0
+        for existing_file in backlink_files:
+            if written.get(existing_file):
+                backlinks_added += 1
+                logger.info(f"✓ 逆リンク追加: {existing_file} → {new_post_path}")
         
-        # 4. リンクデータベースを更新
+        # 4. リンクデータベースを更新（逆リンクは種別 backlink で登録し、関連記事の再構成で消さない）
         self._update_link_database(new_post_path, post_content, related_posts)
+        self._record_backlinks(new_post_path, related_posts, backlink_files)
         
         logger.info(f"✓ 内部リンク処理完了: {len(related_posts)}件の関連記事")
         
         return {
             'related_posts': related_posts,
-            'backlinks_added': len(related_posts)
+            'backlinks_added': backlinks_added
         }
     
-    def _find_related_posts(self, post_content: Dict) -> List[Dict]:
-        """関連記事を検索"""
+    def _find_related_posts(self, post_content: Dict, exclude: Optional[Path] = None,
+                            body: Optional[str] = None) -> List[Dict]:
+        """関連記事を検索（インデックスがあれば語を共有する記事と本文の似た記事だけを候補にする）"""
         
         related_posts = []
-        new_keywords = set(post_content.get('keywords', []))
-        new_title = post_content.get('title', '')
-        
-        # 既存記事を調査
-        if self.posts_dir.exists():
-            for post_file in self.posts_dir.glob('*.md'):
-                try:
-                    existing_content = self._parse_post_file(post_file)
-                    similarity = self._calculate_similarity(post_content, existing_content)
-                    
-                    if similarity > self.similarity_threshold:
-                        related_posts.append({
-                            'file_path': post_file,
-                            'title': existing_content.get('title', ''),
-                            'url': self._generate_post_url(post_file),
-                            'similarity': similarity,
-                            'excerpt': existing_content.get('excerpt', '')[:100],
-                            'keywords': existing_content.get('keywords', []),
-                            'thumbnail': existing_content.get('image', '')
-                        })
-                        
-                except Exception as e:
-                    logger.warning(f"記事解析エラー {post_file}: {e}")
-                    continue
-        
-        # 類似度でソートし、上位を返す
-        related_posts.sort(key=lambda x: x['similarity'], reverse=True)
+        
+        # 本文の推定Jaccard係数が閾値以上の記事（キーワードの選び方が違っても関連記事とする）
+        body_matches = dict(self._body_matches(body, exclude)) if body else {}
+        # 文埋め込みのコサイン類似度が閾値以上の記事（語が重ならない言い換えも関連記事とする）
+        semantic_matches = dict(self._semantic_matches(post_content, body, exclude))
+        
+        candidates = {
+            post_file.name: (post_file, existing_content)
+            for post_file, existing_content in self._candidate_posts(post_content)
+        }
+        for post_id in (body_matches.keys() | semantic_matches.keys()) - candidates.keys():
+            post_file = self.posts_dir / post_id
+            try:
+                candidates[post_id] = (post_file, self._post_metadata(post_file))
+            except Exception as e:
+                logger.warning(f"記事解析エラー {post_file}: {e}")
+        
+        for post_id, (post_file, existing_content) in candidates.items():
+            if exclude is not None and post_id == exclude.name:
+                continue
+            
+            similarity = self._calculate_similarity(post_content, existing_content)
+            
+            if similarity > self.similarity_threshold or post_id in body_matches or post_id in semantic_matches:
+                related_posts.append({
+                    'file_path': post_file,
+                    'title': existing_content.get('title', ''),
+                    'url': self._generate_post_url(post_file),
+                    'similarity': max(similarity, body_matches.get(post_id, 0.0), semantic_matches.get(post_id, 0.0)),
+                    'body_similarity': body_matches.get(post_id, 0.0),
+                    'semantic_similarity': semantic_matches.get(post_id, 0.0),
+                    'excerpt': (existing_content.get('excerpt') or '')[:100],
+                    'keywords': existing_content.get('keywords', []),
+                    'thumbnail': existing_content.get('image', '')
+                })
+        
+        # 類似度でソートし、上位を返す（同点はファイル名順）
+        related_posts.sort(key=lambda x: (-x['similarity'], x['file_path'].name))
         return related_posts[:self.max_related_posts]
     
+    def _body_matches(self, body: str, exclude: Optional[Path] = None,
+                      threshold: Optional[float] = None) -> List[Tuple[str, float]]:
+        """本文の似た既存記事（記事ID, 推定Jaccard係数）"""
+        
+        if self.body_index is None or not self.posts_dir.exists():
+            return []
+        
+        try:
+            self.body_index.sync(self.read_post_body)
+            return self.body_index.query(body_text(body), threshold,
+                                         exclude=[exclude.name] if exclude is not None else ())
+        except sqlite3.Error as e:
+            logger.warning(f"本文の類似記事インデックスの参照に失敗: {e}")
+            return []
+    
+    def _semantic_matches(self, post_content: Dict, body: Optional[str] = None,
+                          exclude: Optional[Path] = None) -> List[Tuple[str, float]]:
+        """文埋め込みの近い既存記事（記事ID, コサイン類似度）。本文がなければタイトルと要約で比較"""
+        
+        if self.semantic_index is None or not self.posts_dir.exists():
+            return []
+        
+        text = embedding_text(post_content.get('title', ''), body or post_content.get('summary', ''))
+        try:
+            self.semantic_index.sync(self._embedding_text)
+            return self.semantic_index.query(text, self.max_related_posts,
+                                             exclude=[exclude.name] if exclude is not None else ())
+        except sqlite3.Error as e:
+            logger.warning(f"文埋め込みインデックスの参照に失敗: {e}")
+            return []
+        except Exception as e:
+            # モデルのロード失敗など（以降は文埋め込みを使わない）
+            logger.warning(f"文埋め込みモデルを利用できないため意味的な関連記事の検出を無効にします: {e}")
+            self.semantic_index = None
+            return []
+    
+    def index_neighbors(self) -> Dict[str, Dict[str, float]]:
+        """全記事について本文（MinHash）・文埋め込みの近い記事（記事ID → {記事ID: 類似度}）"""
+        
+        neighbors: Dict[str, Dict[str, float]] = {}
+        
+        def merge(matches: Dict[str, List[Tuple[str, float]]]):
+            for post_id, similar in matches.items():
+                entry = neighbors.setdefault(post_id, {})
+                for other, similarity in similar:
+                    entry[other] = max(entry.get(other, 0.0), similarity)
+        
+        if not self.posts_dir.exists():
+            return neighbors
+        
+        if self.body_index is not None:
+            try:
+                self.body_index.sync(self.read_post_body)
+                merge(self.body_index.similar_posts())
+            except sqlite3.Error as e:
+                logger.warning(f"本文の類似記事インデックスの参照に失敗: {e}")
+        
+        if self.semantic_index is not None:
+            try:
+                self.semantic_index.sync(self._embedding_text)
+                merge(self.semantic_index.neighbors(self.max_related_posts))
+            except sqlite3.Error as e:
+                logger.warning(f"文埋め込みインデックスの参照に失敗: {e}")
+            except Exception as e:
+                logger.warning(f"文埋め込みモデルを利用できないため意味的な関連記事の検出を無効にします: {e}")
+                self.semantic_index = None
+        
+        return neighbors
+    
+    def _embedding_text(self, post_file: Path) -> str:
+        """既存記事のベクトル化するテキスト"""
+        return embedding_text(self._post_metadata(post_file).get('title', ''), self.read_post_body(post_file))
+    
+    def find_near_duplicates(self, body: str, exclude: Optional[Path] = None) -> List[Dict]:
+        """本文がほぼ同じ既存記事（同じ動画の記事を二重に公開しないための確認）
+        
+        body: Front Matterを除いた記事本文（HTML）
+        """
+        
+        if self.body_index is None:
+            return []
+        
+        duplicates = []
+        for post_id, similarity in self._body_matches(body, exclude, self.body_index.duplicate_threshold):
+            post_file = self.posts_dir / post_id
+            duplicates.append({
+                'file_path': str(post_file),
+                'title': self._post_metadata(post_file).get('title', ''),
+                'url': self._generate_post_url(post_file),
+                'similarity': similarity
+            })
+        
+        if duplicates:
+            logger.warning(f"本文がほぼ同じ既存記事があります: {', '.join(d['file_path'] for d in duplicates)}")
+        return duplicates
+    
+    def _candidate_posts(self, post_content: Dict):
+        """類似度を計算する既存記事（ファイルパス, メタデータ）"""
+        
+        if not self.posts_dir.exists():
+            return
+        
+        if self.post_index is not None:
+            try:
+                self.post_index.sync(self._post_metadata)
+                candidates = self.post_index.candidates(post_content, SIMILARITY_WEIGHTS, self.similarity_threshold)
+            except sqlite3.Error as e:
+                logger.warning(f"関連記事インデックスの参照に失敗（全記事を走査します）: {e}")
+            else:
+                for post_id in sorted(candidates):
+                    yield self.posts_dir / post_id, candidates[post_id]
+                return
+        
+        for post_file in self.posts_dir.glob('*.md'):
+            try:
+                yield post_file, self._post_metadata(post_file)
+            except Exception as e:
+                logger.warning(f"記事解析エラー {post_file}: {e}")
+    
+    def _post_metadata(self, post_file: Path) -> Dict:
+        """関連記事の判定と表示に使うFront Matterの項目"""
+        return link_metadata(self._parse_post_file(post_file) or {})
+    
     def _calculate_similarity(self, post1: Dict, post2: Dict) -> float:
         """記事間の類似度を計算"""
         
@@ -118,235 +376,287 @@ class InternalLinkManager:
         
         # 重み付き総合類似度
         total_similarity = (
-            keyword_similarity * 0.5 +
-            title_similarity * 0.3 +
-            category_similarity * 0.2
+            keyword_similarity * SIMILARITY_WEIGHTS['keywords'] +
+            title_similarity * SIMILARITY_WEIGHTS['title'] +
+            category_similarity * SIMILARITY_WEIGHTS['categories']
         )
         
         return total_similarity
     
     def _parse_post_file(self, post_file: Path) -> Dict:
-        """記事ファイルを解析してメタデータを抽出"""
-        
-        content = post_file.read_text(encoding='utf-8')
+        """記事ファイルを解析してメタデータを抽出（更新時刻・サイズが変わっていなければキャッシュから）"""
         
-        # Front Matterを抽出
-        front_matter_match = re.match(r'^---\n(.*?)\n---', content, re.DOTALL)
-        if front_matter_match:
+        if self.metadata_cache is not None:
             try:
-                front_matter = yaml.safe_load(front_matter_match.group(1))
-                return front_matter
-            except yaml.YAMLError as e:
-                logger.warning(f"YAML解析エラー {post_file}: {e}")
-                return {}
+                record = self.metadata_cache.get(post_file)
+                return record['front_matter'] if record else {}
+            except sqlite3.Error as e:
+                logger.warning(f"記事メタデータキャッシュの読み込みに失敗: {e}")
         
-        return {}
+        return parse_post(post_file, post_file.read_text(encoding='utf-8'))['front_matter']
     
-    def _add_related_links_to_new_post(self, post_path: Path, related_posts: List[Dict]):
-        """新規記事に関連記事リンクを追加"""
-        
-        if not related_posts:
-            return
-        
-        content = post_path.read_text(encoding='utf-8')
-        
-        # 関連記事セクションを生成
-        related_section = self._generate_related_posts_section(related_posts)
+    def read_post_body(self, post_file: Path) -> str:
+        """記事ファイルのFront Matterを除いた本文"""
         
-        # 記事の最後（</div>の直前）に挿入
-        if '</div>' in content:
-            content = content.replace('</div>', f'{related_section}\n</div>')
-        else:
-            content += f'\n\n{related_section}'
+        content = Path(post_file).read_text(encoding='utf-8')
+        match = FRONT_MATTER_PATTERN.match(content)
+        return content[match.end():] if match else content
+    
+    def _add_related_links_to_new_post(self, post_path: Path, related_posts: List[Dict], writer: BacklinkWriter,
+                                       document: Optional[PostDocument] = None):
+        """新規記事に関連記事リンクを追加（document があればそこへ、なければ writer.flush で書き込む）"""
         
-        post_path.write_text(content, encoding='utf-8')
-        logger.info(f"✓ 関連記事リンクを追加: {post_path}")
+        for post in related_posts:
+            if document is not None:
+                document.add_related_card(self._generate_related_card(post), url=post['url'])
+            else:
+                writer.add(post_path, self._generate_related_card(post), url=post['url'])
+    
+    def _generate_related_card(self, post: Dict, tags: Optional[List[str]] = None) -> str:
+        """関連記事カードのHTMLを生成（タグの指定がなければキーワード上位3件）"""
+        return related_card(post, tags if tags is not None else list(post.get('keywords', []))[:3])
     
     def _generate_related_posts_section(self, related_posts: List[Dict]) -> str:
         """関連記事セクションのHTMLを生成"""
-        
-        section = ['<div class="related-posts-section">']
-        section.append('<h3>🔗 関連記事</h3>')
-        section.append('<div class="related-posts-grid">')
-        
-        for post in related_posts:
-            thumbnail = post.get('thumbnail', '/assets/images/default-thumbnail.png')
-            
-            section.append('  <div class="related-post-card">')
-            section.append(f'    <div class="related-post-thumbnail">')
-            section.append(f'      <img src="{thumbnail}" alt="{post["title"]}" loading="lazy">')
-            section.append(f'    </div>')
-            section.append(f'    <div class="related-post-content">')
-            section.append(f'      <h4><a href="{post["url"]}">{post["title"]}</a></h4>')
-            section.append(f'      <p class="related-post-excerpt">{post["excerpt"]}...</p>')
-            section.append(f'      <div class="related-post-tags">')
-            
-            for keyword in post.get('keywords', [])[:3]:
-                section.append(f'        <span class="tag-small">{keyword}</span>')
-            
-            section.append(f'      </div>')
-            section.append(f'    </div>')
-            section.append('  </div>')
-        
-        section.append('</div>')
-        section.append('</div>')
-        
-        return '\n'.join(section)
+        return related_section([self._generate_related_card(post) for post in related_posts])
     
-    def _add_backlinks_to_existing_posts(self, new_post_path: Path, new_post_content: Dict, related_posts: List[Dict]):
-        """既存記事に新規記事への逆リンクを追加"""
-        
-        new_title = new_post_content.get('title', '')
-        new_url = self._generate_post_url(new_post_path)
-        new_excerpt = new_post_content.get('summary', '')[:100]
-        new_thumbnail = new_post_content.get('featured_image', '/assets/images/default-thumbnail.png')
+    def _add_backlinks_to_existing_posts(self, new_post_path: Path, new_post_content: Dict, related_posts: List[Dict],
+                                         writer: BacklinkWriter) -> List[Path]:
+        """既存記事に新規記事への逆リンクを追加（書き込みは writer.flush で行う。対象の記事ファイルを返す）"""
+        
+        new_post = {
+            'title': new_post_content.get('title', ''),
+            'url': self._generate_post_url(new_post_path),
+            'excerpt': new_post_content.get('summary', '')[:100],
+            'thumbnail': new_post_content.get('featured_image', DEFAULT_THUMBNAIL),
+        }
         
-        for related_post in related_posts[:2]:  # 上位2件のみに逆リンク追加
-            existing_file = related_post['file_path']
-            
-            try:
-                content = existing_file.read_text(encoding='utf-8')
-                
-                # 既に関連記事セクションがあるかチェック
-                if '<div class="related-posts-section">' in content:
-                    # 既存のセクションに追加
-                    self._append_to_existing_related_section(existing_file, new_title, new_url, new_excerpt, new_thumbnail)
-                else:
-                    # 新しく関連記事セクションを作成
-                    new_related_info = {
-                        'title': new_title,
-                        'url': new_url,
-                        'excerpt': new_excerpt,
-                        'thumbnail': new_thumbnail,
-                        'keywords': new_post_content.get('keywords', [])[:3]
-                    }
-                    self._add_related_links_to_new_post(existing_file, [new_related_info])
-                
-                logger.info(f"✓ 逆リンク追加: {existing_file} → {new_post_path}")
-                
-            except Exception as e:
-                logger.warning(f"逆リンク追加エラー {existing_file}: {e}")
-    
-    def _append_to_existing_related_section(self, post_file: Path, new_title: str, new_url: str, new_excerpt: str, new_thumbnail: str):
-        """既存の関連記事セクションに新しい記事を追加"""
-        
-        content = post_file.read_text(encoding='utf-8')
-        
-        # 新しい関連記事カードを生成
-        new_card = f"""  <div class="related-post-card">
-    <div class="related-post-thumbnail">
-      <img src="{new_thumbnail}" alt="{new_title}" loading="lazy">
-    </div>
-    <div class="related-post-content">
-      <h4><a href="{new_url}">{new_title}</a></h4>
-      <p class="related-post-excerpt">{new_excerpt}...</p>
-      <div class="related-post-tags">
-        <span class="tag-small">新着</span>
-      </div>
-    </div>
-  </div>"""
-        
-        # 関連記事グリッドに挿入
-        grid_end = '</div>\n</div>'  # related-posts-grid の終了タグ
-        if grid_end in content:
-            content = content.replace(grid_end, f'{new_card}\n{grid_end}')
-            post_file.write_text(content, encoding='utf-8')
+        # 上位2件のみに逆リンク追加（既存の関連記事セクションがあれば末尾に、なければセクションを作成）
+        targets = [related_post['file_path'] for related_post in related_posts[:2]]
+        for existing_file in targets:
+            writer.add(existing_file, self._generate_related_card(new_post, [BACKLINK_TAG]), url=new_post['url'])
+        return targets
+    
+    def _record_backlinks(self, new_post_path: Path, related_posts: List[Dict], backlink_files: List[Path]):
+        """既存記事から新規記事への逆リンクを登録"""
+        
+        similarities = {related_post['file_path']: related_post['similarity'] for related_post in related_posts}
+        self.link_database.add_links([
+            {'from': str(existing_file), 'to': str(new_post_path), 'type': 'backlink',
+             'similarity': similarities.get(existing_file, 0.0)}
+            for existing_file in backlink_files
+        ])
     
     def _generate_post_url(self, post_file: Path) -> str:
         """記事ファイルからURLを生成"""
-        
-        # ファイル名から日付とスラッグを抽出
-        filename = post_file.stem
-        
-        # 日付部分を抽出 (YYYY-MM-DD-)
-        date_match = re.match(r'(\d{4})-(\d{2})-(\d{2})-(.*)', filename)
-        if date_match:
-            year, month, day, slug = date_match.groups()
-            return f"/{year}/{month}/{day}/{slug}/"
-        
-        # フォールバック
-        return f"/posts/{filename}/"
+        return post_url(post_file)
     
     def _update_link_database(self, new_post_path: Path, post_content: Dict, related_posts: List[Dict]):
-        """リンクデータベースを更新"""
-        
-        # 既存データベースを読み込み
-        database = {}
-        if self.link_database.exists():
-            try:
-                with open(self.link_database, 'r', encoding='utf-8') as f:
-                    database = json.load(f)
-            except json.JSONDecodeError:
-                logger.warning("リンクデータベースを新規作成します")
-                database = {'posts': {}, 'links': []}
-        else:
-            database = {'posts': {}, 'links': []}
-        
-        # 新規記事情報を追加
-        post_id = str(new_post_path)
-        database['posts'][post_id] = {
-            'title': post_content.get('title', ''),
-            'keywords': post_content.get('keywords', []),
-            'created_at': datetime.now().isoformat(),
-            'url': self._generate_post_url(new_post_path)
-        }
-        
-        # リンク関係を記録
-        for related_post in related_posts:
-            database['links'].append({
-                'from': post_id,
-                'to': str(related_post['file_path']),
-                'similarity': related_post['similarity'],
-                'created_at': datetime.now().isoformat(),
-                'type': 'related'
-            })
-        
-        # データベースを保存
-        self.link_database.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.link_database, 'w', encoding='utf-8') as f:
-            json.dump(database, f, ensure_ascii=False, indent=2)
+        """リンクデータベースを更新（記事とリンクを1トランザクションで登録）"""
+        
+        self.link_database.record_post(
+            post_id=str(new_post_path),
+            title=post_content.get('title', ''),
+            keywords=post_content.get('keywords', []),
+            url=self._generate_post_url(new_post_path),
+            links=[
+                {'to': str(related_post['file_path']), 'similarity': related_post['similarity'], 'type': 'related'}
+                for related_post in related_posts
+            ]
+        )
         
-        logger.info(f"✓ リンクデータベース更新: {self.link_database}")
+        logger.info(f"✓ リンクデータベース更新: {self.link_database.db_path}")
 
 
 class RelatedPostsAnalyzer:
-    """関連記事分析エンジン"""
+    """関連記事分析エンジン（全記事の類似度を行列演算で一括計算）"""
     
     def __init__(self, config: Dict):
         self.config = config
+        self.similarity_threshold = config.get('similarity_threshold', 0.6)
+        self.max_related_posts = config.get('max_related_posts', 3)
+        self.metadata_cache = PostMetadataCache(config.get('metadata_cache', 'cache/post_metadata.db'))
+    
+    def compute_related(self, posts_dir: Path) -> Dict:
+        """全記事の関連記事（類似度上位 max_related_posts 件）
         
-    def analyze_post_relationships(self, posts_dir: Path) -> Dict:
-        """記事間の関係性を分析"""
+        戻り値: posts（記事ファイル）/ metadata / records（メタデータキャッシュ）/ neighbors / scores
+        """
+        
+        posts_dir = Path(posts_dir)
+        records = self.metadata_cache.scan(posts_dir)
+        metadata = [link_metadata(record['front_matter']) for record in records]
+        terms = [field_terms(post) for post in metadata]
         
-        relationships = {
-            'clusters': [],
-            'popular_topics': [],
-            'link_density': 0,
-            'orphaned_posts': []
+        neighbors, scores = top_k_similar(
+            {field: [post_terms[field] for post_terms in terms] for field in SIMILARITY_WEIGHTS},
+            SIMILARITY_WEIGHTS, self.max_related_posts, self.similarity_threshold,
+            max_work=self.config.get('relink_block_work', DEFAULT_BLOCK_WORK)
+        )
+        return {
+            'posts': [posts_dir / record['name'] for record in records],
+            'metadata': metadata,
+            'records': records,
+            'neighbors': neighbors,
+            'scores': scores,
         }
+    
+    def analyze_post_relationships(self, posts_dir: Path) -> Dict:
+        """記事間の関係性を分析（関連記事のつながりによるクラスタ・人気トピック・リンク密度・孤立記事）"""
         
-        # 実装は複雑になるため、必要に応じて拡張
-        logger.info("関係性分析完了")
+        started = time.perf_counter()
+        related = self.compute_related(posts_dir)
+        relationships = summarize_relationships(related)
+        relationships['seconds'] = round(time.perf_counter() - started, 3)
+        
+        logger.info(f"関係性分析完了: {len(related['posts'])} 記事 / クラスタ {len(relationships['clusters'])} / "
+                    f"孤立記事 {len(relationships['orphaned_posts'])}")
         
         return relationships
 
 
+def summarize_relationships(related: Dict, top_topics: int = 10) -> Dict:
+    """関連記事の計算結果からクラスタ・人気トピック・リンク密度・孤立記事を求める"""
+    
+    posts = related['posts']
+    metadata = related['metadata']
+    neighbors = related['neighbors']
+    num_posts = len(posts)
+    
+    sources, slots = np.nonzero(neighbors >= 0)
+    targets = neighbors[sources, slots]
+    labels = connected_components(num_posts, sources, targets)
+    
+    # 2記事以上のつながりをクラスタとする（大きい順）
+    members: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels.tolist()):
+        members.setdefault(label, []).append(index)
+    clusters = []
+    for indices in sorted(members.values(), key=lambda m: (-len(m), m[0])):
+        if len(indices) < 2:
+            continue
+        keyword_counts = Counter(str(k) for i in indices for k in set(metadata[i]['keywords']))
+        clusters.append({
+            'size': len(indices),
+            'posts': [posts[i].name for i in indices],
+            'topics': [keyword for keyword, _ in keyword_counts.most_common(5)],
+        })
+    
+    # 関連記事が1件もなく、どの記事の関連記事にも選ばれない記事
+    linked = np.zeros(num_posts, dtype=bool)
+    linked[sources] = True
+    linked[targets] = True
+    
+    keyword_counts = Counter(str(k) for post in metadata for k in set(post['keywords']))
+    return {
+        'clusters': clusters,
+        'popular_topics': [{'keyword': keyword, 'posts': count}
+                           for keyword, count in keyword_counts.most_common(top_topics)],
+        'link_density': round(len(sources) / num_posts, 3) if num_posts else 0,
+        'orphaned_posts': [posts[i].name for i in np.flatnonzero(~linked).tolist()],
+    }
+
+
 class LinkOptimizer:
-    """リンク最適化エンジン"""
+    """リンク最適化エンジン（全記事の関連記事セクションを一括で再構成）"""
     
     def __init__(self, config: Dict):
         self.config = config
+        self.analyzer = RelatedPostsAnalyzer(config)
+        self.max_workers = config.get('backlink_workers', 4)
+        self.max_related_posts = config.get('max_related_posts', 3)
         
     def optimize_internal_links(self, posts_dir: Path) -> Dict:
-        """内部リンク構造を最適化"""
+        """内部リンク構造を最適化（各記事の関連記事セクションを類似度上位の記事で置き換え）
+        
+        候補は新規投稿時と同じく、メタデータのJaccard係数の上位に本文（MinHash）・文埋め込みの近い記事を加えたもの。
+        新規記事への逆リンク（新着カード）は残す
+        """
+        
+        started = time.perf_counter()
+        related = self.analyzer.compute_related(posts_dir)
+        posts = related['posts']
+        metadata = related['metadata']
+        records = related['records']
+        urls = [record['url'] for record in records]
+        
+        positions = {post_file.name: index for index, post_file in enumerate(posts)}
+        index_neighbors = InternalLinkManager({**self.config, 'posts_directory': str(posts_dir)}).index_neighbors()
+        
+        transforms = {}
+        link_changes: Dict[Path, Tuple[int, int]] = {}
+        database_posts = []
+        for index, post_file in enumerate(posts):
+            scores = {int(j): float(score) for j, score in zip(related['neighbors'][index], related['scores'][index])
+                      if j >= 0}
+            for post_id, similarity in index_neighbors.get(post_file.name, {}).items():
+                j = positions.get(post_id)
+                if j is not None and j != index:
+                    scores[j] = max(scores.get(j, 0.0), similarity)
+            # 類似度の降順（同点はファイル名順）に上位を選ぶ
+            chosen = sorted(scores.items(), key=lambda item: (-item[1], posts[item[0]].name))[:self.max_related_posts]
+            cards = [
+                related_card({
+                    'title': metadata[j]['title'],
+                    'url': urls[j],
+                    'excerpt': (metadata[j]['excerpt'] or records[j]['excerpt'])[:100],
+                    'thumbnail': metadata[j]['image'],
+                }, list(metadata[j]['keywords'])[:3])
+                for j, _ in chosen
+            ]
+            transforms[post_file] = self._rewrite_section(post_file, cards, {urls[j] for j, _ in chosen}, link_changes)
+            database_posts.append({
+                'post_id': str(post_file),
+                'title': metadata[index]['title'],
+                'keywords': metadata[index]['keywords'],
+                'url': urls[index],
+                'links': [{'to': str(posts[j]), 'similarity': score} for j, score in chosen],
+            })
+        
+        # 記事の書き戻し（変更のある記事のみ・並列）とリンクデータベースの置き換え
+        written = rewrite_posts(transforms, self.max_workers)
+        database = open_link_database(self.config)
+        database.replace_links(database_posts)
         
+        # 逆リンクなども含めた保存済みのリンク全体で、被リンクのない記事を数える
+        graph = LinkGraphAnalytics(database).refresh()
+        relationships = summarize_relationships(related)
+        changed = [post_file for post_file, done in written.items() if done]
         optimization_results = {
-            'links_added': 0,
-            'links_removed': 0,
-            'clusters_formed': 0
+            'links_added': sum(link_changes[p][0] for p in changed),
+            'links_removed': sum(link_changes[p][1] for p in changed),
+            'clusters_formed': len(relationships['clusters']),
+            'posts_updated': len(changed),
+            'orphaned_posts': len(relationships['orphaned_posts']),
+            'posts_without_inbound_links': len(graph.orphans()),
+            'seconds': round(time.perf_counter() - started, 3),
         }
         
-        # 最適化ロジックを実装
-        logger.info("リンク最適化完了")
+        logger.info(f"リンク最適化完了: {len(posts)} 記事中 {len(changed)} 記事を更新 "
+                    f"（+{optimization_results['links_added']} / -{optimization_results['links_removed']}）")
         
-        return optimization_results
\ No newline at end of file
+        return optimization_results
+    
+    @staticmethod
+    def _rewrite_section(post_file: Path, cards: List[str], new_urls: Set[str],
+                         link_changes: Dict[Path, Tuple[int, int]]):
+        """記事の関連記事セクションを置き換える変換（追加・削除したリンク数を link_changes に記録）
+        
+        逆リンクのカード（新着）は、そのリンク先が新しい関連記事に含まれなければ後ろに残す
+        """
+        
+        def transform(content: str) -> Optional[str]:
+            old_urls = set(section_links(content))
+            kept_cards = []
+            kept_urls = set()
+            for card in section_cards(content):
+                card_urls = set(LINK_HREF_PATTERN.findall(card))
+                if is_backlink_card(card) and card_urls and not card_urls & new_urls:
+                    kept_cards.append(card)
+                    kept_urls |= card_urls
+            urls = new_urls | kept_urls
+            if old_urls == urls:
+                return None
+            link_changes[post_file] = (len(urls - old_urls), len(old_urls - urls))
+            return replace_related_section(content, cards + kept_cards)
+        return transform
@@ -5,13 +5,33 @@ Jekyll用ブログ記事生成モジュール
 import logging
 import re
 from pathlib import Path
-from datetime import datetime
-from typing import Dict, List, Optional
+from datetime import date, datetime
+from typing import Dict, List, Optional, Union
 import yaml
 
+from .post_document import PostDocument
+from .text_patterns import NON_ASCII_PATTERN, format_inline_markdown, slugify
+
+# ポイントテキストの不自然な文末・口語表現の補正
+POINT_TEXT_CLEANUPS = [
+    (re.compile(r'、このシステムを活用して、.*?で$'), ''),
+    (re.compile(r'っていう.*?です$'), 'ということ'),
+    (re.compile(r'じゃないかな'), 'ではないか'),
+]
+
+# 記事フッターの更新日
+UPDATED_DATE_FORMAT = '%Y年%m月%d日'
+UPDATED_DATE_PATTERN = re.compile(r'<dt>更新日</dt>\s*<dd>(\d{4}年\d{2}月\d{2}日)</dd>')
+
 logger = logging.getLogger(__name__)
 
 
+def find_updated_date(html: str) -> Optional[date]:
+    """記事フッターの更新日（見つからなければNone）"""
+    match = UPDATED_DATE_PATTERN.search(html)
+    return datetime.strptime(match.group(1), UPDATED_DATE_FORMAT).date() if match else None
+
+
 class JekyllWriter:
     """Jekyll記事生成クラス"""
     
@@ -26,6 +46,15 @@ class JekyllWriter:
                    featured_image: Optional[Path] = None, section_images: Optional[Dict[str, Path]] = None) -> Path:
         """Jekyll用のブログ記事を生成"""
         
+        post_path = self.create_document(title, content, transcript, output_dir, featured_image, section_images).save()
+        logger.info(f"✓ Jekyll記事生成: {post_path}")
+        return post_path
+    
+    def create_document(self, title: str, content: Dict, transcript: Dict, output_dir: Path,
+                        featured_image: Optional[Path] = None,
+                        section_images: Optional[Dict[str, Path]] = None) -> PostDocument:
+        """Jekyll用のブログ記事をファイルに書かずに組み立てる（関連記事・動画リンクを追加してから save する）"""
+        
         # 出力ディレクトリ作成
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
@@ -40,29 +69,31 @@ class JekyllWriter:
         front_matter = self._generate_front_matter(title, content, date, featured_image)
         
         # 記事本文生成（セクション画像を含む）
-        post_content = self._generate_post_content(title, content, transcript, section_images)
-        
-        # ファイルに書き込み
-        full_content = f"{front_matter}\n{post_content}"
-        post_path.write_text(full_content, encoding='utf-8')
+        post_content = self.render_body(title, content, transcript, section_images)
         
-        logger.info(f"✓ Jekyll記事生成: {post_path}")
-        return post_path
+        return PostDocument.from_html(post_path, f"{front_matter}\n{post_content}")
+    
+    def render_body(self, title: str, content: Dict, transcript: Dict,
+                    section_images: Optional[Dict[str, Path]] = None,
+                    updated: Optional[date] = None) -> str:
+        """記事本文（Front Matterを除くHTML）をファイルに書かずに生成
+        
+        updated: フッターの更新日（省略時は今日。再生成では元の記事の更新日を渡す）
+        """
+        return self._generate_post_content(title, content, transcript, section_images, updated)
     
     def _create_slug(self, title: str) -> str:
         """タイトルからURLスラッグを生成"""
         # 日本語を含むタイトルをローマ字変換（簡易版）
         slug = title.lower()
         
-        # 特殊文字を削除
-        slug = re.sub(r'[^\w\s-]', '', slug)
-        # 空白をハイフンに
-        slug = re.sub(r'[-\s]+', '-', slug)
+        # 特殊文字を削除し、空白をハイフンに
+        slug = slugify(slug)
         # 前後のハイフンを削除
         slug = slug.strip('-')
         
         # 日本語が含まれる場合は日付ベースのスラッグに
-        if re.search(r'[^\x00-\x7F]', title):
+        if NON_ASCII_PATTERN.search(title):
             slug = f"post-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
         return slug[:50]  # 最大50文字
@@ -106,7 +137,8 @@ class JekyllWriter:
         return front_matter
     
     def _generate_post_content(self, title: str, content: Dict, transcript: Dict, 
-                             section_images: Optional[Dict[str, Path]] = None) -> str:
+                             section_images: Optional[Dict[str, Path]] = None,
+                             updated: Optional[date] = None) -> str:
         """記事本文を生成（HTML形式）"""
         
         sections = []
@@ -218,7 +250,7 @@ class JekyllWriter:
         sections.append(f'  <dt>読了時間</dt>')
         sections.append(f'  <dd>約{content.get("reading_time", 1)}分</dd>')
         sections.append(f'  <dt>更新日</dt>')
-        sections.append(f'  <dd>{datetime.now().strftime("%Y年%m月%d日")}</dd>')
+        sections.append(f'  <dd>{(updated or datetime.now()).strftime(UPDATED_DATE_FORMAT)}</dd>')
         sections.append('</dl>')
         
         # 主要ポイント（HTML形式）
@@ -236,22 +268,18 @@ class JekyllWriter:
         
         return "\n".join(sections)
     
-    def add_video_link_section(self, post_path: Path, video_url: str):
-        """既存記事に動画リンクセクションを追加"""
-        
-        content = post_path.read_text(encoding='utf-8')
+    def add_video_link_section(self, post: Union[Path, PostDocument], video_url: str):
+        """記事に動画リンクセクションを追加（記事フッターの直前。フッターがなければ最後）
         
-        video_section = self._generate_video_link_section(video_url)
+        post: 組み立て中の記事（書き込みは呼び出し側の save で行う）、または既存記事のファイル
+        """
         
-        # 記事フッターの直前に挿入
-        if '<div class="article-footer">' in content:
-            content = content.replace('<div class="article-footer">', f'{video_section}\n\n<div class="article-footer">')
-        else:
-            # フッターがない場合は最後に追加
-            content += f'\n\n{video_section}'
+        document = post if isinstance(post, PostDocument) else PostDocument.load(post)
+        document.set_video_section(self._generate_video_link_section(video_url))
         
-        post_path.write_text(content, encoding='utf-8')
-        logger.info(f"✓ 動画リンクセクション追加: {post_path}")
+        if not isinstance(post, PostDocument):
+            document.save()
+        logger.info(f"✓ 動画リンクセクション追加: {document.path}")
     
     def _generate_video_link_section(self, video_url: str) -> str:
         """動画リンクセクションのHTMLを生成"""
@@ -271,8 +299,7 @@ class JekyllWriter:
     def _create_anchor(self, title: str) -> str:
         """見出しからアンカーIDを生成"""
         # 日本語を含むタイトルをURLセーフな形式に変換
-        anchor = re.sub(r'[^\w\s-]', '', title.lower())
-        anchor = re.sub(r'[-\s]+', '-', anchor)
+        anchor = slugify(title)
         
         # 日本語の場合はハッシュ化
         if not anchor or anchor == '-':
@@ -283,14 +310,8 @@ class JekyllWriter:
     
     def _process_inline_formatting(self, text: str) -> str:
         """インライン書式を処理（太字、強調など）"""
-        # **text** を <strong>text</strong> に変換
-        text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
-        # *text* を <em>text</em> に変換
-        text = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', text)
-        # 絵文字の前後にスペースを追加（読みやすさのため）
-        text = re.sub(r'([^\s])([\u2600-\u27BF\U0001F300-\U0001F9FF])', r'\1 \2', text)
-        text = re.sub(r'([\u2600-\u27BF\U0001F300-\U0001F9FF])([^\s])', r'\1 \2', text)
-        return text
+        # **text** → <strong>、*text* → <em>、絵文字の前後にスペースを追加（読みやすさのため）
+        return format_inline_markdown(text, space_emoji=True)
     
     def _generate_blog_images(self, title: str, content: Dict, transcript: Dict, 
                             output_dir: Path, youtube_thumbnail: Optional[Path] = None) -> tuple:
@@ -355,9 +376,8 @@ class JekyllWriter:
     def _clean_point_text(self, text: str) -> str:
         """ポイントテキストをクリーンアップ"""
         # 不自然な文末や繰り返しを削除
-        text = re.sub(r'、このシステムを活用して、.*?で$', '', text)
-        text = re.sub(r'っていう.*?です$', 'ということ', text)
-        text = re.sub(r'じゃないかな', 'ではないか', text)
+        for pattern, replacement in POINT_TEXT_CLEANUPS:
+            text = pattern.sub(replacement, text)
         
         # より自然な日本語に
         if len(text) > 50:
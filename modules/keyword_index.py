@@ -0,0 +1,314 @@
+"""
+キーワードインデックスモジュール
+処理済みの文字起こしと_postsの記事から文書頻度（DF）をSQLiteに永続化し、TF-IDFでキーワードを順位付け
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from .text_patterns import FRONT_MATTER_PATTERN, HTML_TAG_PATTERN
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS document_terms (
+    doc_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    PRIMARY KEY (doc_id, term)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (
+    term TEXT PRIMARY KEY,
+    df INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# SQLiteのバインド変数上限に収まる問い合わせ単位
+_QUERY_CHUNK = 500
+
+
+def transcript_doc_id(text: str) -> str:
+    """文字起こしの文書ID（同じ文字起こしを二重に数えないよう内容のハッシュ）"""
+    return f"transcript:{hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]}"
+
+
+def post_body_text(content: str) -> str:
+    """記事ファイルからFront MatterとHTMLタグを除いた本文"""
+    content = FRONT_MATTER_PATTERN.sub('', content, count=1)
+    return HTML_TAG_PATTERN.sub(' ', content)
+
+
+class KeywordIndex(SQLiteStore):
+    """文書頻度インデックス（文書の追加・更新は差分のみ反映）"""
+
+    def __init__(self, config: Dict, term_scheme: str = 'regex'):
+        self.config = config
+        self.term_scheme = term_scheme
+        self.db_path = Path(config.get('index_path', 'cache/keyword_index.db'))
+        self.posts_dir = Path(config['posts_dir']) if config.get('posts_dir') else None
+        self.transcripts_dir = Path(config['transcripts_dir']) if config.get('transcripts_dir') else None
+        self.min_documents = int(config.get('min_documents', 5))
+        self.sync_interval = float(config.get('sync_interval_seconds', 60))
+
+        self._sync_lock = threading.Lock()
+        self._last_sync = 0.0
+
+        self._open_database(self.db_path, SCHEMA)
+        self._check_term_scheme()
+
+    def _check_term_scheme(self):
+        """語の抽出方式が変わっていればインデックスを作り直す（語彙が一致しないため）"""
+
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'term_scheme'").fetchone()
+            if row and row[0] == self.term_scheme:
+                return
+            if row:
+                logger.info(f"語の抽出方式が変わったためキーワードインデックスを再構築: {row[0]} → {self.term_scheme}")
+                for table in ('documents', 'document_terms', 'terms'):
+                    conn.execute(f'DELETE FROM {table}')
+                # 改訂番号は引き継ぐ（再構築前後のコーパスの状態を区別するため）
+                conn.execute("DELETE FROM meta WHERE key != 'revision'")
+                self._bump_revision(conn)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('term_scheme', ?)", (self.term_scheme,))
+
+    @property
+    def num_documents(self) -> int:
+        """登録済み文書数"""
+        row = self._get_connection().execute("SELECT value FROM meta WHERE key = 'num_documents'").fetchone()
+        return int(row[0]) if row else 0
+
+    def is_ready(self, exclude_doc_id: Optional[str] = None) -> bool:
+        """IDFが意味を持つだけの文書が集まっているか（exclude_doc_id の文書は数えない）"""
+        excluded = 1 if exclude_doc_id and self._own_terms(exclude_doc_id) is not None else 0
+        return self.num_documents - excluded >= self.min_documents
+
+    def corpus_state(self, exclude_doc_id: Optional[str] = None) -> str:
+        """コーパスの状態（文書の追加・更新・削除のたびに変わる）
+
+        exclude_doc_id の文書が登録済みならその登録分を除く（自分自身の登録で状態が変わらないように）
+        """
+
+        meta = dict(self._get_connection().execute(
+            "SELECT key, value FROM meta WHERE key IN ('num_documents', 'revision')"
+        ).fetchall())
+        num_documents = int(meta.get('num_documents', 0))
+        revision = int(meta.get('revision', 0))
+        if exclude_doc_id and self._own_terms(exclude_doc_id) is not None:
+            # 文字起こしは内容のハッシュが文書IDのため、登録は1回の改訂にしかならない
+            num_documents -= 1
+            revision -= 1
+        return f"{self.term_scheme}:{num_documents}:{revision}"
+
+    def _own_terms(self, doc_id: str) -> Optional[Set[str]]:
+        """登録済み文書の語（未登録ならNone）"""
+
+        conn = self._get_connection()
+        if not conn.execute('SELECT 1 FROM documents WHERE doc_id = ?', (doc_id,)).fetchone():
+            return None
+        return {t for (t,) in conn.execute('SELECT term FROM document_terms WHERE doc_id = ?', (doc_id,))}
+
+    def add_document(self, doc_id: str, terms: Iterable[str], fingerprint: str = '') -> bool:
+        """文書を登録（同じフィンガープリントなら何もしない・変更時は差分のみDFを更新）"""
+
+        new_terms = set(terms)
+        with self._transaction() as conn:
+            row = conn.execute('SELECT fingerprint FROM documents WHERE doc_id = ?', (doc_id,)).fetchone()
+            if row and row[0] == fingerprint:
+                return False
+
+            old_terms = set()
+            if row:
+                old_terms = {t for (t,) in conn.execute(
+                    'SELECT term FROM document_terms WHERE doc_id = ?', (doc_id,)
+                )}
+
+            added = new_terms - old_terms
+            removed = old_terms - new_terms
+
+            conn.executemany(
+                'INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1',
+                [(term,) for term in added]
+            )
+            conn.executemany('UPDATE terms SET df = df - 1 WHERE term = ?', [(term,) for term in removed])
+            conn.executemany('INSERT INTO document_terms (doc_id, term) VALUES (?, ?)',
+                             [(doc_id, term) for term in added])
+            conn.executemany('DELETE FROM document_terms WHERE doc_id = ? AND term = ?',
+                             [(doc_id, term) for term in removed])
+            if removed:
+                conn.execute('DELETE FROM terms WHERE df <= 0')
+
+            conn.execute('INSERT OR REPLACE INTO documents (doc_id, fingerprint, indexed_at) VALUES (?, ?, ?)',
+                         (doc_id, fingerprint, time.time()))
+            if not row:
+                self._bump_document_count(conn, 1)
+            self._bump_revision(conn)
+        return True
+
+    def remove_document(self, doc_id: str):
+        """文書を削除してDFを戻す"""
+
+        with self._transaction() as conn:
+            if not conn.execute('SELECT 1 FROM documents WHERE doc_id = ?', (doc_id,)).fetchone():
+                return
+            terms = [(t,) for (t,) in conn.execute('SELECT term FROM document_terms WHERE doc_id = ?', (doc_id,))]
+            conn.executemany('UPDATE terms SET df = df - 1 WHERE term = ?', terms)
+            conn.execute('DELETE FROM terms WHERE df <= 0')
+            conn.execute('DELETE FROM document_terms WHERE doc_id = ?', (doc_id,))
+            conn.execute('DELETE FROM documents WHERE doc_id = ?', (doc_id,))
+            self._bump_document_count(conn, -1)
+            self._bump_revision(conn)
+
+    def _bump_document_count(self, conn: sqlite3.Connection, delta: int):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('num_documents', ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + ?",
+            (str(max(delta, 0)), delta)
+        )
+
+    @staticmethod
+    def _bump_revision(conn: sqlite3.Connection):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('revision', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(CAST(value AS INTEGER) + 1 AS TEXT)"
+        )
+
+    def document_frequencies(self, terms: List[str]) -> np.ndarray:
+        """指定した語のDF（未登録語は0）。問い合わせは文書内の語数に比例"""
+
+        df = np.zeros(len(terms), dtype=np.int64)
+        positions = {term: i for i, term in enumerate(terms)}
+        conn = self._get_connection()
+        for start in range(0, len(terms), _QUERY_CHUNK):
+            chunk = terms[start:start + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for term, count in conn.execute(f'SELECT term, df FROM terms WHERE term IN ({placeholders})', chunk):
+                df[positions[term]] = count
+        return df
+
+    def tfidf_scores(self, frequencies: Dict[str, int], exclude_doc_id: Optional[str] = None) -> np.ndarray:
+        """文書内の出現回数からTF-IDFスコアを計算（平滑化IDF、frequenciesの順序で返す）
+
+        exclude_doc_id: 採点する文書自身のID。登録済みならその文書の分をDF・文書数から除く
+        （登録の前後で順位が変わらないように）
+        """
+
+        if not frequencies:
+            return np.zeros(0, dtype=np.float64)
+
+        terms = list(frequencies)
+        tf = np.fromiter(frequencies.values(), dtype=np.float64, count=len(frequencies))
+        tf /= tf.sum()
+        df = self.document_frequencies(terms)
+        num_documents = self.num_documents
+
+        own_terms = self._own_terms(exclude_doc_id) if exclude_doc_id else None
+        if own_terms is not None:
+            df -= np.fromiter((term in own_terms for term in terms), dtype=np.int64, count=len(terms))
+            num_documents -= 1
+
+        idf = np.log((1.0 + num_documents) / (1.0 + df)) + 1.0
+        return tf * idf
+
+    def rank(self, frequencies: Dict[str, int], exclude_doc_id: Optional[str] = None) -> List[str]:
+        """TF-IDFの降順に並べた語（同点は元の順序）"""
+
+        terms = list(frequencies)
+        order = np.argsort(-self.tfidf_scores(frequencies, exclude_doc_id), kind='stable')
+        return [terms[i] for i in order]
+
+    def add_transcript(self, text: str, terms: Iterable[str]) -> bool:
+        """処理済みの文字起こしを登録（同じ内容は一度だけ数える）"""
+        doc_id = transcript_doc_id(text)
+        return self.add_document(doc_id, terms, doc_id)
+
+    def sync_corpus(self, analyze, force: bool = False):
+        """_postsの記事（追加・更新・削除）と、初回のみ処理済み文字起こしを取り込む
+
+        analyze: テキストから登録する語の集合を返す関数
+        """
+
+        now = time.monotonic()
+        if not force and now - self._last_sync < self.sync_interval:
+            return
+        with self._sync_lock:
+            if not force and now - self._last_sync < self.sync_interval:
+                return
+            self._last_sync = now
+
+            try:
+                if self.transcripts_dir and not self._has_documents('transcript:'):
+                    self._sync_transcripts(analyze)
+                if self.posts_dir:
+                    self._sync_posts(analyze)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"キーワードインデックスの同期に失敗: {e}")
+
+    def _has_documents(self, prefix: str) -> bool:
+        return self._get_connection().execute(
+            'SELECT 1 FROM documents WHERE doc_id >= ? AND doc_id < ? LIMIT 1', (prefix, prefix + '\uffff')
+        ).fetchone() is not None
+
+    def _sync_posts(self, analyze):
+        """記事ファイルの更新時刻・サイズが変わったものだけ再登録"""
+
+        if not self.posts_dir.exists():
+            return
+
+        indexed = dict(self._get_connection().execute(
+            'SELECT doc_id, fingerprint FROM documents WHERE doc_id >= ? AND doc_id < ?', ('post:', 'post:\uffff')
+        ).fetchall())
+
+        seen = set()
+        with os.scandir(self.posts_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.md') or not entry.is_file():
+                    continue
+                doc_id = f"post:{entry.name}"
+                stat = entry.stat()
+                fingerprint = f"{stat.st_mtime_ns}:{stat.st_size}"
+                seen.add(doc_id)
+                if indexed.get(doc_id) == fingerprint:
+                    continue
+                content = Path(entry.path).read_text(encoding='utf-8')
+                self.add_document(doc_id, analyze(post_body_text(content)), fingerprint)
+
+        for doc_id in set(indexed) - seen:
+            self.remove_document(doc_id)
+
+    def _sync_transcripts(self, analyze):
+        """出力ディレクトリ配下の処理済み文字起こしを登録（インデックス新規作成時）"""
+
+        if not self.transcripts_dir.exists():
+            return
+
+        count = 0
+        for transcript_path in self.transcripts_dir.glob('*/transcript.json'):
+            try:
+                text = json.loads(transcript_path.read_text(encoding='utf-8')).get('text', '')
+            except (OSError, ValueError):
+                continue
+            if text:
+                if self.add_transcript(text, analyze(text)):
+                    count += 1
+
+        if count:
+            logger.info(f"キーワードインデックスに文字起こし {count} 件を登録")
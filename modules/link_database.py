@@ -0,0 +1,223 @@
+"""
+リンクデータベースモジュール
+記事と記事間リンクをSQLite（WAL）の posts / links テーブルに保存する。記事1件分の更新は1トランザクションで、
+複数のワーカーから同時に書き込んでも更新が失われない。旧形式の internal_links.json は初回に一度だけ取り込む
+"""
+
+import json
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posts (
+    post_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL DEFAULT '',
+    keywords TEXT NOT NULL DEFAULT '[]',
+    url TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS links (
+    link_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    from_post TEXT NOT NULL,
+    to_post TEXT NOT NULL,
+    type TEXT NOT NULL DEFAULT 'related',
+    similarity REAL NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    UNIQUE (from_post, to_post, type)
+);
+CREATE INDEX IF NOT EXISTS idx_links_to ON links(to_post);
+"""
+
+# 既存リンクの再登録では類似度と日時だけ更新
+UPSERT_LINK = """
+INSERT INTO links (from_post, to_post, type, similarity, created_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (from_post, to_post, type) DO UPDATE SET similarity = excluded.similarity, created_at = excluded.created_at
+"""
+
+UPSERT_POST = """
+INSERT INTO posts (post_id, title, keywords, url, created_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (post_id) DO UPDATE SET title = excluded.title, keywords = excluded.keywords, url = excluded.url
+"""
+
+
+class LinkDatabase(SQLiteStore):
+    """記事と記事間リンクのデータベース"""
+
+    def __init__(self, db_path: Path = Path('cache/internal_links.db'), legacy_json: Optional[Path] = None):
+        self.db_path = Path(db_path)
+
+        self._open_database(self.db_path, SCHEMA)
+        if legacy_json:
+            self._migrate_json(Path(legacy_json))
+
+    def _migrate_json(self, json_path: Path):
+        """旧形式のJSONを一度だけ取り込み、取り込んだファイルは .migrated に改名"""
+
+        if not json_path.exists():
+            return
+
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                return
+            try:
+                data = json.loads(json_path.read_text(encoding='utf-8'))
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"リンクデータベース（JSON）を読み込めないため移行しません: {e}")
+                return
+
+            now = datetime.now().isoformat()
+            posts = data.get('posts') or {}
+            links = data.get('links') or []
+            conn.executemany(UPSERT_POST, [
+                (post_id, info.get('title', ''), json.dumps(info.get('keywords') or [], ensure_ascii=False),
+                 info.get('url', ''), info.get('created_at') or now)
+                for post_id, info in posts.items()
+            ])
+            conn.executemany(UPSERT_LINK, [
+                (link['from'], link['to'], link.get('type', 'related'), link.get('similarity', 0),
+                 link.get('created_at') or now)
+                for link in links if link.get('from') and link.get('to')
+            ])
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (str(json_path),))
+
+        migrated_path = json_path.with_name(json_path.name + '.migrated')
+        try:
+            json_path.rename(migrated_path)
+        except OSError as e:
+            logger.warning(f"移行済みのJSONを改名できません: {e}")
+        logger.info(f"リンクデータベースを移行: {len(posts)} 記事 / {len(links)} リンク → {self.db_path}")
+
+    def record_post(self, post_id: str, title: str, keywords: List[str], url: str,
+                    links: List[Dict]) -> None:
+        """記事と、その記事からのリンクを1トランザクションで登録
+
+        links: {'to': 記事ID, 'similarity': 類似度, 'type': 種別（省略時 related）} のリスト
+        """
+
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.execute(UPSERT_POST, (post_id, title, json.dumps(list(keywords), ensure_ascii=False), url, now))
+            conn.executemany(UPSERT_LINK, [
+                (post_id, link['to'], link.get('type', 'related'), float(link.get('similarity', 0)), now)
+                for link in links
+            ])
+
+    def add_links(self, links: List[Dict]) -> None:
+        """リンクを1トランザクションで登録（登録済みのリンクは類似度と日時を更新）
+
+        links: {'from': 記事ID, 'to': 記事ID, 'similarity': 類似度, 'type': 種別（省略時 related）} のリスト
+        """
+
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(UPSERT_LINK, [
+                (link['from'], link['to'], link.get('type', 'related'), float(link.get('similarity', 0)), now)
+                for link in links
+            ])
+
+    def replace_links(self, posts: List[Dict], link_type: str = 'related') -> None:
+        """全記事のリンク構造を1トランザクションで置き換え（指定した種別のリンクのみ）
+
+        posts: {'post_id', 'title', 'keywords', 'url', 'links': [{'to', 'similarity'}]} のリスト
+        """
+
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany(UPSERT_POST, [
+                (post['post_id'], post.get('title', ''), json.dumps(list(post.get('keywords') or []), ensure_ascii=False),
+                 post.get('url', ''), now)
+                for post in posts
+            ])
+            conn.executemany('DELETE FROM links WHERE from_post = ? AND type = ?',
+                             [(post['post_id'], link_type) for post in posts])
+            conn.executemany(UPSERT_LINK, [
+                (post['post_id'], link['to'], link_type, float(link.get('similarity', 0)), now)
+                for post in posts for link in post.get('links', [])
+            ])
+
+    def remove_post(self, post_id: str) -> None:
+        """記事と、その記事に関わるリンクを削除"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM links WHERE from_post = ? OR to_post = ?', (post_id, post_id))
+            conn.execute('DELETE FROM posts WHERE post_id = ?', (post_id,))
+
+    def get_post(self, post_id: str) -> Optional[Dict]:
+        """記事情報（未登録ならNone）"""
+
+        row = self._get_connection().execute(
+            'SELECT post_id, title, keywords, url, created_at FROM posts WHERE post_id = ?', (post_id,)
+        ).fetchone()
+        return self._post_row(row) if row else None
+
+    def posts(self) -> Iterator[Dict]:
+        """全記事"""
+        for row in self._get_connection().execute(
+            'SELECT post_id, title, keywords, url, created_at FROM posts ORDER BY post_id'
+        ):
+            yield self._post_row(row)
+
+    def links(self, from_post: Optional[str] = None, to_post: Optional[str] = None) -> List[Dict]:
+        """リンク（記事IDで絞り込み可。登録順）"""
+
+        conditions, params = [], []
+        if from_post is not None:
+            conditions.append('from_post = ?')
+            params.append(from_post)
+        if to_post is not None:
+            conditions.append('to_post = ?')
+            params.append(to_post)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        return [
+            {'from': row[0], 'to': row[1], 'type': row[2], 'similarity': row[3], 'created_at': row[4]}
+            for row in self._get_connection().execute(
+                f'SELECT from_post, to_post, type, similarity, created_at FROM links {where} ORDER BY link_id', params
+            )
+        ]
+
+    def post_ids(self) -> List[str]:
+        """全記事のID"""
+        return [row[0] for row in self._get_connection().execute('SELECT post_id FROM posts ORDER BY post_id')]
+
+    def edges(self, after: int = 0, link_types: Optional[Sequence[str]] = None) -> List[Tuple[int, str, str]]:
+        """リンク（リンクID, リンク元, リンク先）をリンクIDの順に（after より後に登録されたもののみ）"""
+
+        sql = 'SELECT link_id, from_post, to_post FROM links WHERE link_id > ?'
+        params: List = [after]
+        if link_types:
+            sql += f" AND type IN ({','.join('?' * len(link_types))})"
+            params.extend(link_types)
+        return self._get_connection().execute(sql + ' ORDER BY link_id', params).fetchall()
+
+    def link_count(self, up_to: Optional[int] = None, link_types: Optional[Sequence[str]] = None) -> int:
+        """リンク数（up_to 以下のリンクIDのみ。読み込み済みのリンクが削除されていないかの確認に使う）"""
+
+        sql = 'SELECT COUNT(*) FROM links WHERE link_id <= ?'
+        params: List = [up_to if up_to is not None else 2 ** 63 - 1]
+        if link_types:
+            sql += f" AND type IN ({','.join('?' * len(link_types))})"
+            params.extend(link_types)
+        return self._get_connection().execute(sql, params).fetchone()[0]
+
+    def stats(self) -> Dict:
+        """記事数・リンク数"""
+        conn = self._get_connection()
+        return {
+            'posts': conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0],
+            'links': conn.execute('SELECT COUNT(*) FROM links').fetchone()[0],
+        }
+
+    @staticmethod
+    def _post_row(row) -> Dict:
+        post_id, title, keywords, url, created_at = row
+        return {'post_id': post_id, 'title': title, 'keywords': json.loads(keywords),
+                'url': url, 'created_at': created_at}
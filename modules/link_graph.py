@@ -0,0 +1,279 @@
+"""
+リンクグラフ分析モジュール
+リンクデータベースの記事間リンクを隣接リスト（CSR配列）に読み込み、被リンク数・PageRankによる権威度・
+孤立記事（被リンクのない記事）・クラスタ（つながっている記事のまとまり）を求める。
+リンクが追加されたときは追加分だけを読み込み、クラスタとPageRankを前回の結果から更新する
+"""
+
+import time
+import logging
+import argparse
+import json
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .link_database import LinkDatabase
+from .relink_engine import connected_components
+
+logger = logging.getLogger(__name__)
+
+# PageRankの設定
+DEFAULT_DAMPING = 0.85
+DEFAULT_TOLERANCE = 1e-9      # 反復を止める順位ベクトルの変化量（L1）
+DEFAULT_MAX_ITERATIONS = 100
+
+# リンクのキー（リンク元 << 32 | リンク先）
+_KEY_SHIFT = np.int64(32)
+_KEY_MASK = np.int64((1 << 32) - 1)
+
+
+def build_csr(num_nodes: int, sources: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """リンク元ごとのリンク先（indptr, indices）"""
+
+    order = np.lexsort((targets, sources))
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=num_nodes))))
+    return indptr, targets[order]
+
+
+def pagerank(num_nodes: int, sources: np.ndarray, targets: np.ndarray, damping: float = DEFAULT_DAMPING,
+             tolerance: float = DEFAULT_TOLERANCE, max_iterations: int = DEFAULT_MAX_ITERATIONS,
+             initial: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+    """PageRank（合計1）と反復回数。initial があればそこから反復を始める（差分更新で収束を早める）
+
+    リンクのない記事の順位は全記事に均等に配る
+    """
+
+    if num_nodes == 0:
+        return np.zeros(0), 0
+
+    out_degree = np.bincount(sources, minlength=num_nodes)
+    dangling = out_degree == 0
+    inverse_degree = 1.0 / np.maximum(out_degree, 1)
+
+    if initial is not None and len(initial) == num_nodes and initial.sum() > 0:
+        rank = initial / initial.sum()
+    else:
+        rank = np.full(num_nodes, 1.0 / num_nodes)
+
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        flow = np.bincount(targets, weights=(rank * inverse_degree)[sources], minlength=num_nodes)
+        updated = damping * (flow + rank[dangling].sum() / num_nodes) + (1.0 - damping) / num_nodes
+        delta = np.abs(updated - rank).sum()
+        rank = updated
+        if delta < tolerance:
+            break
+    return rank, iterations
+
+
+class LinkGraph:
+    """記事間リンクの有向グラフ（同じ記事間のリンクは種別が違っても1本、自分自身へのリンクは除く）"""
+
+    def __init__(self, damping: float = DEFAULT_DAMPING):
+        self.damping = damping
+        self.node_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        # リンクのキー（昇順・重複なし）
+        self._keys = np.zeros(0, dtype=np.int64)
+        # 連結成分のラベル（成分内の最小の記事番号）とPageRankは追加のたびに前回から更新
+        self._labels = np.zeros(0, dtype=np.int64)
+        self._ranks: Optional[np.ndarray] = None
+        self._csr: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._keys)
+
+    @property
+    def sources(self) -> np.ndarray:
+        return self._keys >> _KEY_SHIFT
+
+    @property
+    def targets(self) -> np.ndarray:
+        return self._keys & _KEY_MASK
+
+    def add_nodes(self, post_ids: Iterable[str]) -> np.ndarray:
+        """記事を追加（登録済みならそのまま）して記事番号を返す"""
+
+        indices = []
+        for post_id in post_ids:
+            index = self._index.get(post_id)
+            if index is None:
+                index = self._index[post_id] = len(self.node_ids)
+                self.node_ids.append(post_id)
+            indices.append(index)
+
+        added = self.num_nodes - len(self._labels)
+        if added:
+            self._labels = np.concatenate((self._labels, np.arange(len(self._labels), self.num_nodes)))
+            self._csr = None
+        return np.array(indices, dtype=np.int64)
+
+    def add_edges(self, edges: Sequence[Tuple[str, str]]) -> int:
+        """リンク（リンク元, リンク先）を追加し、新しく増えたリンク数を返す"""
+
+        if not len(edges):
+            return 0
+        sources = self.add_nodes(source for source, _ in edges)
+        targets = self.add_nodes(target for _, target in edges)
+        keep = sources != targets
+        keys = np.unique((sources[keep] << _KEY_SHIFT) | targets[keep])
+        new_keys = np.setdiff1d(keys, self._keys, assume_unique=True)
+        if not len(new_keys):
+            return 0
+
+        self._keys = np.union1d(self._keys, new_keys)
+        self._csr = None
+
+        # 新しいリンクがつなぐ成分どうしだけを併合
+        merged = connected_components(self.num_nodes, self._labels[new_keys >> _KEY_SHIFT],
+                                      self._labels[new_keys & _KEY_MASK])
+        self._labels = merged[self._labels]
+        return len(new_keys)
+
+    def csr(self) -> Tuple[np.ndarray, np.ndarray]:
+        """隣接リスト（indptr, indices）。記事 i のリンク先は indices[indptr[i]:indptr[i + 1]]"""
+        if self._csr is None:
+            self._csr = build_csr(self.num_nodes, self.sources, self.targets)
+        return self._csr
+
+    def in_degree(self) -> np.ndarray:
+        """記事ごとの被リンク数"""
+        return np.bincount(self.targets, minlength=self.num_nodes)
+
+    def out_degree(self) -> np.ndarray:
+        """記事ごとの発リンク数"""
+        return np.diff(self.csr()[0])
+
+    def pagerank(self) -> np.ndarray:
+        """記事ごとの権威度（PageRank。前回の結果から反復を始める）"""
+
+        initial = None
+        if self._ranks is not None:
+            # 追加された記事には平均的な初期値を与える
+            initial = np.concatenate((self._ranks, np.full(self.num_nodes - len(self._ranks),
+                                                           1.0 / max(self.num_nodes, 1))))
+        self._ranks, iterations = pagerank(self.num_nodes, self.sources, self.targets, self.damping,
+                                           initial=initial)
+        logger.debug(f"PageRank: {iterations} 回の反復で収束")
+        return self._ranks
+
+    def component_labels(self) -> np.ndarray:
+        """記事ごとのクラスタ（リンクの向きを無視した連結成分。成分内の最小の記事番号）"""
+        return self._labels
+
+    def orphans(self) -> List[str]:
+        """被リンクのない記事"""
+        return [self.node_ids[i] for i in np.flatnonzero(self.in_degree() == 0).tolist()]
+
+    def clusters(self, min_size: int = 2) -> List[List[str]]:
+        """min_size 記事以上のクラスタ（大きい順。記事は番号順）"""
+
+        order = np.argsort(self._labels, kind='stable')
+        labels = self._labels[order]
+        boundaries = np.flatnonzero(np.diff(labels)) + 1
+        groups = [group for group in np.split(order, boundaries) if len(group) >= min_size]
+        groups.sort(key=lambda group: (-len(group), group[0]))
+        return [[self.node_ids[i] for i in group.tolist()] for group in groups]
+
+    def summary(self, top: int = 10) -> Dict:
+        """分析結果（権威度・被リンク数の上位、孤立記事、クラスタ）"""
+
+        started = time.perf_counter()
+        ranks = self.pagerank()
+        in_degree = self.in_degree()
+        out_degree = self.out_degree()
+        clusters = self.clusters()
+        orphans = self.orphans()
+
+        top_nodes = np.lexsort((np.arange(self.num_nodes), -ranks))[:top]
+        return {
+            'posts': self.num_nodes,
+            'links': self.num_edges,
+            'authorities': [
+                {'post_id': self.node_ids[i], 'pagerank': round(float(ranks[i]), 6),
+                 'in_degree': int(in_degree[i]), 'out_degree': int(out_degree[i])}
+                for i in top_nodes.tolist()
+            ],
+            'orphaned_posts': orphans,
+            'clusters': [{'size': len(members), 'posts': members[:top]} for members in clusters],
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+
+class LinkGraphAnalytics:
+    """リンクデータベースのリンクグラフ（refreshのたびに前回以降に追加されたリンクだけを読み込む）
+
+    読み込み済みのリンクが削除・置き換えられていれば（関連記事の一括再構成など）グラフを作り直す
+    """
+
+    def __init__(self, database: LinkDatabase, link_types: Optional[Sequence[str]] = None,
+                 damping: float = DEFAULT_DAMPING):
+        self.database = database
+        self.link_types = list(link_types) if link_types else None
+        self.damping = damping
+        self.graph = LinkGraph(damping)
+        self._last_link_id = 0
+        self._loaded_links = 0
+
+    def refresh(self) -> LinkGraph:
+        """リンクデータベースの変更をグラフに反映"""
+
+        started = time.perf_counter()
+        if self._loaded_links and self.database.link_count(self._last_link_id, self.link_types) != self._loaded_links:
+            logger.info("読み込み済みのリンクが変更されたためリンクグラフを作り直します")
+            self.graph = LinkGraph(self.damping)
+            self._last_link_id = 0
+            self._loaded_links = 0
+
+        self.graph.add_nodes(self.database.post_ids())
+        rows = self.database.edges(self._last_link_id, self.link_types)
+        if rows:
+            added = self.graph.add_edges([(source, target) for _, source, target in rows])
+            self._last_link_id = rows[-1][0]
+            self._loaded_links += len(rows)
+            logger.debug(f"リンクグラフを更新: {added} リンク追加 ({time.perf_counter() - started:.3f}秒)")
+        return self.graph
+
+    def summary(self, top: int = 10) -> Dict:
+        """最新のリンクグラフの分析結果"""
+        return self.refresh().summary(top)
+
+
+def main(argv: Optional[List[str]] = None):
+    """リンクグラフの分析結果を表示（python -m modules.link_graph）"""
+
+    parser = argparse.ArgumentParser(description='内部リンクグラフの分析')
+    parser.add_argument('--db', default='cache/internal_links.db', help='リンクデータベース')
+    parser.add_argument('--type', action='append', dest='link_types', help='対象のリンク種別（複数指定可）')
+    parser.add_argument('--top', type=int, default=10, help='表示する上位の件数')
+    parser.add_argument('--json', action='store_true', help='JSONで出力')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summary = LinkGraphAnalytics(LinkDatabase(args.db), args.link_types).summary(args.top)
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    print(f"📊 記事 {summary['posts']} 件 / リンク {summary['links']} 本 ({summary['seconds']}秒)")
+    print("\n🏆 権威度（PageRank）上位:")
+    for authority in summary['authorities']:
+        print(f"  {authority['pagerank']:.6f}  被リンク {authority['in_degree']:>4}  {authority['post_id']}")
+    print(f"\n🧩 クラスタ: {len(summary['clusters'])} 件")
+    for cluster in summary['clusters'][:args.top]:
+        print(f"  {cluster['size']:>5} 記事  {', '.join(cluster['posts'][:3])}")
+    print(f"\n🏝 被リンクのない記事: {len(summary['orphaned_posts'])} 件")
+    for post_id in summary['orphaned_posts'][:args.top]:
+        print(f"  {post_id}")
+
+
+if __name__ == "__main__":
+    main()
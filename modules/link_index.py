@@ -0,0 +1,199 @@
+"""
+関連記事インデックスモジュール
+_postsの記事のFront Matter（タイトル・キーワード・カテゴリ）とキーワード・カテゴリ・タイトル語→記事の転置インデックスを
+SQLiteに永続化し、語を共有する記事だけを類似度計算の候補として返す
+"""
+
+import os
+import re
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Set
+
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    metadata TEXT NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    field TEXT NOT NULL,
+    term TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    PRIMARY KEY (field, term, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_post ON postings(post_id);
+"""
+
+# インデックスする項目
+INDEXED_FIELDS = ('keywords', 'title', 'categories')
+
+# SQLiteのバインド変数上限に収まる問い合わせ単位
+_QUERY_CHUNK = 500
+
+TITLE_WORD_PATTERN = re.compile(r'\w+')
+
+
+def title_words(title: str) -> Set[str]:
+    """タイトルの語（類似度計算と同じ分割）"""
+    return set(TITLE_WORD_PATTERN.findall((title or '').lower()))
+
+
+def field_terms(metadata: Dict) -> Dict[str, Set[str]]:
+    """記事メタデータの項目ごとの語"""
+    return {
+        'keywords': {str(k) for k in metadata.get('keywords') or []},
+        'title': title_words(metadata.get('title', '')),
+        'categories': {str(c) for c in metadata.get('categories') or []},
+    }
+
+
+class RelatedPostIndex(SQLiteStore):
+    """関連記事候補の転置インデックス（記事の追加・更新・削除は差分のみ反映）"""
+
+    def __init__(self, db_path: Path, posts_dir: Path):
+        self.db_path = Path(db_path)
+        self.posts_dir = Path(posts_dir)
+
+        self._open_database(self.db_path, SCHEMA)
+
+    def sync(self, parse: Callable[[Path], Dict]):
+        """記事ファイルの更新時刻・サイズが変わったものだけ再解析して登録し、削除された記事を除去
+
+        parse: 記事ファイルからメタデータ（title / keywords / categories / excerpt / image）を返す関数
+        """
+
+        if not self.posts_dir.exists():
+            return
+
+        indexed = dict(self._get_connection().execute('SELECT post_id, fingerprint FROM posts').fetchall())
+
+        seen = set()
+        pending = []
+        updated = 0
+        with os.scandir(self.posts_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.md') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                fingerprint = f"{stat.st_mtime_ns}:{stat.st_size}"
+                seen.add(entry.name)
+                if indexed.get(entry.name) == fingerprint:
+                    continue
+                try:
+                    metadata = parse(Path(entry.path)) or {}
+                except Exception as e:
+                    logger.warning(f"記事解析エラー {entry.path}: {e}")
+                    metadata = {}
+                pending.append((entry.name, metadata, fingerprint))
+                # 初回構築でも書き込みはまとめて行う
+                if len(pending) >= _QUERY_CHUNK:
+                    self.add_posts(pending)
+                    updated += len(pending)
+                    pending = []
+
+        if pending:
+            self.add_posts(pending)
+            updated += len(pending)
+
+        removed = set(indexed) - seen
+        if removed:
+            self.remove_posts(removed)
+
+        if updated or removed:
+            logger.info(f"関連記事インデックスを更新: {updated} 件登録 / {len(removed)} 件削除")
+
+    def add_posts(self, posts: Iterable[tuple]):
+        """記事（記事ID, メタデータ, フィンガープリント）を1トランザクションで登録（語の増減分だけ転置リストを更新）"""
+
+        now = time.time()
+        with self._transaction() as conn:
+            for post_id, metadata, fingerprint in posts:
+                new_postings = {(field, term) for field, terms in field_terms(metadata).items() for term in terms}
+                old_postings = set(conn.execute('SELECT field, term FROM postings WHERE post_id = ?', (post_id,)))
+                conn.executemany('DELETE FROM postings WHERE field = ? AND term = ? AND post_id = ?',
+                                 [(field, term, post_id) for field, term in old_postings - new_postings])
+                conn.executemany('INSERT INTO postings (field, term, post_id) VALUES (?, ?, ?)',
+                                 [(field, term, post_id) for field, term in new_postings - old_postings])
+                conn.execute(
+                    'INSERT OR REPLACE INTO posts (post_id, fingerprint, metadata, indexed_at) VALUES (?, ?, ?, ?)',
+                    (post_id, fingerprint, json.dumps(metadata, ensure_ascii=False, default=str), now)
+                )
+
+    def remove_posts(self, post_ids: Iterable[str]):
+        """記事を削除"""
+        with self._transaction() as conn:
+            for post_id in post_ids:
+                conn.execute('DELETE FROM postings WHERE post_id = ?', (post_id,))
+                conn.execute('DELETE FROM posts WHERE post_id = ?', (post_id,))
+
+    def _postings(self, field: str, terms: Iterable[str]) -> Set[str]:
+        """いずれかの語を含む記事ID"""
+
+        terms = list(terms)
+        post_ids = set()
+        conn = self._get_connection()
+        for start in range(0, len(terms), _QUERY_CHUNK):
+            chunk = terms[start:start + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            post_ids.update(post_id for (post_id,) in conn.execute(
+                f'SELECT DISTINCT post_id FROM postings WHERE field = ? AND term IN ({placeholders})',
+                [field, *chunk]
+            ))
+        return post_ids
+
+    def candidates(self, metadata: Dict, weights: Dict[str, float], threshold: float) -> Dict[str, Dict]:
+        """類似度が閾値を超え得る記事のメタデータ（記事ID → メタデータ）
+
+        各項目の類似度は1以下のため、ある項目を共有しないと残りの重みの合計が閾値以下になる場合、
+        その項目の共有は必須となる。また、重みの小さい項目だけを共有しても閾値を超えない場合は
+        それ以外の項目の共有が必要（全記事に共通するカテゴリだけを共有する記事は候補にならない）
+        """
+
+        terms = field_terms(metadata)
+        total_weight = sum(weights.get(field, 0) for field in INDEXED_FIELDS)
+        required = [f for f in INDEXED_FIELDS if total_weight - weights.get(f, 0) <= threshold]
+        if any(not terms[f] for f in required):
+            return {}
+
+        if required:
+            # 必須項目の転置リストの積集合（語数の少ない項目から）
+            post_ids = None
+            for field in sorted(required, key=lambda f: len(terms[f])):
+                matched = self._postings(field, terms[field])
+                post_ids = matched if post_ids is None else post_ids & matched
+                if not post_ids:
+                    return {}
+        else:
+            # 重みの小さい順に、合計が閾値以下に収まる項目は候補の検索に使わない
+            insufficient = set()
+            low_weight = 0.0
+            for field in sorted(INDEXED_FIELDS, key=lambda f: weights.get(f, 0)):
+                low_weight += weights.get(field, 0)
+                if low_weight > threshold:
+                    break
+                insufficient.add(field)
+
+            post_ids = set()
+            for field in INDEXED_FIELDS:
+                if field not in insufficient and weights.get(field, 0) > 0 and terms[field]:
+                    post_ids |= self._postings(field, terms[field])
+
+        results = {}
+        conn = self._get_connection()
+        ids = list(post_ids)
+        for start in range(0, len(ids), _QUERY_CHUNK):
+            chunk = ids[start:start + _QUERY_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for post_id, data in conn.execute(
+                f'SELECT post_id, metadata FROM posts WHERE post_id IN ({placeholders})', chunk
+            ):
+                results[post_id] = json.loads(data)
+        return results
@@ -0,0 +1,301 @@
+"""
+LLMリライトモジュール
+記事の全セクションを1回のリクエストにまとめてOpenAI互換APIでリライトする（接続プール・同時実行数制限・
+プロンプトのハッシュによる応答キャッシュ・ストリーミング受信に対応）
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# セクションの区切り（プロンプトと応答の両方で使用）
+SECTION_MARKER = '### SECTION {index}'
+SECTION_MARKER_PREFIX = '### SECTION '
+
+SYSTEM_PROMPT = (
+    "あなたは日本語のブログ編集者です。動画の文字起こしから抜き出した各セクションの本文を、"
+    "話し言葉から読みやすい書き言葉のブログ本文にリライトしてください。"
+    "事実や数値は変えず、本文にない情報は追加しないでください。"
+    "各セクションは入力と同じ「### SECTION 番号」の行で始め、その後に本文だけを書いてください。"
+)
+
+SECTION_GUIDES = {
+    'problem': '読者が抱える課題を具体的に示す',
+    'solution': '解決策の仕組みと特徴を説明する',
+    'benefits': '得られるメリットを整理して示す',
+    'how_to': '手順を順序立てて説明する',
+    'results': '結果と変化を具体的な数値とともに示す',
+}
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    prompt_hash TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def build_messages(sections: List[Dict], article_title: str = '') -> List[Dict]:
+    """全セクションを1つのユーザーメッセージにまとめたプロンプト"""
+
+    parts = []
+    if article_title:
+        parts.append(f"記事タイトル: {article_title}\n")
+    for index, section in enumerate(sections, 1):
+        guide = SECTION_GUIDES.get(section.get('type'), '要点を分かりやすく説明する')
+        parts.append(SECTION_MARKER.format(index=index))
+        parts.append(f"見出し: {section.get('title', '')}")
+        parts.append(f"方針: {guide}")
+        parts.append(f"本文:\n{section.get('text', '')}\n")
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': '\n'.join(parts)},
+    ]
+
+
+def prompt_hash(payload: Dict) -> str:
+    """応答を左右するリクエスト内容（モデル・メッセージ・生成パラメータ）のハッシュ"""
+    key = {k: payload[k] for k in ('model', 'messages', 'temperature', 'max_tokens') if k in payload}
+    return hashlib.sha256(json.dumps(key, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SectionStreamParser:
+    """ストリーミング応答を受け取りながら、完成したセクションから順に取り出す"""
+
+    def __init__(self, count: int, on_section: Optional[Callable[[int, str], None]] = None):
+        self.count = count
+        self.on_section = on_section
+        self.sections: List[Optional[str]] = [None] * count
+        self._buffer = ''
+        self._current = None   # 受信中のセクション番号（0始まり）
+        self._lines: List[str] = []
+
+    def feed(self, chunk: str):
+        """受信したテキスト片を追加（行単位で処理し、未完の行は次回に持ち越す）"""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        for line in lines:
+            self._handle_line(line)
+
+    def close(self) -> List[Optional[str]]:
+        """受信終了。区切りが欠けたセクションはNone（呼び出し側でテンプレートにフォールバック）"""
+        if self._buffer:
+            self._handle_line(self._buffer)
+            self._buffer = ''
+        self._finish_section()
+        return self.sections
+
+    def _handle_line(self, line: str):
+        stripped = line.strip()
+        if stripped.startswith(SECTION_MARKER_PREFIX):
+            number = stripped[len(SECTION_MARKER_PREFIX):].strip()
+            if number.isdigit() and 1 <= int(number) <= self.count:
+                self._finish_section()
+                self._current = int(number) - 1
+                return
+        if self._current is not None:
+            self._lines.append(line)
+
+    def _finish_section(self):
+        if self._current is None:
+            return
+        text = '\n'.join(self._lines).strip()
+        if text:
+            self.sections[self._current] = text
+            if self.on_section:
+                self.on_section(self._current, text)
+        self._current = None
+        self._lines = []
+
+
+class ResponseCache(SQLiteStore):
+    """プロンプトのハッシュをキーにした応答キャッシュ（SQLite）"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._open_database(self.db_path, CACHE_SCHEMA)
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._get_connection().execute(
+            'SELECT response FROM responses WHERE prompt_hash = ?', (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, response: str):
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO responses (prompt_hash, response, created_at) VALUES (?, ?, ?)',
+                (key, response, time.time())
+            )
+
+
+class OpenAICompatibleRewriter:
+    """OpenAI互換の /chat/completions を使うリライトバックエンド"""
+
+    name = 'openai'
+
+    def __init__(self, config: Dict):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.config = config
+        self.base_url = config.get('base_url', 'https://api.openai.com/v1').rstrip('/')
+        self.model = config.get('model', 'gpt-4o-mini')
+        self.api_key = config.get('api_key') or os.environ.get(config.get('api_key_env', 'OPENAI_API_KEY'), '')
+        self.temperature = float(config.get('temperature', 0.3))
+        self.max_tokens = int(config.get('max_tokens', 4000))
+        self.timeout = float(config.get('timeout_seconds', 120))
+        self.stream = bool(config.get('stream', True))
+
+        # 接続プール（同じホストへのKeep-Alive接続を再利用）
+        pool_size = int(config.get('pool_size', 8))
+        self._requests = requests
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if self.api_key:
+            self.session.headers['Authorization'] = f"Bearer {self.api_key}"
+
+        # プロセス内の同時リクエスト数の上限
+        self._semaphore = threading.BoundedSemaphore(int(config.get('max_concurrent', 4)))
+
+        cache_path = config.get('cache_path', 'cache/llm_responses.db')
+        self.cache = ResponseCache(cache_path) if cache_path else None
+
+        # 直近のリクエストの計測値（スレッドごと。ベンチマーク・ログ用）
+        self._metrics = threading.local()
+
+    @property
+    def last_metrics(self) -> Dict:
+        """このスレッドで直近に実行したリクエストの計測値"""
+        return getattr(self._metrics, 'value', {})
+
+    def rewrite_sections(self, sections: List[Dict], article_title: str = '',
+                         on_section: Optional[Callable[[int, str], None]] = None) -> List[Optional[str]]:
+        """全セクションを1回のリクエストでリライト（失敗・欠落したセクションはNone）"""
+
+        if not sections:
+            return []
+
+        payload = {
+            'model': self.model,
+            'messages': build_messages(sections, article_title),
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens,
+        }
+        key = prompt_hash(payload)
+
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._metrics.value = {'cached': True, 'first_token_seconds': 0.0, 'total_seconds': 0.0}
+                parser = SectionStreamParser(len(sections), on_section)
+                parser.feed(cached)
+                return parser.close()
+
+        parser = SectionStreamParser(len(sections), on_section)
+        try:
+            with self._semaphore:
+                response_text = self._complete(payload, parser)
+        except (self._requests.RequestException, ValueError, KeyError, IndexError, TypeError) as e:
+            logger.warning(f"LLMリライトに失敗しました（テンプレートで生成します）: {e}")
+            return [None] * len(sections)
+
+        results = parser.close()
+        # 全セクションが揃った応答のみキャッシュ（途中で切れた応答を再利用しない）
+        if self.cache and all(results):
+            try:
+                self.cache.put(key, response_text)
+            except sqlite3.Error as e:
+                logger.warning(f"LLM応答のキャッシュ保存に失敗: {e}")
+        return results
+
+    def _complete(self, payload: Dict, parser: SectionStreamParser) -> str:
+        """リクエストを送り、応答本文を受信しながらパーサーに渡す"""
+
+        started = time.perf_counter()
+        first_token = None
+        parts = []
+
+        with self.session.post(f"{self.base_url}/chat/completions", json={**payload, 'stream': self.stream},
+                               stream=self.stream, timeout=self.timeout) as response:
+            response.raise_for_status()
+
+            if self.stream:
+                # Server-Sent Events: "data: {...}" の行が続き、"data: [DONE]" で終了
+                # （charset指定のないtext/event-streamはrequestsがLatin-1とみなすため、UTF-8で自前にデコード）
+                for raw_line in response.iter_lines():
+                    line = raw_line.decode('utf-8')
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+                    choices = json.loads(data).get('choices')
+                    # 使用量だけを送るチャンクなど、choicesが空のものは読み飛ばす
+                    if not choices:
+                        continue
+                    delta = (choices[0].get('delta') or {}).get('content')
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        parts.append(delta)
+                        parser.feed(delta)
+            else:
+                content = response.json()['choices'][0]['message']['content']
+                first_token = time.perf_counter() - started
+                parts.append(content)
+                parser.feed(content)
+
+        self._metrics.value = {
+            'cached': False,
+            'first_token_seconds': first_token,
+            'total_seconds': time.perf_counter() - started,
+            'chunks': len(parts),
+        }
+        return ''.join(parts)
+
+
+REWRITER_BACKENDS = {
+    'openai': OpenAICompatibleRewriter,
+}
+
+_shared_rewriters: Dict[str, object] = {}
+_shared_lock = threading.Lock()
+
+
+def get_rewriter(config: Optional[Dict]):
+    """設定に対応するプロセス共有のリライトバックエンド（template・未設定・利用不可ならNone）"""
+
+    config = config or {}
+    backend = config.get('backend', 'template')
+    if backend == 'template':
+        return None
+    if backend not in REWRITER_BACKENDS:
+        logger.warning(f"未知のリライトバックエンドです（テンプレートで生成します）: {backend}")
+        return None
+
+    # 接続プールと同時実行数の上限を共有するため、同じ設定には同じインスタンスを返す
+    key = json.dumps(config, sort_keys=True, default=str)
+    with _shared_lock:
+        rewriter = _shared_rewriters.get(key)
+        if rewriter is None:
+            try:
+                rewriter = REWRITER_BACKENDS[backend](config)
+            except ImportError:
+                logger.warning("requestsが未インストールのためLLMリライトを利用できません（pip install requests）")
+                return None
+            _shared_rewriters[key] = rewriter
+        return rewriter
@@ -0,0 +1,273 @@
+"""
+長尺文字起こしのmap-reduce解析モジュール
+文字起こしを先頭から順に一定長の単位（タイムスタンプ付きセグメントの並び、なければ文境界で区切った本文）に分け、
+単位ごとの形態素解析・トピック分割・文（とその語）・語の頻度・要約候補文・フレーズ出現回数をプロセスプールで
+並列に求め（map）、記事全体の解析結果に統合する（reduce）。親プロセスは全文を解析せず、
+各ワーカーが扱うのは1単位分のテキストのみ
+"""
+
+import os
+import logging
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .text_analysis import TextAnalysis, STOPWORDS
+from .summarizer import (
+    MIN_SENTENCE_LENGTH, SparseTermMatrix, build_sentence_matrix, score_sentences, summarize
+)
+from .topic_segmentation import DEFAULT_SEGMENTATION, block_title, join_segment_texts, rank_block_terms
+
+logger = logging.getLogger(__name__)
+
+# デフォルト設定
+DEFAULT_MAP_REDUCE = {
+    'enabled': True,
+    'min_characters': 50000,      # これ以上の長さの文字起こしでmap-reduce解析を使用
+    'block_characters': 20000,    # 1回のmapで扱う最大文字数（セグメント境界、なければ文境界で区切る）
+    'workers': 0,                 # ワーカープロセス数（0でCPU数）
+    'candidates_per_block': 5,    # map単位ごとに残す要約候補文の数
+}
+
+
+def split_text(text: str, max_characters: int) -> List[str]:
+    """テキストを最大文字数以内の断片に分割（できるだけ句点・改行の直後で区切る）"""
+
+    chunks = []
+    start = 0
+    while len(text) - start > max_characters:
+        limit = start + max_characters
+        cut = max(text.rfind('。', start, limit), text.rfind('\n', start, limit))
+        end = cut + 1 if cut > start else limit
+        chunks.append(text[start:end])
+        start = end
+    if start < len(text):
+        chunks.append(text[start:])
+    return chunks
+
+
+def map_units(transcript_data: Dict, block_characters: int) -> List[Dict]:
+    """文字起こしを先頭から順に、最大文字数以内のmap単位に分ける（語の解析はしない）
+
+    各単位: text（本文）, segments（単位に含むタイムスタンプ付きセグメント。なければ空）
+    """
+
+    segments = transcript_data.get('segments') or []
+    if not segments:
+        return [{'text': chunk, 'segments': []} for chunk in split_text(transcript_data['text'], block_characters)]
+
+    # セグメントの途中では区切らない（1セグメントが最大文字数を超える場合はそのセグメントだけで1単位）
+    units = []
+    unit_segments: List[Dict] = []
+    characters = 0
+    for segment in segments:
+        length = len(segment['text']) + 1
+        if unit_segments and characters + length > block_characters:
+            units.append({'text': join_segment_texts(unit_segments), 'segments': unit_segments})
+            unit_segments, characters = [], 0
+        unit_segments.append(segment)
+        characters += length
+    if unit_segments:
+        units.append({'text': join_segment_texts(unit_segments), 'segments': unit_segments})
+    return units
+
+
+def analyze_chunk(unit: Dict, tokenizer_engine: str, summary_method: str, num_candidates: int,
+                  segmentation_config: Optional[Dict] = None) -> Dict:
+    """map: 1単位の文（とその語）・語の頻度・要約候補文の番号・トピックブロック（ワーカープロセスで実行）
+
+    トピック分割は単位内のセグメントだけで行い、ブロックごとに語の出現回数とフレーズ出現回数を添える
+    （見出しは reduce で全ブロックを比べて付け直す）
+    """
+
+    from .tokenizer import get_tokenizer
+    from .blog_optimizer import indicator_matcher
+
+    analysis = TextAnalysis(unit['text'], tokenizer=get_tokenizer(tokenizer_engine), summary_method=summary_method,
+                            segments=unit['segments'], segmentation_config=segmentation_config)
+
+    # 単位内の重要度上位の文を、元の順序で候補として残す
+    sentences = analysis.sentences
+    scores = analysis.sentence_scores
+    lengths = np.fromiter((len(s) for s in sentences), dtype=np.int64, count=len(sentences))
+    eligible = np.flatnonzero(lengths >= MIN_SENTENCE_LENGTH)
+    top = sorted(eligible[np.argsort(-scores[eligible], kind='stable')][:num_candidates].tolist())
+
+    if unit['segments']:
+        blocks = analysis.topic_blocks
+        block_counts = []
+        first = 0
+        for block in blocks:
+            last = first + len(block['segment_ids'])
+            block_counts.append(Counter(term for terms in analysis.segment_terms[first:last]
+                                        for term in terms if term not in STOPWORDS))
+            first = last
+    else:
+        blocks = [{'start': None, 'end': None, 'text': unit['text'], 'keywords': [], 'title': ''}]
+        block_counts = [Counter({term: count for term, count in analysis.term_frequencies.items()
+                                 if term not in STOPWORDS})]
+
+    matcher = indicator_matcher()
+    for block, counts in zip(blocks, block_counts):
+        block['phrase_counts'] = dict(matcher.count(block['text']))
+        block['term_counts'] = dict(counts)
+
+    return {
+        'term_frequencies': dict(analysis.term_frequencies),
+        'seo_term_frequencies': dict(analysis.seo_term_frequencies),
+        'sentences': sentences,
+        'sentence_terms': analysis.sentence_terms,
+        'candidates': top,
+        'blocks': blocks,
+        'characters': len(analysis.clean_text),
+    }
+
+
+class MapReduceAnalysis(TextAnalysis):
+    """ブロック単位のmap結果を統合した解析結果（TextAnalysisと同じインターフェース）
+
+    文は全ブロック分を持つが、要約は各ブロックの候補文（summary_candidates）だけを改めて採点して選ぶため、
+    全文の文×語行列は作らない
+    """
+
+    def __init__(self, text: str, blocks: List[Dict], chunk_results: List[Dict], **kwargs):
+        super().__init__(text, **kwargs)
+        # ブロック（本文・時間範囲・フレーズ出現回数）
+        self.blocks = blocks
+        self.chunk_results = chunk_results
+
+    @cached_property
+    def content_blocks(self) -> List[Dict]:
+        """セクション分けに使うブロック（タイムスタンプがなくても一定長で区切ったもの）"""
+        return self.blocks
+
+    @cached_property
+    def topic_blocks(self) -> List[Dict]:
+        """時間範囲付きのトピックブロック（セグメントがなければ空）"""
+        return self.blocks if self.segments else []
+
+    @cached_property
+    def phrase_counts(self) -> Counter:
+        """フレーズ辞書の出現回数（ブロックごとの集計の和）"""
+        total = Counter()
+        for block in self.blocks:
+            total.update(block['phrase_counts'])
+        return total
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        """全ブロックの文（元の順序）"""
+        return [sentence for result in self.chunk_results for sentence in result['sentences']]
+
+    @cached_property
+    def sentence_terms(self) -> List[List[str]]:
+        """文ごとのトークン列（map時に求めたもの）"""
+        return [terms for result in self.chunk_results for terms in result['sentence_terms']]
+
+    @cached_property
+    def summary_candidate_indices(self) -> List[int]:
+        """要約候補文の文番号（各ブロックの重要度上位の文。元の順序）"""
+        indices = []
+        offset = 0
+        for result in self.chunk_results:
+            indices.extend(offset + i for i in result['candidates'])
+            offset += len(result['sentences'])
+        return indices
+
+    @cached_property
+    def summary_candidates(self) -> List[str]:
+        """要約候補文"""
+        return [self.sentences[i] for i in self.summary_candidate_indices]
+
+    @cached_property
+    def summary_matrix(self) -> SparseTermMatrix:
+        """要約候補文×語のTF-IDF疎行列"""
+        return build_sentence_matrix([self.sentence_terms[i] for i in self.summary_candidate_indices], STOPWORDS)
+
+    @cached_property
+    def summary_scores(self) -> np.ndarray:
+        """要約候補文の重要度（候補文どうしで改めて採点）"""
+        return score_sentences(self.summary_matrix, self.summary_method)
+
+    def summary(self, max_length: int = 200, max_sentences: int = 3, redundancy_threshold: float = 0.7) -> str:
+        """要約候補文から選んだ文字数予算内の抽出型要約"""
+        text, _ = summarize(self.summary_candidates, self.summary_matrix, self.summary_scores,
+                            max_length, max_sentences, redundancy_threshold)
+        return text
+
+    @cached_property
+    def term_frequencies(self) -> Counter:
+        """トークンの出現頻度（ブロック順に統合し、出現順を保持）"""
+        total = Counter()
+        for result in self.chunk_results:
+            total.update(result['term_frequencies'])
+        return total
+
+    @cached_property
+    def seo_term_frequencies(self) -> Counter:
+        """カタカナ語・漢字複合語の出現頻度"""
+        total = Counter()
+        for result in self.chunk_results:
+            total.update(result['seo_term_frequencies'])
+        return total
+
+    def stats(self) -> Dict:
+        """解析結果の概要"""
+        return {
+            'characters': sum(r['characters'] for r in self.chunk_results),
+            'sentences': len(self.sentences),
+            'tokens': sum(self.term_frequencies.values()),
+            'unique_terms': len(self.term_frequencies),
+            'blocks': len(self.blocks)
+        }
+
+
+def map_reduce_analysis(transcript_data: Dict, config: Optional[Dict] = None,
+                        tokenizer_engine: str = 'janome', **analysis_kwargs) -> MapReduceAnalysis:
+    """ブロックごとの解析をプロセスプールで並列実行し、統合した解析結果を返す
+
+    analysis_kwargs: keyword_index / tokenizer / summary_method / segmentation_config（TextAnalysisと同じ）
+    """
+
+    settings = {**DEFAULT_MAP_REDUCE, **(config or {})}
+    block_characters = int(settings['block_characters'])
+    summary_method = analysis_kwargs.get('summary_method', 'textrank')
+    num_candidates = int(settings['candidates_per_block'])
+
+    units = map_units(transcript_data, block_characters)
+    segmentation_config = analysis_kwargs.get('segmentation_config')
+
+    workers = int(settings['workers']) or os.cpu_count() or 1
+    workers = min(workers, len(units))
+    args = ([tokenizer_engine] * len(units), [summary_method] * len(units), [num_candidates] * len(units),
+            [segmentation_config] * len(units))
+
+    results = None
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(analyze_chunk, units, *args))
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"プロセスプールを利用できないため順に解析します: {e}")
+    if results is None:
+        results = [analyze_chunk(unit, *rest) for unit, *rest in zip(units, *args)]
+
+    # reduce: 単位ごとのトピックブロックを元の順に連結
+    blocks = [block for result in results for block in result['blocks']]
+    block_counts = [Counter(block.pop('term_counts')) for block in blocks]
+    for block in blocks:
+        block['phrase_counts'] = Counter(block['phrase_counts'])
+
+    # チャプターの見出しは、形態素解析した語を全ブロックで比べたブロック単位のTF-IDFで選ぶ
+    if transcript_data.get('segments'):
+        segmentation = {**DEFAULT_SEGMENTATION, **(segmentation_config or {})}
+        for block, keywords in zip(blocks, rank_block_terms(block_counts, int(segmentation['max_keywords']))):
+            block['keywords'] = keywords
+            block['title'] = block_title(keywords, block['text'])
+
+    logger.info(f"map-reduce解析: {len(blocks)} ブロック / {len(units)} 単位 / {workers} ワーカー")
+    return MapReduceAnalysis(transcript_data['text'], blocks, results,
+                             segments=transcript_data.get('segments'), **analysis_kwargs)
@@ -0,0 +1,342 @@
+"""
+MinHash/LSH記事本文インデックスモジュール
+記事本文の文字n-gram（シングル）のMinHash署名をSQLiteに永続化し、署名をバンドに分けたLSHバケットから
+本文の似た記事（関連記事・重複記事の候補）を全記事を走査せずに求める
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .text_patterns import HTML_TAG_PATTERN, WHITESPACE_PATTERN
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signatures (
+    post_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    post_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, post_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_buckets_post ON buckets(post_id);
+"""
+
+# デフォルト設定
+DEFAULT_BODY_SIMILARITY = {
+    'enabled': True,
+    'path': 'cache/minhash_index.db',
+    'num_perm': 128,              # MinHash署名の長さ
+    'bands': 0,                   # LSHのバンド数（0で関連記事の閾値から自動決定）
+    'shingle_size': 5,            # シングルの文字数
+    'threshold': 0.3,             # 関連記事とみなす本文の推定Jaccard係数
+    'duplicate_threshold': 0.8,   # 重複記事とみなす本文の推定Jaccard係数
+}
+
+# 署名のハッシュ関数（乗算シフト法: (a * h + b) mod 2^64 の上位32ビット）
+SEED = 1
+SHIFT = np.uint64(32)
+
+# シングルのローリングハッシュの基数
+SHINGLE_BASE = np.uint64(0x100000001B3)
+
+# 一度に署名を計算するシングル数（長い記事でもメモリを抑える）
+_HASH_CHUNK = 4096
+
+# バンド数の自動決定で偽陰性に掛ける重み（偽陽性は 1 - この値）
+FALSE_NEGATIVE_WEIGHT = 0.8
+
+# SQLiteへの書き込み単位
+_WRITE_CHUNK = 500
+
+# 関連記事セクション（他記事のタイトル・抜粋が並ぶため本文の比較から除く）
+RELATED_SECTION_PATTERN = re.compile(r'<div class="related-posts-section">.*?</div>\n</div>', re.DOTALL)
+
+
+def body_text(html: str) -> str:
+    """記事本文（Front Matter除去済み）から比較用のテキスト（タグ・関連記事セクション・空白を除去）"""
+    text = RELATED_SECTION_PATTERN.sub(' ', html)
+    text = HTML_TAG_PATTERN.sub(' ', text)
+    return WHITESPACE_PATTERN.sub('', text).lower()
+
+
+def optimal_bands(num_perm: int, threshold: float) -> int:
+    """閾値での偽陽性・偽陰性の加重和が最小となるバンド数（1バンドの行数 = num_perm // バンド数）
+
+    偽陽性は署名の比較で除けるため、見落とし（偽陰性）を重く見る
+    """
+
+    similarities = np.linspace(0.0, 1.0, 201)
+    below = similarities < threshold
+    best_bands, best_error = 1, None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        # 各Jaccard係数で少なくとも1バンドが一致する確率
+        probability = 1.0 - (1.0 - similarities ** rows) ** bands
+        error = ((1.0 - FALSE_NEGATIVE_WEIGHT) * probability[below].mean()
+                 + FALSE_NEGATIVE_WEIGHT * (1.0 - probability[~below]).mean())
+        if best_error is None or error < best_error:
+            best_bands, best_error = bands, error
+    return best_bands
+
+
+class MinHasher:
+    """文字n-gramのMinHash署名（同じ設定なら常に同じ署名）"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = SEED):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self.a = np.frombuffer(rng.bytes(8 * num_perm), dtype=np.uint64) | np.uint64(1)
+        self.b = np.frombuffer(rng.bytes(8 * num_perm), dtype=np.uint64)
+
+    def has_shingles(self, text: str) -> bool:
+        """比較できるだけの長さがあるか（シングル長未満のテキストは署名が意味を持たない）"""
+        return len(text) >= self.shingle_size
+
+    def shingle_hashes(self, text: str) -> np.ndarray:
+        """比較用テキストの文字n-gramのハッシュ（重複なし。文字コード列のローリングハッシュで一括計算）"""
+
+        codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+        if len(codes) == 0:
+            return codes
+        count = max(len(codes) - self.shingle_size + 1, 1)
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(min(self.shingle_size, len(codes))):
+            # uint64の演算は桁あふれで切り捨てられるが、同じ入力には同じ値となる
+            hashes = hashes * SHINGLE_BASE + codes[offset:offset + count]
+        return np.unique(hashes)
+
+    def signature(self, text: str) -> np.ndarray:
+        """比較用テキストのMinHash署名（uint32配列。空のテキストは全要素が最大値）"""
+
+        hashes = self.shingle_hashes(text)
+        signature = np.full(self.num_perm, np.iinfo(np.uint32).max, dtype=np.uint64)
+        for start in range(0, len(hashes), _HASH_CHUNK):
+            # 一時配列を作らないよう同じバッファ上で演算
+            permuted = np.multiply(hashes[start:start + _HASH_CHUNK, None], self.a)
+            permuted += self.b
+            permuted >>= SHIFT
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+
+class MinHashIndex(SQLiteStore):
+    """本文のMinHash署名とLSHバケット（記事の追加・更新・削除は差分のみ反映）"""
+
+    def __init__(self, db_path: Path, posts_dir: Path, config: Optional[Dict] = None):
+        settings = {**DEFAULT_BODY_SIMILARITY, **(config or {})}
+        self.db_path = Path(db_path)
+        self.posts_dir = Path(posts_dir)
+        self.threshold = float(settings['threshold'])
+        self.duplicate_threshold = float(settings['duplicate_threshold'])
+
+        num_perm = int(settings['num_perm'])
+        self.bands = int(settings['bands']) or optimal_bands(num_perm, self.threshold)
+        self.rows = num_perm // self.bands
+        self.hasher = MinHasher(num_perm, int(settings['shingle_size']))
+
+        self._open_database(self.db_path, SCHEMA)
+        self._check_parameters()
+
+    def _check_parameters(self):
+        """署名・バンドの設定が変わっていれば登録済みの署名を破棄（次回のsyncで作り直す）"""
+
+        parameters = json.dumps({
+            'num_perm': self.hasher.num_perm, 'shingle_size': self.hasher.shingle_size,
+            'bands': self.bands, 'seed': SEED,
+        }, sort_keys=True)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'parameters'").fetchone()
+            if row and row[0] == parameters:
+                return
+            if row:
+                logger.info("MinHashインデックスの設定が変わったため作り直します")
+            conn.execute('DELETE FROM buckets')
+            conn.execute('DELETE FROM signatures')
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('parameters', ?)", (parameters,))
+
+    def signature(self, text: str) -> np.ndarray:
+        """比較用テキストのMinHash署名"""
+        return self.hasher.signature(text)
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """署名をバンドに分けたバケットのキー（符号付き64ビット整数）"""
+        return [
+            int.from_bytes(hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(),
+                                           digest_size=8).digest(), 'little', signed=True)
+            for band in range(self.bands)
+        ]
+
+    def sync(self, read_body: Callable[[Path], str]):
+        """記事ファイルの更新時刻・サイズが変わったものだけ署名を作り直し、削除された記事を除去
+
+        read_body: 記事ファイルからFront Matterを除いた本文を返す関数
+        """
+
+        if not self.posts_dir.exists():
+            return
+
+        indexed = dict(self._get_connection().execute('SELECT post_id, fingerprint FROM signatures').fetchall())
+
+        seen = set()
+        pending = []
+        updated = 0
+        with os.scandir(self.posts_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.md') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                fingerprint = f"{stat.st_mtime_ns}:{stat.st_size}"
+                seen.add(entry.name)
+                if indexed.get(entry.name) == fingerprint:
+                    continue
+                try:
+                    text = body_text(read_body(Path(entry.path)))
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"記事読み込みエラー {entry.path}: {e}")
+                    continue
+                # 本文のない記事（空・マークアップのみ）はバケットに登録しない（互いに一致してしまうため）
+                signature = self.signature(text) if self.hasher.has_shingles(text) else None
+                pending.append((entry.name, signature, fingerprint))
+                if len(pending) >= _WRITE_CHUNK:
+                    self.add_posts(pending)
+                    updated += len(pending)
+                    pending = []
+
+        if pending:
+            self.add_posts(pending)
+            updated += len(pending)
+
+        removed = set(indexed) - seen
+        if removed:
+            self.remove_posts(removed)
+
+        if updated or removed:
+            logger.info(f"MinHashインデックスを更新: {updated} 件登録 / {len(removed)} 件削除")
+
+    def add_posts(self, posts: Iterable[Tuple[str, Optional[np.ndarray], str]]):
+        """記事（記事ID, 署名, フィンガープリント）を1トランザクションで登録
+
+        署名がNoneの記事はフィンガープリントだけを記録し、検索の候補にはならない
+        """
+
+        now = time.time()
+        with self._transaction() as conn:
+            for post_id, signature, fingerprint in posts:
+                conn.execute('DELETE FROM buckets WHERE post_id = ?', (post_id,))
+                if signature is not None:
+                    conn.executemany('INSERT OR IGNORE INTO buckets (band, bucket, post_id) VALUES (?, ?, ?)',
+                                     [(band, key, post_id) for band, key in enumerate(self.band_keys(signature))])
+                conn.execute(
+                    'INSERT OR REPLACE INTO signatures (post_id, fingerprint, signature, indexed_at) '
+                    'VALUES (?, ?, ?, ?)',
+                    (post_id, fingerprint, signature.astype(np.uint32).tobytes() if signature is not None else b'', now)
+                )
+
+    def remove_posts(self, post_ids: Iterable[str]):
+        """記事を削除"""
+        with self._transaction() as conn:
+            for post_id in post_ids:
+                conn.execute('DELETE FROM buckets WHERE post_id = ?', (post_id,))
+                conn.execute('DELETE FROM signatures WHERE post_id = ?', (post_id,))
+
+    def query(self, text: str, threshold: Optional[float] = None,
+              exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """本文の推定Jaccard係数が閾値以上の記事（記事ID, 推定値）を推定値の降順で返す
+
+        text: 比較用テキスト（body_text適用済み）
+        """
+
+        if not self.hasher.has_shingles(text):
+            return []
+
+        threshold = self.threshold if threshold is None else threshold
+        signature = self.signature(text)
+        conn = self._get_connection()
+
+        # いずれかのバンドが一致した記事が候補
+        candidates = set()
+        for band, key in enumerate(self.band_keys(signature)):
+            candidates.update(post_id for (post_id,) in conn.execute(
+                'SELECT post_id FROM buckets WHERE band = ? AND bucket = ?', (band, key)
+            ))
+        candidates.difference_update(exclude)
+        if not candidates:
+            return []
+
+        post_ids = []
+        signatures = []
+        ids = list(candidates)
+        for start in range(0, len(ids), _WRITE_CHUNK):
+            chunk = ids[start:start + _WRITE_CHUNK]
+            placeholders = ','.join('?' * len(chunk))
+            for post_id, blob in conn.execute(
+                f'SELECT post_id, signature FROM signatures WHERE post_id IN ({placeholders})', chunk
+            ):
+                post_ids.append(post_id)
+                signatures.append(np.frombuffer(blob, dtype=np.uint32))
+
+        similarities = (np.vstack(signatures) == signature).mean(axis=1)
+        results = [(post_id, float(s)) for post_id, s in zip(post_ids, similarities) if s >= threshold]
+        results.sort(key=lambda r: (-r[1], r[0]))
+        return results
+
+    def similar_posts(self, threshold: Optional[float] = None) -> Dict[str, List[Tuple[str, float]]]:
+        """登録済みの全記事について、本文の推定Jaccard係数が閾値以上の記事（記事ID → [(記事ID, 推定値)]）
+
+        いずれかのバンドで同じバケットに入った記事の組だけを署名で比べる
+        """
+
+        threshold = self.threshold if threshold is None else threshold
+        conn = self._get_connection()
+
+        pairs = set()
+        members: List[str] = []
+        current = None
+        for band, bucket, post_id in conn.execute('SELECT band, bucket, post_id FROM buckets ORDER BY band, bucket'):
+            if (band, bucket) != current:
+                current = (band, bucket)
+                members = []
+            pairs.update((other, post_id) if other < post_id else (post_id, other) for other in members)
+            members.append(post_id)
+        if not pairs:
+            return {}
+
+        signatures = {
+            post_id: np.frombuffer(blob, dtype=np.uint32)
+            for post_id, blob in conn.execute('SELECT post_id, signature FROM signatures') if blob
+        }
+        results: Dict[str, List[Tuple[str, float]]] = {}
+        for first, second in pairs:
+            if first not in signatures or second not in signatures:
+                continue
+            similarity = float((signatures[first] == signatures[second]).mean())
+            if similarity >= threshold:
+                results.setdefault(first, []).append((second, similarity))
+                results.setdefault(second, []).append((first, similarity))
+        for matches in results.values():
+            matches.sort(key=lambda r: (-r[1], r[0]))
+        return results
+
+    def near_duplicates(self, text: str, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """本文がほぼ同じ記事（記事ID, 推定Jaccard係数）"""
+        return self.query(text, self.duplicate_threshold, exclude)
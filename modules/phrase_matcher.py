@@ -0,0 +1,168 @@
+"""
+複数フレーズ照合モジュール
+Aho-Corasickオートマトンで辞書中の全フレーズの出現回数を1回の走査で数える
+トライによる最長一致優先の一括置換も提供
+"""
+
+import logging
+from collections import Counter, deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PhraseMatcher:
+    """Aho-Corasick法による複数フレーズの一括カウント（重なり合う出現もすべて数える）"""
+
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases = list(dict.fromkeys(p for p in phrases if p))
+
+        # トライ（goto関数）と各状態で確定するフレーズ
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[str]] = [[]]
+        for phrase in self.phrases:
+            state = 0
+            for ch in phrase:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    goto.append({})
+                    outputs.append([])
+                    next_state = len(goto) - 1
+                    goto[state][ch] = next_state
+                state = next_state
+            outputs[state].append(phrase)
+
+        # 失敗関数を幅優先で求め、遷移表を決定性オートマトン（DFA）に展開
+        # 各状態の遷移 = 失敗先の遷移 + 自身のgoto遷移（表にない文字は初期状態へ）
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [dict() for _ in goto]
+        transitions[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for ch, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(ch, 0) if state else 0
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+                queue.append(next_state)
+
+        self._transitions = transitions
+        self._outputs = outputs
+
+    def count(self, text: str) -> Counter:
+        """全フレーズの出現回数を1回の走査で数える"""
+
+        transitions = self._transitions
+        visits = [0] * len(transitions)
+        state = 0
+        for ch in text:
+            state = transitions[state].get(ch, 0)
+            visits[state] += 1
+
+        counts = Counter()
+        for state, visited in enumerate(visits):
+            if visited:
+                for phrase in self._outputs[state]:
+                    counts[phrase] += visited
+        return counts
+
+    def contains_any(self, text: str) -> bool:
+        """いずれかのフレーズを含むか（最初の一致で打ち切り）"""
+
+        transitions = self._transitions
+        outputs = self._outputs
+        state = 0
+        for ch in text:
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                return True
+        return False
+
+
+class PhraseRewriter:
+    """トライによる最長一致優先の一括置換（1回の走査で置換し、置換結果は再走査しない）"""
+
+    def __init__(self, table: Dict[str, str]):
+        self.table = {phrase: replacement for phrase, replacement in table.items() if phrase}
+
+        # 各状態の遷移と、その状態で終わるフレーズの置換先
+        goto: List[Dict[str, int]] = [{}]
+        replacements: List[Optional[str]] = [None]
+        for phrase, replacement in self.table.items():
+            state = 0
+            for ch in phrase:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    goto.append({})
+                    replacements.append(None)
+                    next_state = len(goto) - 1
+                    goto[state][ch] = next_state
+                state = next_state
+            replacements[state] = replacement
+
+        self._goto = goto
+        self._replacements = replacements
+
+    def rewrite(self, text: str) -> str:
+        """各位置で最長一致するフレーズを置換"""
+
+        goto = self._goto
+        replacements = self._replacements
+        root = goto[0]
+        length = len(text)
+        pieces = []
+        copied_until = 0
+        i = 0
+
+        while i < length:
+            next_state = root.get(text[i])
+            if next_state is None:
+                i += 1
+                continue
+
+            # トライをたどれるところまで進み、最後に確定したフレーズを採用
+            match_end = -1
+            match_replacement = None
+            j = i
+            state = next_state
+            while True:
+                j += 1
+                if replacements[state] is not None:
+                    match_end = j
+                    match_replacement = replacements[state]
+                if j >= length:
+                    break
+                state = goto[state].get(text[j])
+                if state is None:
+                    break
+
+            if match_end < 0:
+                i += 1
+                continue
+
+            pieces.append(text[copied_until:i])
+            pieces.append(match_replacement)
+            copied_until = i = match_end
+
+        if not pieces:
+            return text
+        pieces.append(text[copied_until:])
+        return ''.join(pieces)
+
+
+def load_phrase_table(path: Path) -> Dict[str, str]:
+    """タブ区切りの置換辞書を読み込む（1行1エントリ「変換前<TAB>変換後」、#で始まる行はコメント。変換前・変換後には#を含められる）"""
+
+    table = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.rstrip('\n')
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            parts = line.split('\t')
+            if len(parts) != 2 or not parts[0]:
+                logger.warning(f"置換辞書の形式が不正です: {path}:{line_number}")
+                continue
+            table[parts[0]] = parts[1]
+    return table
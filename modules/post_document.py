@@ -0,0 +1,141 @@
+"""
+記事ドキュメントモジュール
+生成中の記事をブロック（Front Matter・本文・関連記事・動画リンク・フッター）としてメモリ上に保持し、
+各処理はブロックを更新するだけにして、ファイルへの書き込みは最後に1回だけ行う
+"""
+
+import re
+import logging
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from .backlink_writer import (
+    RELATED_GRID_PATTERN, atomic_write_text, find_closing_div, find_related_section,
+    related_section, section_links
+)
+from .text_patterns import FRONT_MATTER_PATTERN
+
+logger = logging.getLogger(__name__)
+
+VIDEO_SECTION_PATTERN = re.compile(r'<div class="video-link-section">')
+# フッター（Jekyll記事の記事情報、WordPress/CMS用のCTA）
+FOOTER_PATTERN = re.compile(r'<div class="(?:article-footer|cta-section)">')
+# フッターの直前にあればフッターに含める行（区切り線・コメント）
+FOOTER_LEAD_PATTERN = re.compile(r'(?:\n(?:<hr class="section-divider">|<!--[^\n]*-->))+\n*$')
+
+
+class PostDocument:
+    """組み立て中の記事
+
+    path: 書き出し先
+    front_matter: Front Matter（--- を含む。なければ空）
+    body: 本文（関連記事・動画リンク・フッターを除く）
+    footer: フッター（記事の末尾に置くブロック）
+    """
+
+    def __init__(self, path: Path, body: str, footer: str = '', front_matter: str = ''):
+        self.path = Path(path)
+        self.front_matter = front_matter
+        self.body = body
+        self.footer = footer
+        self.video_section: Optional[str] = None
+        # 関連記事カード（カードHTML）とリンク先URL
+        self.related_cards: List[str] = []
+        self._related_urls: Set[str] = set()
+
+    @classmethod
+    def from_html(cls, path: Path, html: str) -> 'PostDocument':
+        """記事全体のHTMLをブロックに分けて読み込む（関連記事・動画リンク・フッターは位置によらず取り出す）"""
+
+        front_matter = ''
+        match = FRONT_MATTER_PATTERN.match(html)
+        if match:
+            front_matter = match.group(0).rstrip('\n')
+            html = html[match.end():]
+
+        related, html = _take_block(html, find_related_section(html))
+        video, html = _take_block(html, _find_block(html, VIDEO_SECTION_PATTERN))
+
+        footer = ''
+        footer_match = FOOTER_PATTERN.search(html)
+        if footer_match:
+            start = footer_match.start()
+            lead = FOOTER_LEAD_PATTERN.search(html, 0, start)
+            if lead:
+                start = lead.start() + 1
+            footer = html[start:].strip('\n')
+            html = html[:start]
+
+        document = cls(path, html.strip('\n'), footer, front_matter)
+        document.video_section = video
+        if related:
+            grid = RELATED_GRID_PATTERN.search(related)
+            close = find_closing_div(related, grid.end()) if grid else None
+            if close is not None and related[grid.end():close].strip('\n'):
+                document.related_cards.append(related[grid.end():close].strip('\n'))
+                document._related_urls.update(section_links(related))
+        return document
+
+    @classmethod
+    def load(cls, path: Path) -> 'PostDocument':
+        """記事ファイルを読み込む"""
+        return cls.from_html(path, Path(path).read_text(encoding='utf-8'))
+
+    def add_related_card(self, card: str, url: Optional[str] = None) -> bool:
+        """関連記事カードを追加（urlへのリンクが既にあれば追加しない）"""
+
+        if url and (url in self._related_urls or f'href="{url}"' in self.body):
+            return False
+        self.related_cards.append(card)
+        if url:
+            self._related_urls.add(url)
+        return True
+
+    def set_video_section(self, html: str):
+        """動画リンクセクションを設定（既にあれば置き換え）"""
+        self.video_section = html
+
+    def render_body(self) -> str:
+        """Front Matterを除いた記事のHTML（本文・関連記事・動画リンク・フッターの順）"""
+
+        blocks = [self.body]
+        if self.related_cards:
+            blocks.append(related_section(self.related_cards))
+        if self.video_section:
+            blocks.append(self.video_section)
+        if self.footer:
+            blocks.append(self.footer)
+        return '\n\n'.join(block for block in blocks if block)
+
+    def render(self) -> str:
+        """記事全体"""
+        body = self.render_body()
+        return f"{self.front_matter}\n{body}" if self.front_matter else body
+
+    def save(self) -> Path:
+        """記事を書き出す（一時ファイルへの書き込みと置き換えで1回だけ）"""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.path, self.render())
+        logger.info(f"✓ 記事を書き出し: {self.path}")
+        return self.path
+
+
+def _find_block(html: str, pattern: re.Pattern) -> Optional[Tuple[int, int]]:
+    """開始タグから対応する</div>までの範囲"""
+
+    match = pattern.search(html)
+    if not match:
+        return None
+    close = find_closing_div(html, match.end())
+    return (match.start(), close + len('</div>')) if close is not None else None
+
+
+def _take_block(html: str, span: Optional[Tuple[int, int]]) -> Tuple[Optional[str], str]:
+    """範囲のブロックと、それを取り除いたHTML"""
+
+    if span is None:
+        return None, html
+    start, end = span
+    rest = html[:start].rstrip('\n') + ('\n\n' if html[end:].strip() else '') + html[end:].lstrip('\n')
+    return html[start:end], rest
@@ -0,0 +1,195 @@
+"""
+記事メタデータキャッシュモジュール
+_postsの記事のFront Matter・抜粋・URL・本文の開始位置を、パス・更新時刻・サイズをキーにSQLiteへ保持し、
+変更されたファイルだけを読み直す（内部リンク・プレビューサーバーで共有）
+"""
+
+import os
+import re
+import json
+import sqlite3
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .text_patterns import FRONT_MATTER_PATTERN, HTML_TAG_PATTERN, WHITESPACE_PATTERN
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS post_metadata (
+    path TEXT PRIMARY KEY,
+    directory TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    front_matter TEXT NOT NULL,
+    title TEXT NOT NULL,
+    excerpt TEXT NOT NULL,
+    url TEXT NOT NULL,
+    body_offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_post_metadata_directory ON post_metadata(directory);
+"""
+
+COLUMNS = ('path', 'name', 'mtime_ns', 'size', 'front_matter', 'title', 'excerpt', 'url', 'body_offset')
+
+# 抜粋の最大文字数（Front Matterにexcerptがない場合は本文の先頭から作成）
+EXCERPT_LENGTH = 160
+
+POST_FILENAME_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})-(.*)')
+FRONT_MATTER_TITLE_PATTERN = re.compile(r'title:\s*(.+)')
+
+
+def post_url(post_file: Path) -> str:
+    """記事ファイル名からURLを生成（YYYY-MM-DD-slug → /YYYY/MM/DD/slug/）"""
+
+    filename = Path(post_file).stem
+    date_match = POST_FILENAME_PATTERN.match(filename)
+    if date_match:
+        year, month, day, slug = date_match.groups()
+        return f"/{year}/{month}/{day}/{slug}/"
+
+    # フォールバック
+    return f"/posts/{filename}/"
+
+
+def _load_front_matter(block: str, post_file: Path) -> Dict:
+    """Front MatterのYAMLを解析（PyYAMLがなければタイトルのみ抽出）"""
+
+    try:
+        import yaml
+    except ImportError:
+        title_match = FRONT_MATTER_TITLE_PATTERN.search(block)
+        return {'title': title_match.group(1).strip(' "\'')} if title_match else {}
+
+    try:
+        data = yaml.safe_load(block)
+    except yaml.YAMLError as e:
+        logger.warning(f"YAML解析エラー {post_file}: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def parse_post(post_file: Path, content: str) -> Dict:
+    """記事ファイルの内容からメタデータを作成"""
+
+    match = FRONT_MATTER_PATTERN.match(content)
+    front_matter = _load_front_matter(match.group(0)[4:].rsplit('---', 1)[0], post_file) if match else {}
+    body_offset = match.end() if match else 0
+
+    excerpt = front_matter.get('excerpt')
+    if not excerpt:
+        body = HTML_TAG_PATTERN.sub(' ', content[body_offset:body_offset + EXCERPT_LENGTH * 20])
+        excerpt = WHITESPACE_PATTERN.sub(' ', body).strip()[:EXCERPT_LENGTH]
+
+    return {
+        'front_matter': front_matter,
+        'title': str(front_matter.get('title') or post_file.stem),
+        'excerpt': str(excerpt),
+        'url': post_url(post_file),
+        'body_offset': body_offset,
+    }
+
+
+class PostMetadataCache(SQLiteStore):
+    """記事メタデータのキャッシュ（パス・更新時刻・サイズが一致すればファイルを読まない）"""
+
+    def __init__(self, db_path: Path = Path('cache/post_metadata.db')):
+        self.db_path = Path(db_path)
+
+        self._open_database(self.db_path, SCHEMA)
+
+    @staticmethod
+    def _row_to_record(row) -> Dict:
+        record = dict(zip(COLUMNS, row))
+        record['front_matter'] = json.loads(record['front_matter'])
+        return record
+
+    def _parse_file(self, path: str, name: str, stat: os.stat_result) -> Dict:
+        """ファイルを読んでレコードを作成"""
+        content = Path(path).read_text(encoding='utf-8')
+        return {
+            'path': path,
+            'name': name,
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            **parse_post(Path(path), content)
+        }
+
+    def _store(self, conn: sqlite3.Connection, directory: str, record: Dict):
+        conn.execute(
+            'INSERT OR REPLACE INTO post_metadata '
+            '(path, directory, name, mtime_ns, size, front_matter, title, excerpt, url, body_offset) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (record['path'], directory, record['name'], record['mtime_ns'], record['size'],
+             json.dumps(record['front_matter'], ensure_ascii=False, default=str),
+             record['title'], record['excerpt'], record['url'], record['body_offset'])
+        )
+
+    def get(self, post_file: Path) -> Optional[Dict]:
+        """1記事のメタデータ（変更されていればファイルを読み直す。存在しなければNone）"""
+
+        path = os.path.abspath(post_file)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            with self._transaction() as conn:
+                conn.execute('DELETE FROM post_metadata WHERE path = ?', (path,))
+            return None
+
+        row = self._get_connection().execute(
+            f"SELECT {', '.join(COLUMNS)} FROM post_metadata WHERE path = ?", (path,)
+        ).fetchone()
+        if row and row[2] == stat.st_mtime_ns and row[3] == stat.st_size:
+            return self._row_to_record(row)
+
+        record = self._parse_file(path, os.path.basename(path), stat)
+        with self._transaction() as conn:
+            self._store(conn, os.path.dirname(path), record)
+        return record
+
+    def scan(self, posts_dir: Path, suffix: str = '.md') -> List[Dict]:
+        """ディレクトリ内の全記事のメタデータ（ファイル名順）。変更・追加されたファイルだけ読み、削除分は除去"""
+
+        directory = os.path.abspath(posts_dir)
+        if not os.path.isdir(directory):
+            return []
+
+        conn = self._get_connection()
+        cached = {
+            row[1]: row for row in conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM post_metadata WHERE directory = ?", (directory,)
+            )
+        }
+
+        records = []
+        changed = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.name.endswith(suffix) or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                row = cached.pop(entry.name, None)
+                if row and row[2] == stat.st_mtime_ns and row[3] == stat.st_size:
+                    records.append(self._row_to_record(row))
+                    continue
+                try:
+                    record = self._parse_file(entry.path, entry.name, stat)
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.warning(f"記事読み込みエラー {entry.path}: {e}")
+                    continue
+                records.append(record)
+                changed.append(record)
+
+        # 変更分の保存と削除されたファイルの除去をまとめて反映
+        if changed or cached:
+            with self._transaction() as conn:
+                for record in changed:
+                    self._store(conn, directory, record)
+                conn.executemany('DELETE FROM post_metadata WHERE path = ?', [(row[0],) for row in cached.values()])
+            logger.debug(f"記事メタデータを更新: {len(changed)} 件 / 削除 {len(cached)} 件")
+
+        records.sort(key=lambda r: r['name'])
+        return records
@@ -0,0 +1,233 @@
+"""
+記事一括再生成モジュール
+各処理結果ディレクトリと、Webアプリで書き出した記事の保存先（output.export_artifacts_dir）に保存した
+ブログ生成結果（blog_content.json）から、現在のテンプレートで記事を描画し直す。
+描画はプロセスプールで並列に行い、内容が変わらない記事は書き込まない（更新時刻を変えない）。
+既存の関連記事セクションは記事ファイルから引き継ぐ
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .backlink_writer import atomic_write_text
+from .jekyll_writer import find_updated_date
+from .post_document import PostDocument
+
+logger = logging.getLogger(__name__)
+
+# 処理結果ディレクトリに保存するブログ生成結果
+ARTIFACT_NAME = 'blog_content.json'
+ARTIFACT_VERSION = 1
+# Webアプリで書き出した記事のブログ生成結果の保存先（記事ごとのサブディレクトリ）
+EXPORT_ARTIFACTS_DIR = './cache/post_artifacts'
+
+# ワーカープロセスごとの記事生成クラス（initializerで作成）
+_writers: Dict = {}
+
+
+def save_post_artifact(output_dir: Path, post_format: str, title: str, content: Dict, post_path: Path,
+                       video_url: Optional[str] = None, transcript: Optional[Dict] = None) -> Path:
+    """記事の再生成に使うブログ生成結果を保存
+
+    post_format: 'wordpress'（WordPressContentGenerator）または 'jekyll'（JekyllWriter）
+    transcript: 指定すると output_dir に transcript.json として保存（処理結果ディレクトリ以外に保存する場合）
+    """
+
+    output_dir = Path(output_dir)
+    post_path = Path(post_path)
+    try:
+        # 処理結果ディレクトリ内の記事は相対パスで保存（ディレクトリを移動しても再生成できるように）
+        stored_path = str(post_path.resolve().relative_to(output_dir.resolve()))
+    except ValueError:
+        stored_path = str(post_path.resolve())
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if transcript is not None:
+        atomic_write_text(output_dir / 'transcript.json', json.dumps(transcript, ensure_ascii=False, indent=2))
+    artifact_path = output_dir / ARTIFACT_NAME
+    atomic_write_text(artifact_path, json.dumps({
+        'version': ARTIFACT_VERSION,
+        'format': post_format,
+        'title': title,
+        'content': content,
+        'post': stored_path,
+        'video_url': video_url,
+    }, ensure_ascii=False, indent=2))
+    return artifact_path
+
+
+def export_artifact_dir(config: Dict, post_path: Path) -> Path:
+    """Webアプリで書き出した記事のブログ生成結果の保存先（記事のファイル名ごと）"""
+    export_dir = Path(config.get('output', {}).get('export_artifacts_dir') or EXPORT_ARTIFACTS_DIR)
+    return export_dir / Path(post_path).stem
+
+
+def find_artifacts(*base_dirs: Path) -> List[Path]:
+    """処理結果ディレクトリのブログ生成結果（指定したディレクトリの順、各ディレクトリ内はディレクトリ名順）"""
+
+    artifacts = []
+    for base_dir in map(Path, base_dirs):
+        if base_dir.exists():
+            artifacts.extend(sorted(base_dir.glob(f'*/{ARTIFACT_NAME}')))
+    return artifacts
+
+
+def _init_worker(config: Dict):
+    """ワーカープロセスの初期化（記事生成クラスを1回だけ作る。記事ごとのログは抑える）"""
+
+    from .jekyll_writer import JekyllWriter
+    from .wordpress_content_generator import WordPressContentGenerator
+
+    logging.getLogger('modules').setLevel(logging.WARNING)
+    _writers['jekyll'] = JekyllWriter(config.get('jekyll', {}))
+    _writers['wordpress'] = WordPressContentGenerator(config)
+
+
+def render_post(artifact: Dict, artifact_dir: Path, existing: Optional[str]) -> PostDocument:
+    """ブログ生成結果から記事を描画（Front Matterと関連記事は既存の記事から引き継ぐ）"""
+
+    post_path = artifact_dir / artifact['post']
+    transcript_path = artifact_dir / 'transcript.json'
+    transcript = json.loads(transcript_path.read_text(encoding='utf-8')) if transcript_path.exists() else {}
+    current = PostDocument.from_html(post_path, existing) if existing is not None else None
+
+    if artifact['format'] == 'wordpress':
+        document = _writers['wordpress'].create_blog_document(
+            artifact['title'], artifact['content'], transcript, artifact_dir
+        )
+        document.path = post_path
+    elif artifact['format'] == 'jekyll':
+        # 日付・アイキャッチ画像を含むFront Matterとフッターの更新日は元の記事のものを使う
+        # （再生成した日付にすると、テンプレートが同じでも日が変わるたびに全記事が書き換わる）
+        updated = find_updated_date(existing) if existing is not None else None
+        body = _writers['jekyll'].render_body(artifact['title'], artifact['content'], transcript, updated=updated)
+        front_matter = current.front_matter if current else ''
+        document = PostDocument.from_html(post_path, f"{front_matter}\n{body}" if front_matter else body)
+    else:
+        raise ValueError(f"未対応の記事形式: {artifact['format']}")
+
+    if current is not None:
+        for card in current.related_cards:
+            document.add_related_card(card)
+        document.video_section = current.video_section
+    if artifact.get('video_url'):
+        _writers['jekyll'].add_video_link_section(document, artifact['video_url'])
+    return document
+
+
+def regenerate_post(artifact_path: Path, dry_run: bool = False) -> Tuple[str, str, int]:
+    """1記事を再生成（記事のパス, 結果 updated / unchanged / error, 描画したバイト数）"""
+
+    artifact_path = Path(artifact_path)
+    post_path = artifact_path
+    try:
+        artifact = json.loads(artifact_path.read_text(encoding='utf-8'))
+        post_path = artifact_path.parent / artifact['post']
+        existing = post_path.read_text(encoding='utf-8') if post_path.exists() else None
+
+        rendered = render_post(artifact, artifact_path.parent, existing).render()
+        size = len(rendered.encode('utf-8'))
+        if rendered == existing:
+            return str(post_path), 'unchanged', size
+        if not dry_run:
+            atomic_write_text(post_path, rendered)
+        return str(post_path), 'updated', size
+    except Exception as e:
+        return str(post_path), f'error: {e}', 0
+
+
+def regenerate_all(config: Dict, base_dir: Optional[Path] = None, workers: Optional[int] = None,
+                   dry_run: bool = False, progress: bool = True) -> Dict:
+    """全記事を再生成（プロセスプールで並列に描画し、変更のあった記事だけ書き込む）"""
+
+    base_dir = Path(base_dir or config.get('output', {}).get('base_dir', './output'))
+    export_dir = Path(config.get('output', {}).get('export_artifacts_dir') or EXPORT_ARTIFACTS_DIR)
+    artifacts = find_artifacts(base_dir, export_dir)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(artifacts) or 1))
+    logger.info(f"記事の一括再生成: {len(artifacts)} 記事 / {workers} プロセス")
+
+    counts = {'updated': 0, 'unchanged': 0, 'errors': 0}
+    errors = []
+    rendered_bytes = 0
+    started = time.perf_counter()
+
+    bar = None
+    if progress:
+        from tqdm import tqdm
+        bar = tqdm(total=len(artifacts), desc="記事再生成中", unit="記事")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as pool:
+        # 進捗を細かく出せる程度にまとめてワーカーへ渡す
+        chunksize = max(1, len(artifacts) // (workers * 16))
+        results = pool.map(regenerate_post, artifacts, [dry_run] * len(artifacts), chunksize=chunksize)
+        for post_path, status, size in results:
+            rendered_bytes += size
+            if status.startswith('error'):
+                counts['errors'] += 1
+                errors.append({'post': post_path, 'error': status[len('error: '):]})
+                logger.warning(f"記事の再生成に失敗 {post_path}: {status}")
+            else:
+                counts[status] += 1
+            if bar is not None:
+                bar.update(1)
+                bar.set_postfix(updated=counts['updated'], unchanged=counts['unchanged'])
+
+    if bar is not None:
+        bar.close()
+
+    seconds = time.perf_counter() - started
+    summary = {
+        'posts': len(artifacts),
+        **counts,
+        'errors_detail': errors,
+        'dry_run': dry_run,
+        'workers': workers,
+        'seconds': round(seconds, 3),
+        'posts_per_second': round(len(artifacts) / seconds, 1) if seconds > 0 else 0,
+        'megabytes_per_second': round(rendered_bytes / seconds / 1e6, 2) if seconds > 0 else 0,
+    }
+    logger.info(f"記事の一括再生成完了: {counts['updated']} 件更新 / {counts['unchanged']} 件変更なし / "
+                f"{counts['errors']} 件失敗（{summary['posts_per_second']} 記事/秒）")
+    return summary
+
+
+def main(argv: Optional[List[str]] = None):
+    """全記事を現在のテンプレートで再生成（python -m modules.post_regenerator）"""
+
+    parser = argparse.ArgumentParser(description='記事の一括再生成')
+    parser.add_argument('--config', default='config.yaml', help='設定ファイル')
+    parser.add_argument('--output-dir', help='処理結果のディレクトリ（省略時は output.base_dir）')
+    parser.add_argument('--workers', type=int, help='プロセス数（省略時はCPU数）')
+    parser.add_argument('--dry-run', action='store_true', help='書き込まずに変更される記事数だけ数える')
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    args = parser.parse_args(argv)
+
+    import yaml
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+
+    summary = regenerate_all(config, args.output_dir, args.workers, args.dry_run, progress=not args.json)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    action = '更新対象' if args.dry_run else '更新'
+    print(f"♻️ {summary['posts']} 記事: {action} {summary['updated']} / 変更なし {summary['unchanged']} / "
+          f"失敗 {summary['errors']}")
+    print(f"⏱ {summary['seconds']}秒（{summary['posts_per_second']} 記事/秒, "
+          f"{summary['megabytes_per_second']} MB/秒, {summary['workers']} プロセス）")
+    for error in summary['errors_detail'][:10]:
+        print(f"  ❌ {error['post']}: {error['error']}")
+    if summary['errors']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
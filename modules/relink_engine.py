@@ -0,0 +1,152 @@
+"""
+全記事の関連記事計算モジュール
+記事×語（キーワード・タイトル語・カテゴリ）の疎な0/1行列から、行ブロックごとの疎行列積で全記事対の共通語数を求め、
+項目ごとのJaccard係数の加重和（InternalLinkManager._calculate_similarity と同じ類似度）の上位k件を求める
+"""
+
+import logging
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 1ブロックで展開する（記事, 共通語を持つ記事）の組の上限（メモリ使用量の目安: 1組あたり数十バイト）
+DEFAULT_BLOCK_WORK = 4_000_000
+# 1ブロックの最大行数（類似度の密行列は 行数 × 記事数）
+DEFAULT_BLOCK_ROWS = 512
+
+
+class BinaryTermMatrix:
+    """記事×語の0/1疎行列（記事→語のCSRと語→記事のCSCを保持）"""
+
+    def __init__(self, term_sets: Sequence[Set[str]]):
+        vocabulary: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, terms in enumerate(term_sets):
+            for term in terms:
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+
+        self.num_posts = len(term_sets)
+        self.num_terms = len(vocabulary)
+        rows_array = np.array(rows, dtype=np.int64)
+        cols_array = np.array(cols, dtype=np.int64)
+
+        # 記事ごとの語（行順に追加したためそのままCSR）
+        self.sizes = np.bincount(rows_array, minlength=self.num_posts)
+        self.post_ptr = np.concatenate(([0], np.cumsum(self.sizes)))
+        self.post_terms = cols_array
+
+        # 語ごとの記事（転置リスト）
+        order = np.argsort(cols_array, kind='stable')
+        self.term_posts = rows_array[order]
+        self.term_ptr = np.concatenate(([0], np.cumsum(np.bincount(cols_array, minlength=self.num_terms))))
+
+    def row_work(self) -> np.ndarray:
+        """記事ごとの積の計算量（語の転置リスト長の和）"""
+        lengths = np.diff(self.term_ptr)[self.post_terms]
+        return np.bincount(np.repeat(np.arange(self.num_posts), self.sizes), weights=lengths,
+                           minlength=self.num_posts).astype(np.int64)
+
+    def intersections(self, start: int, stop: int) -> np.ndarray:
+        """記事 start〜stop と全記事の共通語数（(stop - start) × 記事数の密行列）"""
+
+        block_rows = stop - start
+        terms = self.post_terms[self.post_ptr[start]:self.post_ptr[stop]]
+        owners = np.repeat(np.arange(block_rows), self.sizes[start:stop])
+
+        # 各語の転置リストを連結して（ブロック内の行, 記事）の組を作る
+        lengths = self.term_ptr[terms + 1] - self.term_ptr[terms]
+        total = int(lengths.sum())
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(self.term_ptr[terms] - offsets, lengths) + np.arange(total)
+        pairs = np.repeat(owners, lengths) * self.num_posts + self.term_posts[positions]
+
+        return np.bincount(pairs, minlength=block_rows * self.num_posts).reshape(block_rows, self.num_posts)
+
+
+def block_bounds(work: np.ndarray, max_work: int, max_rows: int) -> List[Tuple[int, int]]:
+    """計算量の累積が上限に収まるよう行を区切ったブロック（start, stop）"""
+
+    bounds = []
+    start = 0
+    accumulated = 0
+    for row, cost in enumerate(work.tolist()):
+        if row > start and (accumulated + cost > max_work or row - start >= max_rows):
+            bounds.append((start, row))
+            start, accumulated = row, 0
+        accumulated += cost
+    if start < len(work):
+        bounds.append((start, len(work)))
+    return bounds
+
+
+def top_k_similar(field_sets: Dict[str, Sequence[Set[str]]], weights: Dict[str, float], k: int,
+                  threshold: float, max_work: int = DEFAULT_BLOCK_WORK,
+                  max_rows: int = DEFAULT_BLOCK_ROWS) -> Tuple[np.ndarray, np.ndarray]:
+    """全記事について類似度が閾値を超える上位k件の記事（同点は番号順）
+
+    field_sets: 項目名 → 記事ごとの語の集合（全項目で記事の並びは同じ）
+    戻り値: (近傍の記事番号 (記事数 × k, 該当なしは -1), 類似度 (記事数 × k))
+    """
+
+    fields = [field for field in field_sets if weights.get(field, 0) > 0]
+    matrices = {field: BinaryTermMatrix(field_sets[field]) for field in fields}
+    num_posts = len(next(iter(field_sets.values()))) if field_sets else 0
+
+    neighbors = np.full((num_posts, k), -1, dtype=np.int64)
+    scores = np.zeros((num_posts, k), dtype=np.float64)
+    if num_posts == 0 or k <= 0 or not fields:
+        return neighbors, scores
+
+    work = sum(matrix.row_work() for matrix in matrices.values())
+    bounds = block_bounds(work, max_work, max_rows)
+
+    for start, stop in bounds:
+        similarity = np.zeros((stop - start, num_posts), dtype=np.float64)
+        for field, matrix in matrices.items():
+            intersection = matrix.intersections(start, stop)
+            union = matrix.sizes[start:stop, None] + matrix.sizes[None, :] - intersection
+            # どちらかの語が空なら共通語数が0のため類似度も0（per-postの類似度計算と同じ）
+            jaccard = intersection / np.maximum(union, 1)
+            jaccard *= weights[field]
+            similarity += jaccard
+
+        # 自分自身は除く
+        rows = np.arange(stop - start)
+        similarity[rows, rows + start] = -1.0
+
+        # k番目の値以上かつ閾値を超える候補だけを（行, 類似度の降順, 番号順）に並べ、各行の先頭k件を採る
+        kk = min(k, num_posts)
+        kth = np.partition(similarity, num_posts - kk, axis=1)[:, num_posts - kk]
+        rows, cols = np.nonzero((similarity >= kth[:, None]) & (similarity > threshold))
+        values = similarity[rows, cols]
+        order = np.lexsort((cols, -values, rows))
+        rows, cols, values = rows[order], cols[order], values[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        keep = rank < k
+        neighbors[start + rows[keep], rank[keep]] = cols[keep]
+        scores[start + rows[keep], rank[keep]] = values[keep]
+
+    logger.info(f"関連記事の一括計算: {num_posts} 記事 / {len(bounds)} ブロック")
+    return neighbors, scores
+
+
+def connected_components(num_nodes: int, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """無向グラフの連結成分のラベル（成分内の最小の頂点番号）"""
+
+    labels = np.arange(num_nodes)
+    if len(sources) == 0:
+        return labels
+
+    while True:
+        updated = labels.copy()
+        np.minimum.at(updated, sources, labels[targets])
+        np.minimum.at(updated, targets, labels[sources])
+        # ラベルの指す先のラベルをたどって収束を早める
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
@@ -0,0 +1,404 @@
+"""
+セッションストアモジュール
+Webアプリのセッション・ジョブ状態・設定バージョンをSQLiteで保持し、複数ワーカー間で共有
+"""
+
+import os
+import re
+import asyncio
+import json
+import time
+import sqlite3
+import secrets
+import logging
+from pathlib import Path
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from .sqlite_store import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+# 削除中のセッションでジョブを開始するときの待機間隔・上限（秒）
+EVICTION_POLL_SECONDS = 0.1
+EVICTION_WAIT_SECONDS = 60.0
+
+# 読み取り時の最終アクセス時刻の更新間隔（秒。GCの判定には十分な精度）
+ACCESS_UPDATE_INTERVAL = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_session ON jobs(session_id);
+CREATE TABLE IF NOT EXISTS evictions (
+    session_id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS admission_slots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    resource TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    active INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_admission_slots_resource ON admission_slots(resource);
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    client_id TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _pid_alive(pid: int) -> bool:
+    """プロセスが生存しているか"""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SessionStore(SQLiteStore):
+    """SQLiteベースのセッションストア（マルチワーカー対応）"""
+
+    # セッションIDの書式（推測不能なランダム値のみ受け付ける）
+    SESSION_ID_PATTERN = re.compile(r'^session_[A-Za-z0-9_-]{22}$')
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+
+        self._open_database(self.db_path, SCHEMA)
+
+    @staticmethod
+    def new_session_id() -> str:
+        """暗号学的に安全なセッションIDを発行（状態は確保しない）"""
+        return f"session_{secrets.token_urlsafe(16)}"
+
+    def is_valid_session_id(self, session_id: Optional[str]) -> bool:
+        """セッションIDの書式を検証"""
+        return bool(session_id) and bool(self.SESSION_ID_PATTERN.match(session_id))
+
+    def _new_session_data(self, session_id: str) -> Dict:
+        """セッションの初期データ"""
+        return {
+            'id': session_id,
+            'created_at': datetime.now().isoformat(),
+            'status': 'initialized',
+            'steps_completed': [],
+            'data': {},
+            'files': {}
+        }
+
+    def create_session(self, session_id: str) -> Optional[Dict]:
+        """新しいセッションを作成（既に存在する場合はNone）"""
+
+        session = self._new_session_data(session_id)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO sessions (id, data, last_access) VALUES (?, ?, ?)',
+                (session_id, json.dumps(session, ensure_ascii=False, default=str), time.time())
+            )
+        return session if cursor.rowcount == 1 else None
+
+    def get_or_create_session(self, session_id: str) -> Optional[Dict]:
+        """セッションを取得し、なければ作成（最初のAPI呼び出し時の遅延作成）"""
+
+        if not self.is_valid_session_id(session_id):
+            return None
+
+        session = self.get_session(session_id)
+        if session is not None:
+            return session
+
+        with self._transaction() as conn:
+            row = conn.execute('SELECT data FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            if row:
+                return json.loads(row[0])
+
+            session = self._new_session_data(session_id)
+            conn.execute(
+                'INSERT INTO sessions (id, data, last_access) VALUES (?, ?, ?)',
+                (session_id, json.dumps(session, ensure_ascii=False, default=str), time.time())
+            )
+            return session
+
+    def get_session(self, session_id: str) -> Optional[Dict]:
+        """セッション取得（書き込みロックを取らずに読み、最終アクセス時刻は間隔をあけて別に更新）"""
+
+        row = self._get_connection().execute(
+            'SELECT data, last_access FROM sessions WHERE id = ?', (session_id,)
+        ).fetchone()
+        if not row:
+            return None
+
+        now = time.time()
+        if now - row[1] >= ACCESS_UPDATE_INTERVAL:
+            self._touch(session_id, now)
+        return json.loads(row[0])
+
+    def _touch(self, session_id: str, now: float):
+        """最終アクセス時刻を更新（単独の短い書き込み。失敗しても読み取りは続ける）"""
+
+        try:
+            self._get_connection().execute(
+                'UPDATE sessions SET last_access = ? WHERE id = ? AND last_access < ?',
+                (now, session_id, now - ACCESS_UPDATE_INTERVAL)
+            )
+        except sqlite3.OperationalError as e:
+            logger.debug(f"最終アクセス時刻を更新できません {session_id}: {e}")
+
+    def update_session(self, session_id: str, data: Dict):
+        """セッション更新（読み込みから書き込みまで同一トランザクション）"""
+
+        with self._transaction() as conn:
+            row = conn.execute('SELECT data FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            if not row:
+                return
+            session = json.loads(row[0])
+            session.update(data)
+            conn.execute(
+                'UPDATE sessions SET data = ?, last_access = ? WHERE id = ?',
+                (json.dumps(session, ensure_ascii=False, default=str), time.time(), session_id)
+            )
+
+    def delete_session(self, session_id: str):
+        """セッション削除（ガベージコレクション時）"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+
+    def last_access(self, session_id: str) -> Optional[float]:
+        """セッションの最終アクセス時刻（epoch秒）"""
+        row = self._get_connection().execute(
+            'SELECT last_access FROM sessions WHERE id = ?', (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    @contextmanager
+    def track_job(self, session_id: Optional[str]):
+        """処理中ジョブとして登録（処理中の成果物はGC対象外）"""
+
+        if not session_id:
+            yield
+            return
+
+        deadline = time.monotonic() + EVICTION_WAIT_SECONDS
+        job_id = self._start_job(session_id, deadline)
+        while job_id is None:
+            time.sleep(EVICTION_POLL_SECONDS)
+            job_id = self._start_job(session_id, deadline)
+        try:
+            yield
+        finally:
+            self._finish_job(job_id)
+
+    @asynccontextmanager
+    async def track_job_async(self, session_id: Optional[str]):
+        """track_job のasync版（SQLiteの処理はスレッドで行い、削除中の待機でイベントループを止めない）"""
+
+        if not session_id:
+            yield
+            return
+
+        deadline = time.monotonic() + EVICTION_WAIT_SECONDS
+        job_id = await asyncio.to_thread(self._start_job, session_id, deadline)
+        while job_id is None:
+            await asyncio.sleep(EVICTION_POLL_SECONDS)
+            job_id = await asyncio.to_thread(self._start_job, session_id, deadline)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(self._finish_job, job_id)
+
+    def _start_job(self, session_id: str, deadline: float) -> Optional[int]:
+        """ジョブを登録してIDを返す（成果物の削除中で期限前ならNone。呼び出し側で待ってから再試行）
+
+        削除の判定と登録は同じ書き込みロックの中で行う
+        """
+
+        with self._transaction() as conn:
+            row = conn.execute('SELECT pid FROM evictions WHERE session_id = ?', (session_id,)).fetchone()
+            if row and _pid_alive(row[0]) and time.monotonic() < deadline:
+                return None
+            if row:
+                conn.execute('DELETE FROM evictions WHERE session_id = ?', (session_id,))
+            return conn.execute(
+                'INSERT INTO jobs (session_id, pid, started_at) VALUES (?, ?, ?)',
+                (session_id, os.getpid(), time.time())
+            ).lastrowid
+
+    def _finish_job(self, job_id: int):
+        """ジョブの登録を削除"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def is_in_flight(self, session_id: str) -> bool:
+        """セッションに処理中のジョブがあるか（異常終了したワーカーのジョブは除外）"""
+
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT id, pid FROM jobs WHERE session_id = ?', (session_id,)).fetchall()
+            dead_jobs = [(job_id,) for job_id, pid in rows if not _pid_alive(pid)]
+            if dead_jobs:
+                conn.executemany('DELETE FROM jobs WHERE id = ?', dead_jobs)
+        return len(rows) > len(dead_jobs)
+
+    @contextmanager
+    def evicting(self, session_id: str) -> Iterator[bool]:
+        """成果物を削除する間、セッションを削除中として登録（処理中のジョブがあれば登録せず False）
+        
+        処理中ジョブの確認と削除中の登録を同じ書き込みロックの中で行うため、確認後に始まったジョブは
+        削除が終わるまで track_job / track_job_async で待つ
+        """
+        
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT id, pid FROM jobs WHERE session_id = ?', (session_id,)).fetchall()
+            dead_jobs = [(job_id,) for job_id, pid in rows if not _pid_alive(pid)]
+            if dead_jobs:
+                conn.executemany('DELETE FROM jobs WHERE id = ?', dead_jobs)
+            claimed = len(rows) == len(dead_jobs)
+            if claimed:
+                conn.execute('INSERT OR REPLACE INTO evictions (session_id, pid, started_at) VALUES (?, ?, ?)',
+                             (session_id, os.getpid(), time.time()))
+        try:
+            yield claimed
+        finally:
+            if claimed:
+                with self._transaction() as conn:
+                    conn.execute('DELETE FROM evictions WHERE session_id = ?', (session_id,))
+    
+    def get_value(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """共有キー・バリューを取得"""
+        row = self._get_connection().execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def bump_counter(self, key: str) -> int:
+        """共有カウンターを1増やして新しい値を返す（設定バージョン管理用）"""
+        with self._transaction() as conn:
+            row = conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+            value = int(row[0]) + 1 if row else 1
+            conn.execute('INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)', (key, str(value)))
+        return value
+
+    def acquire_lease(self, name: str, holder: str, ttl_seconds: float) -> bool:
+        """名前付きリースを取得・更新（複数ワーカーのうち1つだけが定期処理を実行するため）"""
+
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT holder, expires_at FROM leases WHERE name = ?', (name,)).fetchone()
+            if row and row[0] != holder and row[1] > now:
+                return False
+            conn.execute(
+                'INSERT OR REPLACE INTO leases (name, holder, expires_at) VALUES (?, ?, ?)',
+                (name, holder, now + ttl_seconds)
+            )
+        return True
+
+    def request_slot(self, resource: str, max_concurrent: int, max_queue: int) -> Optional[int]:
+        """リソースの待ち行列に並ぶ（全ワーカー合計の実行中＋待機中が上限に達していればNone）
+
+        claim_slot で実行枠が割り当てられるまで待ち、終わったら release_slot で削除する
+        """
+
+        with self._transaction() as conn:
+            self._remove_dead_slots(conn, resource)
+            count = conn.execute(
+                'SELECT COUNT(*) FROM admission_slots WHERE resource = ?', (resource,)
+            ).fetchone()[0]
+            if count >= max_concurrent + max_queue:
+                return None
+            return conn.execute(
+                'INSERT INTO admission_slots (resource, pid, active, created_at) VALUES (?, ?, 0, ?)',
+                (resource, os.getpid(), time.time())
+            ).lastrowid
+
+    def claim_slot(self, slot_id: int, resource: str, max_concurrent: int) -> bool:
+        """空いた実行枠を先に並んだ順に割り当て（この枠に割り当てられたらTrue）"""
+
+        with self._transaction() as conn:
+            self._remove_dead_slots(conn, resource)
+            active = conn.execute(
+                'SELECT COUNT(*) FROM admission_slots WHERE resource = ? AND active = 1', (resource,)
+            ).fetchone()[0]
+            ahead = conn.execute(
+                'SELECT COUNT(*) FROM admission_slots WHERE resource = ? AND active = 0 AND id < ?',
+                (resource, slot_id)
+            ).fetchone()[0]
+            if active + ahead >= max_concurrent:
+                return False
+            return conn.execute(
+                'UPDATE admission_slots SET active = 1 WHERE id = ?', (slot_id,)
+            ).rowcount == 1
+
+    def release_slot(self, slot_id: int):
+        """実行枠・待ち行列から外す"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM admission_slots WHERE id = ?', (slot_id,))
+
+    def slot_counts(self, resource: str) -> Tuple[int, int]:
+        """リソースの全ワーカー合計の（実行中, 待機中）の数"""
+
+        active, total = self._get_connection().execute(
+            'SELECT COALESCE(SUM(active), 0), COUNT(*) FROM admission_slots WHERE resource = ?', (resource,)
+        ).fetchone()
+        return active, total - active
+
+    def _remove_dead_slots(self, conn: sqlite3.Connection, resource: str):
+        """異常終了したワーカーの実行枠・待ち行列を削除"""
+
+        rows = conn.execute(
+            'SELECT DISTINCT pid FROM admission_slots WHERE resource = ?', (resource,)
+        ).fetchall()
+        dead_pids = [(pid,) for pid, in rows if not _pid_alive(pid)]
+        if dead_pids:
+            conn.executemany('DELETE FROM admission_slots WHERE pid = ?', dead_pids)
+
+    def consume_token(self, client_id: str, rate_per_second: float, burst: int,
+                      max_clients: int = 10000) -> float:
+        """全ワーカー共有のトークンバケットからトークンを1つ消費（不足時は次のトークンまでの待ち秒数。0なら許可）"""
+
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT tokens, updated_at FROM rate_buckets WHERE client_id = ?', (client_id,)
+            ).fetchone()
+            if row is None:
+                # 保持するクライアントが多すぎる場合は満タンに戻ったバケットを整理
+                if conn.execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0] >= max_clients:
+                    conn.execute('DELETE FROM rate_buckets WHERE tokens + (? - updated_at) * ? >= ?',
+                                 (now, rate_per_second, burst))
+                tokens = float(burst)
+            else:
+                tokens = min(float(burst), row[0] + max(0.0, now - row[1]) * rate_per_second)
+
+            wait_seconds = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait_seconds = (1 - tokens) / rate_per_second if rate_per_second > 0 else 60.0
+            conn.execute('INSERT OR REPLACE INTO rate_buckets (client_id, tokens, updated_at) VALUES (?, ?, ?)',
+                         (client_id, tokens, now))
+        return wait_seconds
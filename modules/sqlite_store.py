@@ -0,0 +1,52 @@
+"""
+SQLiteストア共通モジュール
+キャッシュ・インデックス・セッションなどSQLiteに永続化するクラスで共有する、
+スレッド・プロセスごとの接続（WALモード）と書き込みロックを取ったトランザクション
+"""
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class SQLiteStore:
+    """SQLiteに永続化するクラスの基底（__init__で _open_database を呼ぶ）"""
+
+    db_path: Path
+
+    def _open_database(self, db_path: Path, schema: str):
+        """データベースを開き、スキーマを作成"""
+
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._get_connection().executescript(schema)
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """スレッド・プロセスごとの接続を取得（fork後の子プロセスでは接続し直す）"""
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """書き込みロックを取ったトランザクション（例外時はロールバック）"""
+
+        conn = self._get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
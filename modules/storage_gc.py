@@ -0,0 +1,173 @@
+"""
+ストレージ・ガベージコレクションモジュール
+セッション成果物（アップロード動画・一時ファイル・エクスポート）をTTLと容量上限で削除
+"""
+
+import os
+import time
+import shutil
+import asyncio
+import logging
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# セッションごとの成果物を保存するディレクトリ
+DEFAULT_ARTIFACT_ROOTS = ['uploads', 'temp_sessions', 'exports']
+
+
+class StorageGarbageCollector:
+    """セッション成果物のガベージコレクター（TTL・ディスク容量上限・LRU削除）"""
+
+    def __init__(self, config: Dict, roots: Optional[List[Path]] = None,
+                 is_in_flight: Optional[Callable[[str], bool]] = None,
+                 last_access: Optional[Callable[[str], Optional[float]]] = None,
+                 on_evict: Optional[Callable[[str], None]] = None,
+                 should_run: Optional[Callable[[], bool]] = None,
+                 evicting: Optional[Callable[[str], ContextManager[bool]]] = None):
+        self.config = config
+        self.enabled = config.get('auto_cleanup', True)
+        self.ttl_seconds = float(config.get('session_ttl_hours', 24)) * 3600
+        self.max_bytes = int(float(config.get('max_storage_gb', 20)) * 1024 ** 3)
+        self.interval_seconds = float(config.get('cleanup_interval_minutes', 10)) * 60
+        self.roots = [Path(root) for root in (roots or DEFAULT_ARTIFACT_ROOTS)]
+
+        # 処理中ジョブの判定・最終アクセス時刻・削除通知（web_appのセッション管理から注入）
+        self.is_in_flight = is_in_flight or (lambda session_id: False)
+        self.last_access = last_access or (lambda session_id: None)
+        self.on_evict = on_evict
+
+        # 削除中の登録（処理中ジョブの確認と削除を、ジョブの開始と排他にする。SessionStore.evicting）
+        self.evicting = evicting or self._check_in_flight
+
+        # 実行可否の判定（マルチワーカー時に1ワーカーだけが実行するため）
+        self.should_run = should_run or (lambda: True)
+
+    def collect(self, now: Optional[float] = None) -> Dict:
+        """1回分のガベージコレクションを実行"""
+
+        now = now if now is not None else time.time()
+        entries = self._scan()
+
+        deleted = []
+        freed_bytes = 0
+
+        # 1. TTL切れのセッションを削除
+        for session_id, entry in list(entries.items()):
+            if now - entry['last_used'] > self.ttl_seconds:
+                if self._evict(session_id, entry):
+                    deleted.append(session_id)
+                    freed_bytes += entry['size']
+                    del entries[session_id]
+
+        # 2. 容量上限を超えていれば最終利用が古い順（LRU）に削除
+        total_bytes = sum(entry['size'] for entry in entries.values())
+        if total_bytes > self.max_bytes:
+            for session_id, entry in sorted(entries.items(), key=lambda x: x[1]['last_used']):
+                if total_bytes <= self.max_bytes:
+                    break
+                if self._evict(session_id, entry):
+                    deleted.append(session_id)
+                    freed_bytes += entry['size']
+                    total_bytes -= entry['size']
+
+        if deleted:
+            logger.info(f"🧹 ストレージ整理: {len(deleted)}セッション削除, "
+                        f"{freed_bytes / 1024 / 1024:.1f} MB解放")
+
+        return {
+            'deleted_sessions': deleted,
+            'freed_bytes': freed_bytes,
+            'total_bytes': total_bytes
+        }
+
+    async def run_forever(self):
+        """一定間隔でガベージコレクションを実行（バックグラウンドタスク用）"""
+
+        if not self.enabled:
+            logger.info("processing.auto_cleanup が無効のためストレージ整理を行いません")
+            return
+
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                if await loop.run_in_executor(None, self.should_run):
+                    await loop.run_in_executor(None, self.collect)
+            except Exception as e:
+                logger.error(f"ストレージ整理エラー: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def _scan(self) -> Dict[str, Dict]:
+        """各ルート配下のセッションディレクトリを集計"""
+
+        entries = {}
+        for root in self.roots:
+            if not root.exists():
+                continue
+            with os.scandir(root) as it:
+                for entry in it:
+                    if not entry.is_dir(follow_symlinks=False):
+                        continue
+                    size, mtime = self._measure(entry.path)
+                    info = entries.setdefault(entry.name, {'paths': [], 'size': 0, 'last_used': 0.0})
+                    info['paths'].append(Path(entry.path))
+                    info['size'] += size
+                    info['last_used'] = max(info['last_used'], mtime)
+
+        # セッションの最終アクセス時刻も考慮（読み取りのみのアクセスを反映）
+        for session_id, info in entries.items():
+            accessed = self.last_access(session_id)
+            if accessed:
+                info['last_used'] = max(info['last_used'], accessed)
+
+        return entries
+
+    def _measure(self, path: str):
+        """ディレクトリの合計サイズと最終更新時刻を取得"""
+
+        total_size = 0
+        latest_mtime = os.stat(path, follow_symlinks=False).st_mtime
+        stack = [path]
+
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            stat = entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+                        latest_mtime = max(latest_mtime, stat.st_mtime)
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        else:
+                            total_size += stat.st_size
+            except OSError:
+                continue
+
+        return total_size, latest_mtime
+
+    def _evict(self, session_id: str, entry: Dict) -> bool:
+        """セッションの成果物を削除（処理中のジョブは削除しない）"""
+
+        # スキャン後にジョブが開始された場合に備え、削除直前に再確認（削除中に始まるジョブは削除の完了を待つ）
+        with self.evicting(session_id) as claimed:
+            if not claimed:
+                logger.debug(f"処理中のためスキップ: {session_id}")
+                return False
+
+            for path in entry['paths']:
+                shutil.rmtree(path, ignore_errors=True)
+
+            if self.on_evict:
+                self.on_evict(session_id)
+
+        return True
+
+    @contextmanager
+    def _check_in_flight(self, session_id: str):
+        """削除中の登録がない場合の判定（処理中ジョブの確認のみ）"""
+        yield not self.is_in_flight(session_id)
@@ -0,0 +1,237 @@
+"""
+抽出型要約モジュール
+文ごとの語ベクトル（TF-IDFの疎行列）から文の重要度をTextRank（文数が多い場合は重心類似度）で一括計算し、
+文字数予算内で重複の少ない重要文を選ぶ
+"""
+
+import logging
+from typing import AbstractSet, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# TextRankで文間類似度行列（文数×文数）を作る上限。これを超える場合は重心類似度で採点
+MAX_TEXTRANK_SENTENCES = 2000
+
+# 要約に使う文の最小文字数（相づち・フィラーだけの文を除外）
+MIN_SENTENCE_LENGTH = 10
+
+
+def _expand_ranges(starts: np.ndarray, lengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """範囲（開始位置, 長さ）の列を連結した（範囲の番号, 位置）の組"""
+
+    total = int(lengths.sum())
+    offsets = np.cumsum(lengths) - lengths
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    positions = np.repeat(starts - offsets, lengths) + np.arange(total)
+    return owners, positions
+
+
+class SparseTermMatrix:
+    """単位（文・セグメント）×語の疎行列（CSR: 行ごとの列番号と値）
+
+    語彙×単位数の密行列を作らないため、長い文字起こしでもメモリは出現数（非ゼロ要素数）に比例する
+    """
+
+    def __init__(self, data: np.ndarray, indices: np.ndarray, indptr: np.ndarray, num_columns: int):
+        self.data = data
+        self.indices = indices
+        self.indptr = indptr
+        self.shape = (len(indptr) - 1, num_columns)
+
+    @classmethod
+    def empty(cls, num_rows: int) -> 'SparseTermMatrix':
+        return cls(np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64),
+                   np.zeros(num_rows + 1, dtype=np.int64), 0)
+
+    def row_ids(self) -> np.ndarray:
+        """非ゼロ要素ごとの行番号"""
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def scale_columns(self, weights: np.ndarray):
+        """列ごとに重みを掛ける（IDF）"""
+        self.data *= weights[self.indices]
+
+    def row_norms(self) -> np.ndarray:
+        return np.sqrt(np.bincount(self.row_ids(), weights=self.data * self.data,
+                                   minlength=self.shape[0])).astype(np.float32)
+
+    def normalize_rows(self):
+        """行をL2正規化（全要素0の行はそのまま）"""
+        norms = np.repeat(self.row_norms(), np.diff(self.indptr))
+        np.divide(self.data, norms, out=self.data, where=norms > 0)
+
+    def column_sums(self) -> np.ndarray:
+        return np.bincount(self.indices, weights=self.data, minlength=self.shape[1]).astype(np.float32)
+
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        """行列×ベクトル"""
+        return np.bincount(self.row_ids(), weights=self.data * vector[self.indices],
+                           minlength=self.shape[0]).astype(np.float32)
+
+    def row_dot(self, i: int, j: int) -> float:
+        """2行の内積"""
+        left = slice(self.indptr[i], self.indptr[i + 1])
+        right = slice(self.indptr[j], self.indptr[j + 1])
+        _, left_positions, right_positions = np.intersect1d(
+            self.indices[left], self.indices[right], assume_unique=True, return_indices=True
+        )
+        return float(self.data[left][left_positions] @ self.data[right][right_positions])
+
+    def gram(self) -> np.ndarray:
+        """行どうしの内積（行数×行数の密行列。語ごとの転置リストで共通語のある組だけ計算）"""
+
+        num_rows = self.shape[0]
+        order = np.argsort(self.indices, kind='stable')
+        column_rows = self.row_ids()[order]
+        column_data = self.data[order]
+        column_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.indices, minlength=self.shape[1]))))
+
+        # 語ごとの転置リストを連結して（行, 行）の組と積を作る
+        lengths = column_ptr[self.indices + 1] - column_ptr[self.indices]
+        owners, positions = _expand_ranges(column_ptr[self.indices], lengths)
+        pairs = self.row_ids()[owners] * num_rows + column_rows[positions]
+        products = self.data[owners] * column_data[positions]
+        return np.bincount(pairs, weights=products, minlength=num_rows * num_rows) \
+            .astype(np.float32).reshape(num_rows, num_rows)
+
+    def range_sums(self, starts: np.ndarray, stops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """行 starts[i]〜stops[i]-1 の和の疎ベクトル（キー i×列数＋列 の昇順と値）"""
+
+        owners, rows = _expand_ranges(starts, stops - starts)
+        lengths = self.indptr[rows + 1] - self.indptr[rows]
+        entries, positions = _expand_ranges(self.indptr[rows], lengths)
+        keys = owners[entries] * self.shape[1] + self.indices[positions]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        return unique_keys, np.bincount(inverse, weights=self.data[positions], minlength=len(unique_keys))
+
+
+def term_count_matrix(term_lists: Sequence[Sequence[str]], stopwords: AbstractSet[str] = frozenset(),
+                      min_df: int = 2) -> Tuple[SparseTermMatrix, np.ndarray]:
+    """単位（文・セグメント）×語の出現回数の疎行列と、各語の出現単位数
+
+    min_df未満の単位にしか現れない語は単位間の類似度に寄与しないため、列から除外して行列を小さく保つ
+    """
+
+    num_units = len(term_lists)
+
+    # 語ごとの出現単位数（単位を文書とみなしたDF）
+    unit_frequency: Dict[str, int] = {}
+    for terms in term_lists:
+        for term in set(terms):
+            if term not in stopwords:
+                unit_frequency[term] = unit_frequency.get(term, 0) + 1
+
+    vocabulary = {term: i for i, term in enumerate(t for t, df in unit_frequency.items() if df >= min_df)}
+    if num_units == 0 or not vocabulary:
+        return SparseTermMatrix.empty(num_units), np.zeros(0, dtype=np.float32)
+
+    # 座標形式（行・列）で出現を集め、同じ（行, 列）を数えてCSRにする
+    rows = []
+    cols = []
+    for row, terms in enumerate(term_lists):
+        for term in terms:
+            col = vocabulary.get(term)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+
+    keys, counts = np.unique(np.asarray(rows, dtype=np.int64) * len(vocabulary) + np.asarray(cols, dtype=np.int64),
+                             return_counts=True)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(keys // len(vocabulary), minlength=num_units))))
+    matrix = SparseTermMatrix(counts.astype(np.float32), keys % len(vocabulary), indptr, len(vocabulary))
+
+    df = np.fromiter((unit_frequency[t] for t in vocabulary), dtype=np.float32, count=len(vocabulary))
+    return matrix, df
+
+
+def build_sentence_matrix(sentence_terms: Sequence[Sequence[str]],
+                          stopwords: AbstractSet[str] = frozenset()) -> SparseTermMatrix:
+    """文×語のTF-IDF疎行列（行はL2正規化）"""
+
+    matrix, df = term_count_matrix(sentence_terms, stopwords)
+    if matrix.shape[1] == 0:
+        return matrix
+
+    matrix.scale_columns(np.log(len(sentence_terms) / df) + 1.0)
+    matrix.normalize_rows()
+    return matrix
+
+
+def textrank_scores(matrix: SparseTermMatrix, damping: float = 0.85,
+                    max_iterations: int = 50, tolerance: float = 1e-6) -> np.ndarray:
+    """文間のコサイン類似度グラフ上のTextRank（べき乗法）"""
+
+    num_sentences = matrix.shape[0]
+    similarity = matrix.gram()
+    np.fill_diagonal(similarity, 0.0)
+
+    # 行和で正規化した遷移行列（孤立した文は一様に遷移）
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / num_sentences),
+                           where=out_weight > 0)
+
+    scores = np.full(num_sentences, 1.0 / num_sentences, dtype=np.float32)
+    teleport = (1.0 - damping) / num_sentences
+    for _ in range(max_iterations):
+        updated = teleport + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < tolerance:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+
+def centroid_scores(matrix: SparseTermMatrix) -> np.ndarray:
+    """文書全体の重心ベクトルとのコサイン類似度（非ゼロ要素数に対して線形）"""
+
+    centroid = matrix.column_sums()
+    norm = np.linalg.norm(centroid)
+    if norm == 0:
+        return np.zeros(matrix.shape[0], dtype=np.float32)
+    return matrix.dot(centroid / norm)
+
+
+def score_sentences(matrix: SparseTermMatrix, method: str = 'textrank') -> np.ndarray:
+    """文の重要度（textrank / centroid）"""
+
+    if matrix.shape[0] == 0 or matrix.shape[1] == 0:
+        return np.zeros(matrix.shape[0], dtype=np.float32)
+    if method == 'textrank' and matrix.shape[0] <= MAX_TEXTRANK_SENTENCES:
+        return textrank_scores(matrix)
+    return centroid_scores(matrix)
+
+
+def select_sentences(sentences: Sequence[str], scores: np.ndarray, matrix: SparseTermMatrix,
+                     max_length: int, max_sentences: int = 3,
+                     redundancy_threshold: float = 0.7) -> List[int]:
+    """文字数予算内で重要度順に文を選ぶ（既に選んだ文と似すぎる文は除外）。戻り値は元の文順"""
+
+    lengths = np.fromiter((len(s) for s in sentences), dtype=np.int64, count=len(sentences))
+    candidates = np.flatnonzero((lengths >= MIN_SENTENCE_LENGTH) & (lengths + 1 <= max_length))
+    order = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+    selected: List[int] = []
+    used_length = 0
+    for index in order:
+        if len(selected) >= max_sentences:
+            break
+        # 句点を含めた長さで予算を管理
+        length = int(lengths[index]) + 1
+        if used_length + length > max_length:
+            continue
+        if selected and matrix.shape[1] and max(matrix.row_dot(i, index) for i in selected) >= redundancy_threshold:
+            continue
+        selected.append(int(index))
+        used_length += length
+
+    return sorted(selected)
+
+
+def summarize(sentences: Sequence[str], matrix: SparseTermMatrix, scores: np.ndarray,
+              max_length: int, max_sentences: int = 3, redundancy_threshold: float = 0.7) -> Tuple[str, List[int]]:
+    """選んだ文を元の順序でつないだ要約と、その文番号"""
+
+    selected = select_sentences(sentences, scores, matrix, max_length, max_sentences, redundancy_threshold)
+    return ''.join(f"{sentences[i]}。" for i in selected), selected
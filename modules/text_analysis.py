@@ -0,0 +1,248 @@
+"""
+テキスト解析モジュール
+文字起こしテキストを一度だけ解析し、文分割・トークン・出現頻度・キーワード順位を各生成処理で共有
+"""
+
+import logging
+from bisect import bisect_right
+from collections import Counter
+from functools import cached_property
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .text_patterns import (
+    SENTENCE_DELIMITER_PATTERN, TOKEN_PATTERN, KATAKANA_TERM_PATTERN,
+    KANJI_COMPOUND_PATTERN, normalize_text
+)
+from .keyword_index import transcript_doc_id
+from .tokenizer import noun_terms
+from .summarizer import SparseTermMatrix, build_sentence_matrix, score_sentences, summarize
+from .topic_segmentation import segment_topics
+
+if TYPE_CHECKING:
+    from .keyword_index import KeywordIndex
+    from .tokenizer import JapaneseTokenizer, Morpheme
+
+logger = logging.getLogger(__name__)
+
+# キーワード抽出用ストップワード
+STOPWORDS = {
+    'の', 'に', 'は', 'を', 'た', 'が', 'で', 'て', 'と', 'し', 'れ', 'さ',
+    'ある', 'いる', 'も', 'する', 'から', 'な', 'こと', 'として', 'い',
+    'や', 'など', 'なっ', 'ない', 'この', 'ため', 'その', 'あっ', 'よう',
+    'また', 'もの', 'という', 'あり', 'まで', 'られ', 'なる', 'へ', 'か',
+    'だ', 'これ', 'によって', 'により', 'おり', 'より', 'による', 'ず',
+    'なり', 'られる', 'において', 'ば', 'なかっ', 'なく', 'しかし',
+    'について', 'だけ', 'だっ', 'その他', 'それ', 'ところ'
+}
+
+# SEOキーワードから除外する一般的すぎる単語
+SEO_STOPWORDS = {'こと', 'もの', 'これ', 'それ', 'ところ', 'ため'}
+
+
+class TextAnalysis:
+    """文字起こしテキストの共有解析結果（各値は初回参照時に一度だけ計算）"""
+
+    # フレーズ辞書の集計済み出現回数（map-reduce解析でブロックごとに集計した場合のみ）
+    phrase_counts: Optional[Counter] = None
+
+    def __init__(self, text: str, keyword_index: Optional['KeywordIndex'] = None,
+                 tokenizer: Optional['JapaneseTokenizer'] = None, summary_method: str = 'textrank',
+                 segments: Optional[List[Dict]] = None, segmentation_config: Optional[Dict] = None):
+        self.text = text
+        # 文書頻度インデックス（十分な文書があればキーワードをTF-IDFで順位付け）
+        self.keyword_index = keyword_index
+        # 形態素解析器（なければ正規表現でトークンを抽出）
+        self.tokenizer = tokenizer
+        # 要約の文採点方式（textrank / centroid）
+        self.summary_method = summary_method
+        # タイムスタンプ付きセグメント（トピック分割に使用）
+        self.segments = segments or []
+        self.segmentation_config = segmentation_config or {}
+
+    @cached_property
+    def clean_text(self) -> str:
+        """正規化済みテキスト"""
+        return normalize_text(self.text)
+
+    @cached_property
+    def sentence_spans(self) -> List[Tuple[int, int]]:
+        """正規化済みテキスト内の各文の範囲（前後の空白を除き、空文は除外）"""
+        text = self.clean_text
+        boundaries = [(m.start(), m.end()) for m in SENTENCE_DELIMITER_PATTERN.finditer(text)]
+        spans = []
+        start = 0
+        for delimiter_start, delimiter_end in boundaries + [(len(text), len(text))]:
+            end = delimiter_start
+            while start < end and text[start].isspace():
+                start += 1
+            while end > start and text[end - 1].isspace():
+                end -= 1
+            if start < end:
+                spans.append((start, end))
+            start = delimiter_end
+        return spans
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        """文のリスト（空文は除外）"""
+        return [self.clean_text[start:end] for start, end in self.sentence_spans]
+
+    @cached_property
+    def morphemes(self) -> List['Morpheme']:
+        """形態素列（形態素解析器がない場合は空）"""
+        if self.tokenizer is None:
+            return []
+        return self.tokenizer.tokenize(self.clean_text)
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """2文字以上のトークン列（形態素解析器があれば名詞・複合名詞）"""
+        if self.tokenizer is not None:
+            return noun_terms(self.morphemes)
+        return TOKEN_PATTERN.findall(self.clean_text)
+
+    def _group_morphemes(self, spans: List[Tuple[int, int]]) -> List[List['Morpheme']]:
+        """範囲（昇順・重なりなし）ごとに、開始位置がその範囲に入る形態素"""
+        starts = [start for start, _ in spans]
+        grouped = [[] for _ in starts]
+        offset = 0
+        for morpheme in self.morphemes:
+            index = bisect_right(starts, offset) - 1
+            if index >= 0 and offset < spans[index][1]:
+                grouped[index].append(morpheme)
+            offset += len(morpheme.surface)
+        return grouped
+
+    @cached_property
+    def sentence_terms(self) -> List[List[str]]:
+        """文ごとのトークン列（形態素解析は全文で1回だけ行い、文の範囲で振り分ける）"""
+        if self.tokenizer is None:
+            return [TOKEN_PATTERN.findall(sentence) for sentence in self.sentences]
+        return [noun_terms(morphemes) for morphemes in self._group_morphemes(self.sentence_spans)]
+
+    @cached_property
+    def sentence_matrix(self) -> SparseTermMatrix:
+        """文×語のTF-IDF疎行列（要約の採点・重複判定に使用）"""
+        return build_sentence_matrix(self.sentence_terms, STOPWORDS)
+
+    @cached_property
+    def sentence_scores(self) -> np.ndarray:
+        """文の重要度（全文を一括で採点し、要約の長さが違っても再利用）"""
+        return score_sentences(self.sentence_matrix, self.summary_method)
+
+    @cached_property
+    def segment_spans(self) -> List[Optional[Tuple[int, int]]]:
+        """正規化済みテキスト内の各セグメントの範囲（先頭から順に探し、見つからなければNone）"""
+        spans = []
+        position = 0
+        for segment in self.segments:
+            text = normalize_text(segment['text'])
+            start = self.clean_text.find(text, position)
+            if start < 0:
+                spans.append(None)
+                continue
+            spans.append((start, start + len(text)))
+            position = start + len(text)
+        return spans
+
+    @cached_property
+    def segment_terms(self) -> List[List[str]]:
+        """タイムスタンプ付きセグメントごとのトークン列
+
+        全文の形態素をセグメントの範囲で振り分ける（全文に見つからないセグメントのみ個別に解析）
+        """
+        if self.tokenizer is None:
+            return [TOKEN_PATTERN.findall(segment['text']) for segment in self.segments]
+
+        grouped = iter(self._group_morphemes([span for span in self.segment_spans if span is not None]))
+        return [
+            noun_terms(next(grouped)) if span is not None else noun_terms(self.tokenizer.tokenize(segment['text']))
+            for segment, span in zip(self.segments, self.segment_spans)
+        ]
+
+    @cached_property
+    def topic_blocks(self) -> List[Dict]:
+        """時間範囲付きのトピックブロック（セグメントがなければ空）"""
+        return segment_topics(self.segments, self.segment_terms, self.segmentation_config, STOPWORDS)
+
+    @property
+    def content_blocks(self) -> List[Dict]:
+        """セクション分けに使うブロック"""
+        return self.topic_blocks
+
+    @cached_property
+    def term_frequencies(self) -> Counter:
+        """トークンの出現頻度（出現順を保持）"""
+        return Counter(self.tokens)
+
+    @cached_property
+    def seo_term_frequencies(self) -> Counter:
+        """カタカナ語・漢字複合語の出現頻度（カタカナ語を先に数える）"""
+        # 同頻度ではカタカナ語（技術用語が多い）を優先するため、カタカナ語を先に登録
+        if self.tokenizer is not None:
+            frequencies = Counter(t for t in self.tokens if KATAKANA_TERM_PATTERN.fullmatch(t))
+            frequencies.update(t for t in self.tokens if KANJI_COMPOUND_PATTERN.fullmatch(t))
+            return frequencies
+        frequencies = Counter(KATAKANA_TERM_PATTERN.findall(self.text))
+        frequencies.update(KANJI_COMPOUND_PATTERN.findall(self.text))
+        return frequencies
+
+    @cached_property
+    def index_terms(self) -> Set[str]:
+        """文書頻度インデックスに登録する語"""
+        return set(self.term_frequencies) | set(self.seo_term_frequencies)
+
+    @cached_property
+    def keyword_ranking(self) -> List[str]:
+        """ストップワードを除いたキーワード順位（TF-IDF順、インデックスがなければ頻度順。同点は出現順）"""
+        candidates = {word: count for word, count in self.term_frequencies.items() if word not in STOPWORDS}
+        return self._rank(candidates)
+
+    @cached_property
+    def seo_term_ranking(self) -> List[str]:
+        """カタカナ語・漢字複合語の順位（SEOキーワード候補）"""
+        return self._rank(self.seo_term_frequencies)
+
+    @cached_property
+    def doc_id(self) -> str:
+        """文書頻度インデックスでの文書ID"""
+        return transcript_doc_id(self.text)
+
+    def _rank(self, frequencies: Dict[str, int]) -> List[str]:
+        """コーパスのIDFが使えればTF-IDF順、使えなければ文書内頻度順
+
+        この文字起こしが登録済みでもその分は除いて採点する（再生成しても同じ順位になるように）
+        """
+        if self.keyword_index is not None and self.keyword_index.is_ready(self.doc_id):
+            return self.keyword_index.rank(frequencies, self.doc_id)
+        return [word for word, _ in sorted(frequencies.items(), key=lambda x: x[1], reverse=True)]
+
+    def keywords(self, num: int = 5) -> List[str]:
+        """上位N個のキーワード"""
+        return self.keyword_ranking[:num]
+
+    def seo_keywords(self, num: int = 7) -> List[str]:
+        """SEOキーワード（上位10候補から一般語を除外）"""
+        return [kw for kw in self.seo_term_ranking[:10] if kw not in SEO_STOPWORDS][:num]
+
+    def summary(self, max_length: int = 200, max_sentences: int = 3, redundancy_threshold: float = 0.7) -> str:
+        """文字数予算内の抽出型要約（重要文を元の順序で連結。選べる文がなければ空文字）"""
+        text, _ = summarize(self.sentences, self.sentence_matrix, self.sentence_scores,
+                            max_length, max_sentences, redundancy_threshold)
+        return text
+
+    @property
+    def term_scheme(self) -> str:
+        """語の抽出方式（文書頻度インデックスの互換性判定に使用）"""
+        return self.tokenizer.name if self.tokenizer is not None else 'regex'
+
+    def stats(self) -> Dict:
+        """解析結果の概要"""
+        return {
+            'characters': len(self.clean_text),
+            'sentences': len(self.sentences),
+            'tokens': len(self.tokens),
+            'unique_terms': len(self.term_frequencies)
+        }
@@ -0,0 +1,110 @@
+"""
+テキストパターンモジュール
+各生成・出力モジュールで共有するコンパイル済み正規表現と、複数の置換を1回の走査にまとめた整形処理
+"""
+
+import re
+
+# 空白・句読点
+WHITESPACE_PATTERN = re.compile(r'\s+')
+SPACE_BEFORE_PUNCTUATION_PATTERN = re.compile(r'\s+([。、！？])')
+SPACE_AFTER_SENTENCE_END_PATTERN = re.compile(r'([。！？])\s*')
+PUNCTUATION_TRIM_PATTERN = re.compile(r'\s*([。、])\s*')
+
+# 文分割
+SENTENCE_DELIMITER_PATTERN = re.compile(r'[。！？]+')
+LINE_SENTENCE_DELIMITER_PATTERN = re.compile(r'[。！？\n]+')
+LINE_SENTENCE_DELIMITER_CAPTURE_PATTERN = re.compile(r'([。！？\n]+)')
+
+# トークン・用語
+TOKEN_PATTERN = re.compile(r'[一-龥ぁ-んァ-ンー\w]{2,}')
+KATAKANA_TERM_PATTERN = re.compile(r'[ァ-ヴー]{3,}')
+KANJI_COMPOUND_PATTERN = re.compile(r'[一-龥]{2,4}')
+
+# スラッグ・アンカー・ファイル名
+SLUG_INVALID_CHARS_PATTERN = re.compile(r'[^\w\s-]')
+SLUG_SEPARATOR_PATTERN = re.compile(r'[-\s]+')
+NON_ASCII_PATTERN = re.compile(r'[^\x00-\x7F]')
+ASCII_SLUG_INVALID_CHARS_PATTERN = re.compile(r'[^a-zA-Z0-9\s-]')
+HYPHEN_RUN_PATTERN = re.compile(r'-+')
+FILENAME_INVALID_CHARS_PATTERN = re.compile(r'[<>:"/\\|?*]')
+UNDERSCORE_RUN_PATTERN = re.compile(r'_+')
+
+# 記事ファイル
+FRONT_MATTER_PATTERN = re.compile(r'^---\n.*?\n---\n?', re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Markdown
+BOLD_PATTERN = re.compile(r'\*\*([^*]+)\*\*')
+ITALIC_PATTERN = re.compile(r'\*([^*]+)\*')
+ORDERED_LIST_ITEM_PATTERN = re.compile(r'^\d+\.\s')
+ORDERED_LIST_PREFIX_PATTERN = re.compile(r'^\d+\.\s+')
+
+# 絵文字（前後の空白調整用）
+EMOJI_CHARS = r'\u2600-\u27BF\U0001F300-\U0001F9FF'
+EMOJI_PATTERN = re.compile(rf'[{EMOJI_CHARS}]')
+EMOJI_AFTER_TEXT_PATTERN = re.compile(rf'([^\s])([{EMOJI_CHARS}])')
+EMOJI_BEFORE_TEXT_PATTERN = re.compile(rf'([{EMOJI_CHARS}])([^\s])')
+
+# 書き言葉変換後の整形
+WRITTEN_STYLE_FILLER_PATTERN = re.compile(r'(です|ます)、|あの、|えっと、|まあ、|ちょっと')
+WRITTEN_STYLE_REDUNDANCY_PATTERN = re.compile(r'(です|ます)。\1。|のですがも|というも')
+WRITTEN_STYLE_SENTENCE_END_PATTERN = re.compile(r'(です|ます)$')
+
+_REDUNDANCY_REPLACEMENTS = {
+    'のですがも': 'のですが',
+    'というも': 'という方も',
+}
+
+
+def _replace_filler(match: re.Match) -> str:
+    # 「です、」「ます、」は句点に、フィラーは削除
+    ending = match.group(1)
+    return f'{ending}。' if ending else ''
+
+
+def _replace_redundancy(match: re.Match) -> str:
+    # 「です。です。」は1つに、定型の言い間違いは補正
+    ending = match.group(1)
+    return f'{ending}。' if ending else _REDUNDANCY_REPLACEMENTS[match.group(0)]
+
+
+def normalize_text(text: str) -> str:
+    """余分な空白と句読点前の空白を除去"""
+    text = WHITESPACE_PATTERN.sub(' ', text)
+    text = SPACE_BEFORE_PUNCTUATION_PATTERN.sub(r'\1', text)
+    return text.strip()
+
+
+def normalize_sentence_spacing(text: str) -> str:
+    """空白を詰め、句読点の前の空白を除去し、句点の後に空白1つを置く"""
+    text = WHITESPACE_PATTERN.sub(' ', text)
+    text = SPACE_BEFORE_PUNCTUATION_PATTERN.sub(r'\1', text)
+    text = SPACE_AFTER_SENTENCE_END_PATTERN.sub(r'\1 ', text)
+    return text.strip()
+
+
+def tidy_written_style(text: str) -> str:
+    """書き言葉変換後の整形（読点→句点・フィラー削除・重複文末・文末句点）"""
+    text = WRITTEN_STYLE_FILLER_PATTERN.sub(_replace_filler, text)
+    text = WRITTEN_STYLE_REDUNDANCY_PATTERN.sub(_replace_redundancy, text)
+    text = WRITTEN_STYLE_SENTENCE_END_PATTERN.sub(r'\1。', text)
+    return text.replace('。。', '。').strip()
+
+
+def format_inline_markdown(text: str, space_emoji: bool = False) -> str:
+    """太字・強調をHTMLに変換（必要に応じて絵文字の前後に空白を追加）"""
+    if '*' in text:
+        text = BOLD_PATTERN.sub(r'<strong>\1</strong>', text)
+        text = ITALIC_PATTERN.sub(r'<em>\1</em>', text)
+    # 絵文字を含む場合のみ前後の空白を調整（大半の段落は1回の検索で済む）
+    if space_emoji and EMOJI_PATTERN.search(text):
+        text = EMOJI_AFTER_TEXT_PATTERN.sub(r'\1 \2', text)
+        text = EMOJI_BEFORE_TEXT_PATTERN.sub(r'\1 \2', text)
+    return text
+
+
+def slugify(title: str) -> str:
+    """記号を除去し、空白・ハイフンの連続を1つのハイフンに"""
+    slug = SLUG_INVALID_CHARS_PATTERN.sub('', title.lower())
+    return SLUG_SEPARATOR_PATTERN.sub('-', slug)
@@ -0,0 +1,117 @@
+"""
+日本語トークナイザーモジュール
+形態素解析器（janome）で名詞・複合名詞を抽出。辞書はプロセスごとに初回使用時に一度だけ読み込む
+"""
+
+import os
+import logging
+import threading
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# キーワードとして扱わない名詞の細分類
+EXCLUDED_NOUN_TYPES = {'非自立', '代名詞', '数', '接尾', '副詞可能', '特殊'}
+
+
+class Morpheme(NamedTuple):
+    """形態素"""
+    surface: str
+    base_form: str
+    pos: str        # 品詞
+    pos_detail: str  # 品詞細分類1
+
+
+class JapaneseTokenizer:
+    """janomeによる形態素解析（スレッド間で1つの辞書を共有）"""
+
+    # 語彙の作り方の識別子（文書頻度インデックスの互換性判定に使用）
+    name = 'janome'
+
+    def __init__(self):
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _get_tokenizer(self):
+        """辞書を読み込んだトークナイザー（初回のみ構築）"""
+        if self._tokenizer is None:
+            from janome.tokenizer import Tokenizer
+            logger.info("形態素解析辞書を読み込み中...")
+            self._tokenizer = Tokenizer()
+        return self._tokenizer
+
+    def tokenize(self, text: str) -> List[Morpheme]:
+        """テキストを形態素列に分割"""
+
+        with self._lock:
+            tokenizer = self._get_tokenizer()
+            morphemes = []
+            for token in tokenizer.tokenize(text):
+                pos = token.part_of_speech.split(',')
+                base_form = token.base_form if token.base_form != '*' else token.surface
+                morphemes.append(Morpheme(token.surface, base_form, pos[0], pos[1] if len(pos) > 1 else '*'))
+            return morphemes
+
+
+def noun_terms(morphemes: List[Morpheme], min_length: int = 2) -> List[str]:
+    """名詞と連続する名詞をつないだ複合名詞を出現順に抽出（例: 自動＋生成→自動生成）"""
+
+    terms = []
+    compound = []
+
+    def flush():
+        if compound:
+            term = ''.join(compound)
+            if len(term) >= min_length:
+                terms.append(term)
+            compound.clear()
+
+    for morpheme in morphemes:
+        if morpheme.pos == '名詞' and morpheme.pos_detail not in EXCLUDED_NOUN_TYPES:
+            compound.append(morpheme.surface)
+        elif morpheme.pos == '名詞' and morpheme.pos_detail == '接尾' and compound:
+            # 接尾辞（〜化・〜性など）は直前の名詞につなぐ
+            compound.append(morpheme.surface)
+        else:
+            flush()
+    flush()
+
+    return terms
+
+
+_shared_tokenizer = None
+_shared_lock = threading.Lock()
+
+
+def _reset_locks_after_fork():
+    """fork直後の子プロセスでロックを作り直す（fork時に他スレッドが保持していたロックで止まらないよう）
+
+    読み込み済みの辞書はそのまま引き継ぐため、ワーカープロセスで辞書を読み直す必要はない
+    """
+    global _shared_lock
+    _shared_lock = threading.Lock()
+    if _shared_tokenizer is not None:
+        _shared_tokenizer._lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def get_tokenizer(engine: str = 'janome') -> Optional[JapaneseTokenizer]:
+    """プロセス共有のトークナイザーを取得（未導入・無効ならNoneで正規表現抽出にフォールバック）"""
+
+    global _shared_tokenizer
+
+    if engine != 'janome':
+        return None
+
+    with _shared_lock:
+        if _shared_tokenizer is None:
+            try:
+                import janome  # noqa: F401
+            except ImportError:
+                logger.warning("janomeが未インストールのため正規表現でトークンを抽出します（pip install janome）")
+                return None
+            _shared_tokenizer = JapaneseTokenizer()
+        return _shared_tokenizer
@@ -0,0 +1,198 @@
+"""
+トピック分割モジュール
+文字起こしのタイムスタンプ付きセグメントを、語の結束度（TextTiling方式の窓比較）と発話の間から
+トピックブロックに分割し、ブログのセクションとYouTubeチャプターで共有する
+"""
+
+import logging
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import AbstractSet, Dict, List, Sequence
+
+import numpy as np
+
+from .summarizer import SparseTermMatrix, term_count_matrix
+
+logger = logging.getLogger(__name__)
+
+# デフォルト設定
+DEFAULT_SEGMENTATION = {
+    'window': 4,                  # 境界の前後で比較するセグメント数
+    'min_block_seconds': 60,      # ブロックの最短長（秒）
+    'pause_weight': 0.5,          # 発話の間（ポーズ）の重み
+    'pause_scale_seconds': 2.0,   # この秒数以上の間を最大の手がかりとみなす
+    'max_keywords': 3,            # ブロックごとのキーワード数
+}
+
+
+def format_timestamp(seconds: float) -> str:
+    """秒をYouTubeチャプター形式（M:SS / H:MM:SS）に変換"""
+    total = int(seconds)
+    hours, remainder = divmod(total, 3600)
+    minutes, secs = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def join_segment_texts(segments: Sequence[Dict]) -> str:
+    """セグメントの本文を連結（句読点で終わらないセグメントには句点を補う）"""
+    parts = []
+    for segment in segments:
+        text = segment['text'].strip()
+        if text:
+            parts.append(text if text[-1] in '。！？、' else text + '。')
+    return ''.join(parts)
+
+
+def cohesion_scores(matrix: SparseTermMatrix, window: int) -> np.ndarray:
+    """各境界（セグメントiとi+1の間）の前後の窓の語ベクトルのコサイン類似度
+
+    窓ベクトルは疎ベクトルのまま集計するため、計算量とメモリは非ゼロ要素数×窓幅に比例
+    """
+
+    num_units = matrix.shape[0]
+    if num_units < 2:
+        return np.zeros(0, dtype=np.float32)
+
+    gaps = np.arange(1, num_units)
+    left_keys, left = matrix.range_sums(np.maximum(gaps - window, 0), gaps)
+    right_keys, right = matrix.range_sums(gaps, np.minimum(gaps + window, num_units))
+
+    # キーは 境界の番号×列数＋列。同じキーの積を境界ごとに合計したものが内積
+    num_columns = max(matrix.shape[1], 1)
+    _, left_positions, right_positions = np.intersect1d(left_keys, right_keys, assume_unique=True,
+                                                        return_indices=True)
+    dots = np.bincount(left_keys[left_positions] // num_columns,
+                       weights=left[left_positions] * right[right_positions], minlength=len(gaps))
+    norms = (np.sqrt(np.bincount(left_keys // num_columns, weights=left * left, minlength=len(gaps)))
+             * np.sqrt(np.bincount(right_keys // num_columns, weights=right * right, minlength=len(gaps))))
+    return np.divide(dots, norms, out=np.zeros_like(dots), where=norms > 0).astype(np.float32)
+
+
+def depth_scores(scores: np.ndarray) -> np.ndarray:
+    """各境界の谷の深さ（左右それぞれ山を登りきった高さとの差の和）"""
+
+    count = len(scores)
+    left_peak = scores.copy()
+    right_peak = scores.copy()
+    for i in range(1, count):
+        if scores[i - 1] >= scores[i]:
+            left_peak[i] = left_peak[i - 1]
+    for i in range(count - 2, -1, -1):
+        if scores[i + 1] >= scores[i]:
+            right_peak[i] = right_peak[i + 1]
+    return (left_peak - scores) + (right_peak - scores)
+
+
+def segment_topics(segments: Sequence[Dict], segment_terms: Sequence[Sequence[str]],
+                   config: Dict = None, stopwords: AbstractSet[str] = frozenset()) -> List[Dict]:
+    """タイムスタンプ付きセグメントをトピックブロックに分割
+
+    戻り値の各ブロック: start / end（秒）, time（チャプター表記）, text, segment_ids, keywords, title
+    """
+
+    settings = {**DEFAULT_SEGMENTATION, **(config or {})}
+    if not segments:
+        return []
+
+    boundaries = []
+    if len(segments) > 1:
+        matrix, _ = term_count_matrix(segment_terms, stopwords)
+        depth = depth_scores(cohesion_scores(matrix, int(settings['window'])))
+
+        # 発話の間（前のセグメントの終了から次の開始まで）
+        starts = np.fromiter((s['start'] for s in segments), dtype=np.float64, count=len(segments))
+        ends = np.fromiter((s['end'] for s in segments), dtype=np.float64, count=len(segments))
+        pauses = np.clip((starts[1:] - ends[:-1]) / float(settings['pause_scale_seconds']), 0.0, 1.0)
+
+        boundary_scores = depth + float(settings['pause_weight']) * pauses
+        boundaries = _select_boundaries(boundary_scores, starts, ends, float(settings['min_block_seconds']))
+
+    ranges = []
+    block_start = 0
+    for boundary in boundaries + [len(segments) - 1]:
+        ranges.append((block_start, boundary))
+        block_start = boundary + 1
+
+    # ブロックごとの語の出現回数
+    block_counts = [
+        Counter(term for terms in segment_terms[first:last + 1] for term in terms if term not in stopwords)
+        for first, last in ranges
+    ]
+
+    return [
+        _build_block(segments, first, last, keywords)
+        for (first, last), keywords in zip(ranges, rank_block_terms(block_counts, int(settings['max_keywords'])))
+    ]
+
+
+def rank_block_terms(block_counts: Sequence[Counter], limit: int) -> List[List[str]]:
+    """ブロックごとのキーワード（ブロック内で多く、他のブロックに少ない語の上位limit個）"""
+    block_frequency = Counter(term for counts in block_counts for term in counts)
+    return [_distinctive_terms(counts, block_frequency, len(block_counts), limit) for counts in block_counts]
+
+
+def block_title(keywords: List[str], first_text: str) -> str:
+    """ブロックの見出し（上位2語。キーワードがなければ先頭のセグメントの冒頭）"""
+    first_text = first_text.strip()
+    if keywords:
+        return '・'.join(keywords[:2])
+    return first_text[:30] + ('...' if len(first_text) > 30 else '')
+
+
+def _distinctive_terms(counts: Counter, block_frequency: Counter, num_blocks: int, limit: int) -> List[str]:
+    """ブロック内で多く、他のブロックに少ない語（ブロック単位のTF-IDF）"""
+    scores = {
+        term: count * (np.log((1 + num_blocks) / (1 + block_frequency[term])) + 1)
+        for term, count in counts.items()
+    }
+    return sorted(scores, key=scores.get, reverse=True)[:limit]
+
+
+def _select_boundaries(scores: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                       min_block_seconds: float) -> List[int]:
+    """深さが閾値（平均−標準偏差/2）を超える境界を強い順に採用（短すぎるブロックを作る境界は除外）
+
+    戻り値の境界iは「セグメントiの後で区切る」ことを表す
+    """
+
+    if len(scores) == 0:
+        return []
+
+    cutoff = scores.mean() - scores.std() / 2
+    video_start = starts[0]
+    video_end = ends[-1]
+
+    # 採用済み境界の区切り時刻（先頭・末尾を番兵として保持）
+    accepted_times = [video_start, video_end]
+    accepted = []
+    for gap in np.argsort(-scores, kind='stable'):
+        if scores[gap] <= cutoff or scores[gap] <= 0:
+            break
+        split_time = starts[gap + 1]
+        position = bisect_left(accepted_times, split_time)
+        previous_time = accepted_times[position - 1]
+        next_time = accepted_times[position]
+        if split_time - previous_time < min_block_seconds or next_time - split_time < min_block_seconds:
+            continue
+        insort(accepted_times, split_time)
+        accepted.append(int(gap))
+
+    return sorted(accepted)
+
+
+def _build_block(segments: Sequence[Dict], first: int, last: int, keywords: List[str]) -> Dict:
+    """セグメント範囲からトピックブロックを作成"""
+
+    block_segments = segments[first:last + 1]
+    start = block_segments[0]['start']
+    return {
+        'start': start,
+        'end': block_segments[-1]['end'],
+        'time': format_timestamp(start),
+        'text': join_segment_texts(block_segments),
+        'segment_ids': [seg.get('id', first + i) for i, seg in enumerate(block_segments)],
+        'keywords': keywords,
+        'title': block_title(keywords, block_segments[0]['text'])
+    }
@@ -7,6 +7,11 @@ import sys
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import List, Optional
+
+from .text_patterns import (
+    LINE_SENTENCE_DELIMITER_CAPTURE_PATTERN, FILENAME_INVALID_CHARS_PATTERN,
+    UNDERSCORE_RUN_PATTERN, normalize_sentence_spacing
+)
 import colorama
 from colorama import Fore, Back, Style
 
@@ -83,27 +88,14 @@ def format_file_size(size_bytes: int) -> str:
 
 
 def clean_text(text: str) -> str:
-    """テキストをクリーンアップ"""
-    import re
-    
-    # 余分な空白を削除
-    text = re.sub(r'\s+', ' ', text)
-    
-    # 句読点の前後の空白を調整
-    text = re.sub(r'\s+([。、！？])', r'\1', text)
-    text = re.sub(r'([。！？])\s*', r'\1 ', text)
-    
-    # 改行を正規化
-    text = re.sub(r'\n\s*\n', '\n\n', text)
-    
-    return text.strip()
+    """テキストをクリーンアップ（余分な空白の削除と句読点前後の空白調整）"""
+    return normalize_sentence_spacing(text)
 
 
 def split_text_by_sentences(text: str, max_length: int = 500) -> List[str]:
     """テキストを文単位で分割"""
-    import re
     
-    sentences = re.split(r'([。！？\n]+)', text)
+    sentences = LINE_SENTENCE_DELIMITER_CAPTURE_PATTERN.split(text)
     chunks = []
     current_chunk = ""
     
@@ -133,12 +125,11 @@ def estimate_reading_time(text: str, wpm: int = 400) -> int:
 
 def sanitize_filename(filename: str) -> str:
     """ファイル名を安全な形式に変換"""
-    import re
     
     # 使用不可文字を置換
-    filename = re.sub(r'[<>:"/\\|?*]', '_', filename)
+    filename = FILENAME_INVALID_CHARS_PATTERN.sub('_', filename)
     # 連続するアンダースコアを1つに
-    filename = re.sub(r'_+', '_', filename)
+    filename = UNDERSCORE_RUN_PATTERN.sub('_', filename)
     # 前後の空白とアンダースコアを削除
     filename = filename.strip('_ ')
     
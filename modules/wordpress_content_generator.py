@@ -4,11 +4,16 @@ HTMLタグ付きでコピー&ペースト可能な形式で出力
 """
 
 import logging
-import re
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 
+from .post_document import PostDocument
+from .text_patterns import (
+    NON_ASCII_PATTERN, ORDERED_LIST_ITEM_PATTERN, ORDERED_LIST_PREFIX_PATTERN,
+    format_inline_markdown, slugify
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,8 +24,12 @@ class WordPressContentGenerator:
         self.config = config
     
     def create_content(self, title: str, content: Dict, transcript: Dict, 
-                      output_dir: Path) -> Dict[str, Path]:
-        """WordPress/CMS用のコンテンツを生成"""
+                      output_dir: Path, document: Optional[PostDocument] = None) -> Dict[str, Path]:
+        """WordPress/CMS用のコンテンツを生成
+        
+        document: create_blog_document で組み立てたブログ記事。渡した場合は本文を書き込まず
+        （関連記事・動画リンクを追加してから呼び出し側で document.save() する）、そのパスを返す
+        """
         
         # 出力ディレクトリ作成
         output_dir = Path(output_dir)
@@ -34,10 +43,10 @@ class WordPressContentGenerator:
         outputs = {}
         
         # 1. メインブログコンテンツ（HTML形式）
-        blog_content = self._generate_blog_content(title, content, transcript)
-        blog_path = output_dir / f"{date_str}-{slug}-blog.html"
-        blog_path.write_text(blog_content, encoding='utf-8')
-        outputs['blog'] = blog_path
+        if document is None:
+            document = self.create_blog_document(title, content, transcript, output_dir)
+            document.save()
+        outputs['blog'] = document.path
         
         # 2. SEO用メタデータ
         meta_content = self._generate_meta_content(title, content)
@@ -58,21 +67,28 @@ class WordPressContentGenerator:
         """タイトルからURLスラッグを生成"""
         slug = title.lower()
         
-        # 特殊文字を削除
-        slug = re.sub(r'[^\w\s-]', '', slug)
-        # 空白をハイフンに
-        slug = re.sub(r'[-\s]+', '-', slug)
+        # 特殊文字を削除し、空白をハイフンに
+        slug = slugify(slug)
         # 前後のハイフンを削除
         slug = slug.strip('-')
         
         # 日本語が含まれる場合は日付ベースのスラッグに
-        if re.search(r'[^\x00-\x7F]', title):
+        if NON_ASCII_PATTERN.search(title):
             slug = f"post-{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
         return slug[:50]  # 最大50文字
     
+    def create_blog_document(self, title: str, content: Dict, transcript: Dict,
+                             output_dir: Path) -> PostDocument:
+        """ブログ記事（本文とCTA）をファイルに書かずに組み立てる"""
+        
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        blog_path = Path(output_dir) / f"{date_str}-{self._create_slug(title)}-blog.html"
+        return PostDocument(blog_path, self._generate_blog_content(title, content, transcript),
+                            footer=self._generate_blog_footer())
+    
     def _generate_blog_content(self, title: str, content: Dict, transcript: Dict) -> str:
-        """ブログコンテンツ本文を生成（HTMLタグ付き）"""
+        """ブログコンテンツ本文を生成（HTMLタグ付き。CTAは _generate_blog_footer）"""
         
         sections = []
         
@@ -128,8 +144,8 @@ class WordPressContentGenerator:
                 if self._is_ordered_list(part):
                     sections.append('<ol>')
                     for line in part.split('\n'):
-                        if re.match(r'^\d+\.\s', line):
-                            item_text = re.sub(r'^\d+\.\s+', '', line)
+                        if ORDERED_LIST_ITEM_PATTERN.match(line):
+                            item_text = ORDERED_LIST_PREFIX_PATTERN.sub('', line)
                             sections.append(f'  <li>{self._process_inline_formatting(item_text)}</li>')
                     sections.append('</ol>')
                 elif self._is_unordered_list(part):
@@ -156,14 +172,17 @@ class WordPressContentGenerator:
                     sections.append(f'<p>{self._process_inline_formatting(part)}</p>')
             sections.append('')
         
-        # CTA（Call to Action）
-        sections.append('<!-- CTA（Call to Action） -->')
-        sections.append('<div class="cta-section">')
-        sections.append('<h3>この記事が役に立ったら</h3>')
-        sections.append('<p>ぜひシェアやコメントをお願いします！質問やご意見もお待ちしています。</p>')
-        sections.append('</div>')
-        
-        return '\n'.join(sections)
+        return '\n'.join(sections).strip('\n')
+    
+    def _generate_blog_footer(self) -> str:
+        """CTA（Call to Action）"""
+        return '\n'.join([
+            '<!-- CTA（Call to Action） -->',
+            '<div class="cta-section">',
+            '<h3>この記事が役に立ったら</h3>',
+            '<p>ぜひシェアやコメントをお願いします！質問やご意見もお待ちしています。</p>',
+            '</div>',
+        ])
     
     def _generate_meta_content(self, title: str, content: Dict) -> str:
         """SEO用メタデータを生成"""
@@ -241,10 +260,8 @@ class WordPressContentGenerator:
     
     def _process_inline_formatting(self, text: str) -> str:
         """インライン書式を処理（太字、強調など）"""
-        # **text** を <strong>text</strong> に変換
-        text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
-        # *text* を <em>text</em> に変換
-        text = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', text)
+        # **text** を <strong>text</strong>、*text* を <em>text</em> に変換
+        text = format_inline_markdown(text)
         # 改行をbrタグに変換（必要に応じて）
         # text = text.replace('\n', '<br>')
         return text
@@ -252,7 +269,7 @@ class WordPressContentGenerator:
     def _is_ordered_list(self, text: str) -> bool:
         """番号付きリストかどうかを判定"""
         lines = text.split('\n')
-        return any(re.match(r'^\d+\.\s', line) for line in lines)
+        return any(ORDERED_LIST_ITEM_PATTERN.match(line) for line in lines)
     
     def _is_unordered_list(self, text: str) -> bool:
         """箇条書きリストかどうかを判定"""
@@ -6,10 +6,40 @@
 
 import re
 import os
+import json
 from pathlib import Path
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 from urllib.parse import unquote
 
+from modules.post_metadata import PostMetadataCache
+
+_metadata_cache = None
+_link_graph = None
+
+
+def post_records():
+    """記事メタデータの一覧（新しい順。変更されたファイルだけ読み直す）"""
+    
+    global _metadata_cache
+    if _metadata_cache is None:
+        _metadata_cache = PostMetadataCache()
+    return list(reversed(_metadata_cache.scan(Path("_posts"))))
+
+
+def link_graph_summary():
+    """内部リンクグラフの分析結果（前回以降に追加されたリンクだけを読み込む）"""
+    
+    global _link_graph
+    if _link_graph is None:
+        import yaml
+        from modules.internal_linking import open_link_database
+        from modules.link_graph import LinkGraphAnalytics
+        # 記事生成と同じリンクデータベースを開く（旧形式のJSONがあれば初回に取り込む）
+        with open('config.yaml', 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        _link_graph = LinkGraphAnalytics(open_link_database(config.get('internal_linking') or {}))
+    return _link_graph.summary()
+
 class SimpleBlogHandler(SimpleHTTPRequestHandler):
     """シンプルなブログプレビューハンドラー"""
     
@@ -22,48 +52,43 @@ class SimpleBlogHandler(SimpleHTTPRequestHandler):
             self.serve_css()
         elif self.path.startswith('/post/'):
             self.serve_post()
+        elif self.path == '/api/link-graph':
+            self.serve_link_graph()
         else:
             super().do_GET()
     
     def serve_index(self):
         """記事一覧ページ"""
         
-        posts_dir = Path("_posts")
         posts_html = ""
         
-        if posts_dir.exists():
-            # 記事ファイルを日付順でソート
-            post_files = sorted(posts_dir.glob("*.md"), reverse=True)
-            
-            for i, post_file in enumerate(post_files):
-                try:
-                    # ファイル名から日付とタイトルを抽出
-                    filename = post_file.stem
-                    date_match = re.match(r'(\d{4})-(\d{2})-(\d{2})-(.*)', filename)
-                    
-                    if date_match:
-                        year, month, day, slug = date_match.groups()
-                        display_date = f"{year}年{month}月{day}日"
-                    else:
-                        display_date = "日付不明"
-                    
-                    # ファイル内容を少し読んでタイトルを取得
-                    content = post_file.read_text(encoding='utf-8')
-                    title_match = re.search(r'title:\s*(.+)', content)
-                    title = title_match.group(1).strip(' "\'') if title_match else filename
-                    
-                    # 記事のURL
-                    post_url = f"/post/{i}"
-                    
-                    posts_html += f"""
-                    <div class="post-card">
-                        <h2><a href="{post_url}">{title}</a></h2>
-                        <div class="post-meta">📅 {display_date} • 📝 動画から自動生成</div>
-                        <div class="post-info">ファイル: {post_file.name}</div>
-                    </div>
-                    """
-                except Exception as e:
-                    print(f"記事読み込みエラー {post_file}: {e}")
+        # 記事を日付順（ファイル名の降順）で表示
+        for i, record in enumerate(post_records()):
+            try:
+                # ファイル名から日付を抽出
+                filename = Path(record['name']).stem
+                date_match = re.match(r'(\d{4})-(\d{2})-(\d{2})-(.*)', filename)
+                
+                if date_match:
+                    year, month, day, slug = date_match.groups()
+                    display_date = f"{year}年{month}月{day}日"
+                else:
+                    display_date = "日付不明"
+                
+                title = record['title']
+                
+                # 記事のURL
+                post_url = f"/post/{i}"
+                
+                posts_html += f"""
+                <div class="post-card">
+                    <h2><a href="{post_url}">{title}</a></h2>
+                    <div class="post-meta">📅 {display_date} • 📝 動画から自動生成</div>
+                    <div class="post-info">ファイル: {record['name']}</div>
+                </div>
+                """
+            except Exception as e:
+                print(f"記事読み込みエラー {record['name']}: {e}")
         
         html = f"""
         <!DOCTYPE html>
@@ -105,26 +130,15 @@ class SimpleBlogHandler(SimpleHTTPRequestHandler):
             # URLからインデックスを取得
             post_index = int(self.path.split('/')[-1])
             
-            posts_dir = Path("_posts")
-            post_files = sorted(posts_dir.glob("*.md"), reverse=True)
+            records = post_records()
             
-            if 0 <= post_index < len(post_files):
-                post_file = post_files[post_index]
-                content = post_file.read_text(encoding='utf-8')
-                
-                # タイトルを抽出
-                title_match = re.search(r'title:\s*(.+)', content)
-                title = title_match.group(1).strip(' "\'') if title_match else post_file.stem
+            if 0 <= post_index < len(records):
+                record = records[post_index]
+                content = Path(record['path']).read_text(encoding='utf-8')
+                title = record['title']
                 
                 # Front Matterを除去
-                if content.startswith('---'):
-                    parts = content.split('---', 2)
-                    if len(parts) >= 3:
-                        body_content = parts[2].strip()
-                    else:
-                        body_content = content
-                else:
-                    body_content = content
+                body_content = content[record['body_offset']:].strip()
                 
                 html = f"""
                 <!DOCTYPE html>
@@ -174,6 +188,16 @@ class SimpleBlogHandler(SimpleHTTPRequestHandler):
         
         self.send_error(404, "記事が見つかりません")
     
+    def serve_link_graph(self):
+        """内部リンクグラフの分析結果（JSON）"""
+        
+        body = json.dumps(link_graph_summary(), ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def serve_css(self):
         """CSSスタイル"""
         
@@ -0,0 +1,66 @@
+"""
+記事一括再生成のテスト
+"""
+
+from datetime import datetime
+
+import pytest
+
+from modules import jekyll_writer
+from modules.jekyll_writer import JekyllWriter
+from modules.post_regenerator import _init_worker, regenerate_post, save_post_artifact
+
+CONTENT = {
+    'introduction': '導入文です',
+    'sections': [{'title': '見出し', 'content': '本文です'}],
+    'conclusion': 'まとめです',
+    'keywords': ['テスト'],
+    'reading_time': 1,
+}
+
+
+def _freeze_today(monkeypatch, today: datetime):
+    """jekyll_writer の datetime.now() を固定"""
+
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return today
+
+    monkeypatch.setattr(jekyll_writer, 'datetime', FrozenDatetime)
+
+
+@pytest.fixture
+def exported_post(tmp_path, monkeypatch):
+    """2026年1月10日にWebアプリから書き出したJekyll記事と、そのブログ生成結果"""
+
+    _freeze_today(monkeypatch, datetime(2026, 1, 10, 9, 0))
+    post_path = JekyllWriter({}).create_post('Test Post', CONTENT, {}, tmp_path / '_posts')
+    artifact_path = save_post_artifact(tmp_path / 'cache' / post_path.stem, 'jekyll', 'Test Post', CONTENT,
+                                       post_path, transcript={})
+    _init_worker({})
+    return post_path, artifact_path
+
+
+def test_regenerate_on_later_day_keeps_post_unchanged(exported_post, monkeypatch):
+    post_path, artifact_path = exported_post
+    written = post_path.read_text(encoding='utf-8')
+    mtime = post_path.stat().st_mtime_ns
+
+    _freeze_today(monkeypatch, datetime(2026, 3, 1, 9, 0))
+    assert regenerate_post(artifact_path)[1] == 'unchanged'
+    assert post_path.read_text(encoding='utf-8') == written
+    assert post_path.stat().st_mtime_ns == mtime
+    assert '2026年01月10日' in written
+
+
+def test_regenerate_on_later_day_keeps_updated_date_of_changed_post(exported_post, monkeypatch):
+    post_path, artifact_path = exported_post
+    post_path.write_text(post_path.read_text(encoding='utf-8').replace('本文です', '古い本文'), encoding='utf-8')
+
+    _freeze_today(monkeypatch, datetime(2026, 3, 1, 9, 0))
+    assert regenerate_post(artifact_path)[1] == 'updated'
+    regenerated = post_path.read_text(encoding='utf-8')
+    assert '本文です' in regenerated
+    assert '2026年01月10日' in regenerated
+    assert '2026年03月01日' not in regenerated
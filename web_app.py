@@ -7,6 +7,9 @@ VideoAI Studio - 統合ウィザードWebアプリケーション
 import os
 import json
 import asyncio
+import time
+import functools
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
@@ -16,12 +19,17 @@ from fastapi import FastAPI, UploadFile, File, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
 
 # ローカルモジュール
 from main import VideoContentProcessor
 from modules.utils import setup_logging
 from modules.config_manager import ConfigManager
+from modules.storage_gc import StorageGarbageCollector
+from modules.session_store import SessionStore
+from modules.admission import AdmissionController, AdmissionRejected
+from modules.post_regenerator import export_artifact_dir, save_post_artifact
 import yaml
 
 # 設定読み込み
@@ -43,46 +51,129 @@ templates = Jinja2Templates(directory="web_templates")
 logger = setup_logging()
 
 # グローバル変数
-processor = None
 current_session = {}
 config_manager = ConfigManager()
 
-class SessionManager:
-    """セッション管理クラス"""
-    
-    def __init__(self):
-        self.sessions = {}
-    
-    def create_session(self, session_id: str) -> Dict:
-        """新しいセッションを作成"""
-        self.sessions[session_id] = {
-            'id': session_id,
-            'created_at': datetime.now().isoformat(),
-            'status': 'initialized',
-            'steps_completed': [],
-            'data': {},
-            'files': {}
-        }
-        return self.sessions[session_id]
-    
-    def get_session(self, session_id: str) -> Optional[Dict]:
-        """セッション取得"""
-        return self.sessions.get(session_id)
-    
-    def update_session(self, session_id: str, data: Dict):
-        """セッション更新"""
-        if session_id in self.sessions:
-            self.sessions[session_id].update(data)
+# セッション・ジョブ状態・設定バージョンはSQLiteで全ワーカー共有
+session_manager = SessionStore(CONFIG.get('server', {}).get('state_db', 'cache/web_state.db'))
+
+# VideoContentProcessor はワーカーごとに遅延生成（Whisperモデルを初回利用時にロード）
+_processor = None
+_processor_lock = threading.Lock()
+
+def get_processor() -> VideoContentProcessor:
+    """このワーカーのVideoContentProcessorを取得"""
+    global _processor
+    if _processor is None:
+        with _processor_lock:
+            if _processor is None:
+                _processor = VideoContentProcessor(CONFIG)
+    return _processor
+
+def reset_processor():
+    """設定変更後に VideoContentProcessor を次回利用時に作り直す（実行中の処理は古いインスタンスのまま完了）"""
+    global _processor
+    with _processor_lock:
+        _processor = None
+
+# 設定更新を他ワーカーへ伝えるための共有バージョン
+CONFIG_VERSION_KEY = 'config_version'
+CONFIG_SYNC_INTERVAL = 1.0
+_config_version = session_manager.get_value(CONFIG_VERSION_KEY, '0')
+_config_checked_at = 0.0
 
-session_manager = SessionManager()
+def publish_config_update():
+    """設定を更新したことを全ワーカーに通知"""
+    global _config_version
+    _config_version = str(session_manager.bump_counter(CONFIG_VERSION_KEY))
+    reset_processor()
+
+def sync_shared_config():
+    """他ワーカーが設定を更新していれば再読み込み"""
+    global CONFIG, _config_version, _config_checked_at
+    
+    now = time.monotonic()
+    if now - _config_checked_at < CONFIG_SYNC_INTERVAL:
+        return
+    _config_checked_at = now
+    
+    version = session_manager.get_value(CONFIG_VERSION_KEY, '0')
+    if version != _config_version:
+        config_manager.config = config_manager._load_config()
+        CONFIG = config_manager.config
+        _config_version = version
+        reset_processor()
+        logger.info(f"共有設定を再読み込みしました (version {version})")
+
+# セッション成果物のガベージコレクター（processing.auto_cleanup）
+storage_gc = StorageGarbageCollector(
+    CONFIG.get('processing', {}),
+    is_in_flight=session_manager.is_in_flight,
+    last_access=session_manager.last_access,
+    on_evict=session_manager.delete_session,
+    evicting=session_manager.evicting,
+    # 複数ワーカーのうちリースを持つ1つだけが実行
+    should_run=lambda: session_manager.acquire_lease(
+        'storage_gc', str(os.getpid()), storage_gc.interval_seconds * 2
+    )
+)
+
+def tracks_session_job(endpoint):
+    """エンドポイント実行中はセッションを処理中として扱うデコレーター"""
+    
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        session_id = kwargs.get('session_id')
+        request = kwargs.get('request')
+        if session_id is None and request is not None:
+            try:
+                # Request.json() は結果をキャッシュするためエンドポイント側でも再取得できる
+                session_id = (await request.json()).get('session_id')
+            except Exception:
+                session_id = None
+        
+        # 登録・削除中の待機はスレッドで行う（イベントループを止めない）
+        async with session_manager.track_job_async(session_id):
+            return await endpoint(*args, **kwargs)
+    
+    return wrapper
+
+# 処理エンドポイントのアドミッション制御（同時実行数・レート制限。複数ワーカーでは共有ストアで合算）
+admission = AdmissionController(CONFIG.get('admission', {}), store=session_manager)
+
+def admission_controlled(resource: str):
+    """リソース種別ごとの同時実行数とクライアント別レート制限を適用するデコレーター"""
+    
+    def decorator(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            request = kwargs.get('request')
+            client_id = request.client.host if request is not None and request.client else 'unknown'
+            
+            try:
+                async with admission.admit(resource, client_id):
+                    return await endpoint(*args, **kwargs)
+            except AdmissionRejected as e:
+                logger.warning(f"受付拒否 ({resource}, {client_id}): {e.message}")
+                return JSONResponse(
+                    status_code=429,
+                    content={"success": False, "error": e.message, "retry_after": e.retry_after},
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+        
+        return wrapper
+    
+    return decorator
+
+@app.middleware("http")
+async def shared_config_middleware(request: Request, call_next):
+    """リクエストごとに共有設定の更新を確認"""
+    sync_shared_config()
+    return await call_next(request)
 
 @app.on_event("startup")
 async def startup_event():
-    """アプリ起動時の初期化"""
-    global processor
-    
-    # VideoContentProcessorを初期化
-    processor = VideoContentProcessor(CONFIG)
+    """アプリ起動時の初期化（各ワーカーで実行）"""
     
     # 必要なディレクトリを作成
     Path("web_static").mkdir(exist_ok=True)
@@ -90,15 +181,17 @@ async def startup_event():
     Path("uploads").mkdir(exist_ok=True)
     Path("temp_sessions").mkdir(exist_ok=True)
     
+    # ストレージ整理をバックグラウンドで開始
+    asyncio.create_task(storage_gc.run_forever())
+    
     logger.info("🚀 VideoAI Studio が起動しました")
 
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """ホームページ（ウィザード開始）"""
     
-    # 新しいセッションを作成
-    session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    session = session_manager.create_session(session_id)
+    # セッションIDのみ発行（セッションは最初のAPI呼び出し時に作成）
+    session_id = session_manager.new_session_id()
     
     return templates.TemplateResponse("next_gen_wizard.html", {
         "request": request,
@@ -110,9 +203,8 @@ async def home(request: Request):
 async def classic_home(request: Request):
     """クラシック版ウィザード"""
     
-    # 新しいセッションを作成
-    session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    session = session_manager.create_session(session_id)
+    # セッションIDのみ発行（セッションは最初のAPI呼び出し時に作成）
+    session_id = session_manager.new_session_id()
     
     return templates.TemplateResponse("wizard.html", {
         "request": request,
@@ -121,17 +213,20 @@ async def classic_home(request: Request):
     })
 
 @app.post("/api/upload")
+@tracks_session_job
+@admission_controlled('image_io')
 async def upload_video(
+    request: Request,
     session_id: str = Form(...),
     video: UploadFile = File(...)
 ):
     """動画アップロード処理"""
     
     try:
-        # セッション取得
-        session = session_manager.get_session(session_id)
+        # セッション取得（未作成ならここで作成）
+        session = session_manager.get_or_create_session(session_id)
         if not session:
-            raise HTTPException(status_code=404, detail="セッションが見つかりません")
+            raise HTTPException(status_code=400, detail="無効なセッションIDです")
         
         # ファイル検証
         if not video.filename.lower().endswith(('.mp4', '.mov', '.avi', '.mkv')):
@@ -169,11 +264,15 @@ async def upload_video(
             }
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"動画アップロードエラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/process/transcribe")
+@tracks_session_job
+@admission_controlled('transcription')
 async def process_transcribe(request: Request):
     """音声文字起こし処理"""
     
@@ -189,7 +288,8 @@ async def process_transcribe(request: Request):
         
         # Whisper処理（非同期）
         logger.info(f"🎤 文字起こし開始: {video_path}")
-        transcript_data = processor.transcriber.transcribe(Path(video_path))
+        processor = await run_in_threadpool(get_processor)
+        transcript_data = await run_in_threadpool(processor.transcriber.transcribe, Path(video_path))
         
         # セッション更新
         session_manager.update_session(session_id, {
@@ -217,6 +317,8 @@ async def process_transcribe(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/process/caption")
+@tracks_session_job
+@admission_controlled('content')
 async def process_caption(request: Request):
     """キャプション作成処理"""
     
@@ -261,6 +363,8 @@ async def process_caption(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/process/content")
+@tracks_session_job
+@admission_controlled('content')
 async def process_content(request: Request):
     """コンテンツ生成処理（ブログ・X投稿・YouTube）"""
     
@@ -278,7 +382,13 @@ async def process_content(request: Request):
         
         # コンテンツ生成
         logger.info(f"✍️ コンテンツ生成開始: {title}")
-        content = processor.generator.generate_all(
+        processor = await run_in_threadpool(get_processor)
+        
+        # 再生成を明示した場合はキャッシュ済みのブログ生成結果を破棄
+        if data.get('regenerate'):
+            await run_in_threadpool(processor.generator.invalidate_blog_cache, transcript_data)
+        content = await run_in_threadpool(
+            processor.generator.generate_all,
             transcript_data=transcript_data,
             title=title,
             video_info=processor._get_video_info(video_path)
@@ -312,6 +422,8 @@ async def process_content(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/process/image-prompts")
+@tracks_session_job
+@admission_controlled('content')
 async def process_image_prompts(request: Request):
     """画像生成プロンプト作成処理"""
     
@@ -362,6 +474,8 @@ async def process_image_prompts(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/process/upload-images")
+@tracks_session_job
+@admission_controlled('image_io')
 async def process_upload_images(request: Request):
     """画像手動アップロード処理"""
     
@@ -436,6 +550,8 @@ async def get_file(session_id: str, filename: str):
     )
 
 @app.post("/api/export")
+@tracks_session_job
+@admission_controlled('image_io')
 async def export_content(request: Request):
     """最終コンテンツのエクスポート"""
     
@@ -456,13 +572,35 @@ async def export_content(request: Request):
         
         if 'blog' in export_formats:
             # Jekyll記事として保存
+            processor = await run_in_threadpool(get_processor)
             jekyll_writer = processor.jekyll_writer
+            
+            # 本文がほぼ同じ記事が公開済みなら、明示的に許可されない限り書き出さない
+            body = jekyll_writer.render_body(
+                session['data']['title'],
+                session['data']['content']['blog'],
+                session['data']['transcript']
+            )
+            duplicates = await run_in_threadpool(processor.link_manager.find_near_duplicates, body)
+            if duplicates and not data.get('allow_duplicate'):
+                return JSONResponse(
+                    status_code=409,
+                    content={"success": False, "error": "本文がほぼ同じ記事が既に公開されています",
+                             "duplicates": duplicates}
+                )
+            
             post_path = jekyll_writer.create_post(
                 title=session['data']['title'],
                 content=session['data']['content']['blog'],
                 transcript=session['data']['transcript'],
                 output_dir=Path("_posts")
             )
+            # テンプレート変更時の一括再生成用に生成結果も保存
+            await run_in_threadpool(
+                save_post_artifact, export_artifact_dir(CONFIG, post_path), 'jekyll',
+                session['data']['title'], session['data']['content']['blog'], post_path,
+                transcript=session['data']['transcript']
+            )
             exported_files['blog'] = str(post_path)
         
         if 'x' in export_formats:
@@ -586,6 +724,7 @@ async def update_dalle3_settings(request: Request):
             # 設定を再読み込み
             global CONFIG
             CONFIG = config_manager.config
+            publish_config_update()
             
             return JSONResponse({
                 "success": True,
@@ -623,6 +762,7 @@ async def update_runware_settings(request: Request):
             # 設定を再読み込み
             global CONFIG
             CONFIG = config_manager.config
+            publish_config_update()
             
             return JSONResponse({
                 "success": True,
@@ -729,15 +869,22 @@ if __name__ == "__main__":
     parser.add_argument('--port', type=int, default=8004, help='Port to run the server on (default: 8004)')
     parser.add_argument('--host', type=str, default='0.0.0.0', help='Host to run the server on (default: 0.0.0.0)')
     parser.add_argument('--reload', action='store_true', help='Enable auto-reload mode')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1)')
     args = parser.parse_args()
     
+    if args.workers > 1 and args.reload:
+        parser.error('--reload と --workers は同時に指定できません')
+    
     print("🎬 VideoAI Studio を起動しています...")
     print(f"📱 ブラウザで http://localhost:{args.port} を開いてください")
+    if args.workers > 1:
+        print(f"👷 ワーカー数: {args.workers}（セッションと同時実行数・レート制限は共有ストアで同期されます）")
     
     uvicorn.run(
         "web_app:app",
         host=args.host,
         port=args.port,
         reload=args.reload,
+        workers=args.workers,
         log_level="info"
-    )
\ No newline at end of file
+    )